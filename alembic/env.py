@@ -21,9 +21,15 @@ if config.config_file_name is not None:
 
 # for 'autogenerate' support
 # Import the models that should be part of the metadata
+from src.models.audit import AuditEntry
 from src.models.base import BaseModel
 from src.models.books import Book
+from src.models.idempotency import IdempotencyKey
+from src.models.jobs import Job
+from src.models.orders import Order
+from src.models.outbox import OutboxEvent
 from src.models.sellers import Seller
+from src.models.tombstones import Tombstone
 
 target_metadata = BaseModel.metadata
 
@@ -0,0 +1,34 @@
+"""Book ISBN natural key
+
+Revision ID: 3f9d2a7c1b64
+Revises: 8c8643f52c81
+Create Date: 2026-10-19 03:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9d2a7c1b64"
+down_revision: Union[str, None] = "8c8643f52c81"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable: books created through the API without an ISBN never conflict.
+    op.add_column("books_table", sa.Column("isbn", sa.String(length=13), nullable=True))
+    op.create_unique_constraint(
+        "uq_books_table_seller_id_isbn", "books_table", ["seller_id", "isbn"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("uq_books_table_seller_id_isbn", "books_table", type_="unique")
+    op.drop_column("books_table", "isbn")
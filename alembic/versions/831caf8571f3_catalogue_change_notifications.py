@@ -0,0 +1,79 @@
+"""Catalogue change notifications
+
+Revision ID: 831caf8571f3
+Revises: 5847b7f75458
+Create Date: 2026-10-19 02:10:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "831caf8571f3"
+down_revision: Union[str, None] = "5847b7f75458"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NOTIFY is transactional: listeners only see changes once they commit.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_catalogue_change() RETURNS trigger AS $$
+        DECLARE
+            rec RECORD;
+            payload jsonb;
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW IS NOT DISTINCT FROM OLD THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                rec := OLD;
+            ELSE
+                rec := NEW;
+            END IF;
+
+            IF TG_TABLE_NAME = 'books_table' THEN
+                payload := jsonb_build_object(
+                    'entity', 'book', 'op', lower(TG_OP),
+                    'id', rec.id, 'seller_id', rec.seller_id
+                );
+                IF TG_OP <> 'DELETE' THEN
+                    payload := payload || jsonb_build_object('data', to_jsonb(rec));
+                END IF;
+            ELSE
+                payload := jsonb_build_object(
+                    'entity', 'seller', 'op', lower(TG_OP),
+                    'id', rec.id, 'seller_id', rec.id
+                );
+                IF TG_OP <> 'DELETE' THEN
+                    payload := payload || jsonb_build_object('data', to_jsonb(rec) - 'password');
+                END IF;
+            END IF;
+
+            PERFORM pg_notify('catalogue_changes', payload::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    for table in ("books_table", "sellers"):
+        op.execute(
+            f"""
+            CREATE TRIGGER {table}_notify_change
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION notify_catalogue_change();
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("books_table", "sellers"):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_notify_change ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS notify_catalogue_change()")
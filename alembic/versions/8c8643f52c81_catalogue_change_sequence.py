@@ -0,0 +1,122 @@
+"""Catalogue change sequence and tombstones
+
+Revision ID: 8c8643f52c81
+Revises: 831caf8571f3
+Create Date: 2026-10-19 02:40:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c8643f52c81"
+down_revision: Union[str, None] = "831caf8571f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("books_table", "sellers")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.schema.CreateSequence(sa.Sequence("catalogue_change_seq")))
+
+    for table in TABLES:
+        # Existing rows are numbered by the column default as it is added.
+        op.add_column(
+            table,
+            sa.Column(
+                "change_seq",
+                sa.BigInteger(),
+                server_default=sa.text("nextval('catalogue_change_seq')"),
+                nullable=False,
+            ),
+        )
+        op.create_index(f"ix_{table}_change_seq", table, ["change_seq"])
+
+    op.create_table(
+        "catalogue_tombstones",
+        sa.Column(
+            "seq",
+            sa.BigInteger(),
+            server_default=sa.text("nextval('catalogue_change_seq')"),
+            nullable=False,
+        ),
+        sa.Column("entity", sa.String(length=16), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("seller_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "deleted_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("seq"),
+    )
+    op.create_index(
+        "ix_catalogue_tombstones_entity_seq", "catalogue_tombstones", ["entity", "seq"]
+    )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_catalogue_change_seq() RETURNS trigger AS $$
+        BEGIN
+            IF NEW IS DISTINCT FROM OLD THEN
+                NEW.change_seq := nextval('catalogue_change_seq');
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION record_catalogue_tombstone() RETURNS trigger AS $$
+        BEGIN
+            IF TG_TABLE_NAME = 'books_table' THEN
+                INSERT INTO catalogue_tombstones (entity, entity_id, seller_id)
+                VALUES ('book', OLD.id, OLD.seller_id);
+            ELSE
+                INSERT INTO catalogue_tombstones (entity, entity_id, seller_id)
+                VALUES ('seller', OLD.id, OLD.id);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    for table in TABLES:
+        op.execute(
+            f"""
+            CREATE TRIGGER {table}_bump_change_seq
+            BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION bump_catalogue_change_seq();
+            """
+        )
+        op.execute(
+            f"""
+            CREATE TRIGGER {table}_record_tombstone
+            AFTER DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION record_catalogue_tombstone();
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_record_tombstone ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_bump_change_seq ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS record_catalogue_tombstone()")
+    op.execute("DROP FUNCTION IF EXISTS bump_catalogue_change_seq()")
+
+    op.drop_index("ix_catalogue_tombstones_entity_seq", table_name="catalogue_tombstones")
+    op.drop_table("catalogue_tombstones")
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_change_seq", table_name=table)
+        op.drop_column(table, "change_seq")
+    op.execute(sa.schema.DropSequence(sa.Sequence("catalogue_change_seq")))
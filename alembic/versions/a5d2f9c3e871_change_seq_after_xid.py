@@ -0,0 +1,68 @@
+"""Assign the transaction id before taking a catalogue change number
+
+Revision ID: a5d2f9c3e871
+Revises: f6d3b8e2a914
+Create Date: 2026-10-19 12:10:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a5d2f9c3e871"
+down_revision: Union[str, None] = "f6d3b8e2a914"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (("books_table", "change_seq"), ("sellers", "change_seq"), ("catalogue_tombstones", "seq"))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The change watermark relies on every number belonging to a transaction
+    # that already had its id when the number was taken; see ChangeWatermark.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION next_catalogue_change_seq() RETURNS bigint AS $$
+        BEGIN
+            PERFORM pg_current_xact_id();
+            RETURN nextval('catalogue_change_seq');
+        END;
+        $$ LANGUAGE plpgsql VOLATILE;
+        """
+    )
+    for table, column in COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT next_catalogue_change_seq()")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_catalogue_change_seq() RETURNS trigger AS $$
+        BEGIN
+            IF NEW IS DISTINCT FROM OLD THEN
+                NEW.change_seq := next_catalogue_change_seq();
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_catalogue_change_seq() RETURNS trigger AS $$
+        BEGIN
+            IF NEW IS DISTINCT FROM OLD THEN
+                NEW.change_seq := nextval('catalogue_change_seq');
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    for table, column in COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT nextval('catalogue_change_seq')")
+    op.execute("DROP FUNCTION IF EXISTS next_catalogue_change_seq()")
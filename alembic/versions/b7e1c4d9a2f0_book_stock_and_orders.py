@@ -0,0 +1,58 @@
+"""Book price and stock, orders
+
+Revision ID: b7e1c4d9a2f0
+Revises: 3f9d2a7c1b64
+Create Date: 2026-10-19 04:10:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e1c4d9a2f0"
+down_revision: Union[str, None] = "3f9d2a7c1b64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "books_table",
+        sa.Column("price", sa.Numeric(precision=10, scale=2), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "books_table", sa.Column("stock", sa.Integer(), server_default="0", nullable=False)
+    )
+    op.create_check_constraint(
+        "ck_books_table_stock_non_negative", "books_table", "stock >= 0"
+    )
+    op.create_table(
+        "orders",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("book_id", sa.Integer(), nullable=True),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("unit_price", sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["book_id"], ["books_table.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_orders_book_id"), "orders", ["book_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_orders_book_id"), table_name="orders")
+    op.drop_table("orders")
+    op.drop_constraint("ck_books_table_stock_non_negative", "books_table", type_="check")
+    op.drop_column("books_table", "stock")
+    op.drop_column("books_table", "price")
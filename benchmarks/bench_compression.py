@@ -0,0 +1,67 @@
+"""
+Bytes saved vs CPU cost of the response codecs on typical API payloads.
+
+Run from the repository root:
+    python -m benchmarks.bench_compression
+"""
+import time
+
+import orjson
+
+from src.utils.compression import available_encodings
+
+AUTHORS = ["Robert Martin", "Martin Fowler", "Kent Beck", "Pushkin", "Lermontov"]
+
+
+def book(i: int) -> dict:
+    return {
+        "title": f"Book title number {i}",
+        "author": AUTHORS[i % len(AUTHORS)],
+        "year": 1990 + i % 35,
+        "id": i,
+        "pages": 100 + i % 900,
+        "seller_id": 1 + i % 50,
+    }
+
+
+def payloads() -> dict[str, bytes]:
+    seller = {
+        "first_name": "John",
+        "last_name": "Doe",
+        "e_mail": "john@example.com",
+        "id": 1,
+        "books": [book(i) for i in range(20)],
+    }
+    return {
+        "single book": orjson.dumps(book(1)),
+        "seller with 20 books": orjson.dumps(seller),
+        "catalogue, 1k books": orjson.dumps({"books": [book(i) for i in range(1_000)]}),
+        "catalogue, 100k books": orjson.dumps({"books": [book(i) for i in range(100_000)]}),
+    }
+
+
+def measure(compress, data: bytes) -> tuple[int, float]:
+    rounds = max(1, 2_000_000 // max(len(data), 1))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        compressed = compress(data)
+    elapsed = (time.perf_counter() - start) / rounds
+    return len(compressed), elapsed
+
+
+def main() -> None:
+    codecs = available_encodings()
+    print(f"{'payload':<24}{'codec':<7}{'raw':>11}{'encoded':>11}{'saved':>8}{'ms':>9}{'MB/s':>9}")
+    for name, data in payloads().items():
+        for codec in codecs.values():
+            size, elapsed = measure(codec.compress, data)
+            saved = 100 * (1 - size / len(data))
+            throughput = len(data) / elapsed / 1e6
+            print(
+                f"{name:<24}{codec.name:<7}{len(data):>11}{size:>11}"
+                f"{saved:>7.1f}%{elapsed * 1e3:>9.3f}{throughput:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Job queue throughput: enqueueing, and claiming plus running no-op jobs.
+
+Enqueueing is measured one job per transaction (as a request handler
+queues follow-up work) from concurrent producers, and in multi-row
+batches. Dequeueing runs `--workers` JobWorkers side by side, as separate
+worker processes would, all claiming from the same table with SKIP LOCKED.
+
+Run from the repository root against a migrated database:
+    python -m benchmarks.bench_jobs
+    python -m benchmarks.bench_jobs --jobs 50000 --workers 4 --concurrency 32 --pool 40
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.configurations.settings import settings
+from src.models.jobs import Job
+from src.utils.jobs import Handler, JobWorker, enqueue, enqueue_many
+
+KIND = "bench.noop"
+
+
+async def noop() -> None:
+    pass
+
+
+async def enqueue_single(session_factory, jobs: int, producers: int) -> float:
+    async def producer(count: int) -> None:
+        for _ in range(count):
+            async with session_factory() as session:
+                enqueue(session, KIND)
+                await session.commit()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(producer(jobs // producers) for _ in range(producers)))
+    return jobs // producers * producers / (time.perf_counter() - started)
+
+
+async def enqueue_batched(session_factory, jobs: int, batch: int) -> float:
+    started = time.perf_counter()
+    for start in range(0, jobs, batch):
+        async with session_factory() as session:
+            await enqueue_many(session, KIND, ({} for _ in range(min(batch, jobs - start))))
+            await session.commit()
+    return jobs / (time.perf_counter() - started)
+
+
+async def dequeue(session_factory, workers: int, concurrency: int) -> tuple[float, int]:
+    async with session_factory() as session:
+        jobs = await session.scalar(select(func.count()).where(Job.kind == KIND))
+
+    pool = [
+        JobWorker(lambda: session_factory, {KIND: Handler(noop, 5)}, concurrency=concurrency, poll_interval=0.05)
+        for _ in range(workers)
+    ]
+    started = time.perf_counter()
+    running = [asyncio.create_task(worker.run()) for worker in pool]
+    while sum(worker.completed for worker in pool) < jobs:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    for worker in pool:
+        await worker.stop()
+    await asyncio.gather(*running)
+    return jobs / elapsed, sum(worker.claimed for worker in pool)
+
+
+async def clear(session_factory) -> None:
+    async with session_factory() as session:
+        await session.execute(delete(Job).where(Job.kind == KIND))
+        await session.commit()
+
+
+def report(name: str, rate: float, note: str = "") -> None:
+    print(f"  {name:<42} {rate:10,.0f} jobs/s   {note}".rstrip())
+
+
+async def bench(jobs: int, producers: int, batch: int, workers: int, concurrency: int, pool: int) -> None:
+    engine = create_async_engine(settings.database_url, pool_size=pool, max_overflow=0, pool_timeout=300)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    print(f"{jobs} jobs, {pool} connections")
+    try:
+        await clear(session_factory)
+        rate = await enqueue_single(session_factory, jobs, producers)
+        report(f"enqueue, 1 per transaction, {producers} producers", rate)
+        rate, claimed = await dequeue(session_factory, workers, concurrency)
+        report(f"dequeue, {workers} workers x {concurrency} slots", rate, f"{claimed} claims")
+
+        rate = await enqueue_batched(session_factory, jobs, batch)
+        report(f"enqueue, {batch} per INSERT", rate)
+        rate, claimed = await dequeue(session_factory, 1, concurrency)
+        report(f"dequeue, 1 worker x {concurrency} slots", rate, f"{claimed} claims")
+    finally:
+        await clear(session_factory)
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=10_000)
+    parser.add_argument("--producers", type=int, default=20, help="concurrent single-job enqueuers")
+    parser.add_argument("--batch", type=int, default=1_000, help="jobs per batched INSERT")
+    parser.add_argument("--workers", type=int, default=4, help="JobWorkers claiming side by side")
+    parser.add_argument("--concurrency", type=int, default=16, help="jobs in flight per worker")
+    parser.add_argument("--pool", type=int, default=30, help="database connections")
+    args = parser.parse_args()
+
+    asyncio.run(bench(args.jobs, args.producers, args.batch, args.workers, args.concurrency, args.pool))
+
+
+if __name__ == "__main__":
+    main()
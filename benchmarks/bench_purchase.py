@@ -0,0 +1,126 @@
+"""
+Thousands of buyers racing for one hot book.
+
+Every buyer keeps purchasing one copy until the book is sold out. The
+conditional UPDATE used by POST /api/v1/books/{id}/purchase must sell
+exactly the initial stock; `--naive` runs a SELECT-then-UPDATE version of
+the same purchase for comparison, which loses updates and oversells.
+
+Run from the repository root against a migrated database:
+    python -m benchmarks.bench_purchase
+    python -m benchmarks.bench_purchase --buyers 5000 --stock 20000 --pool 20 --naive
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.configurations.settings import settings
+from src.models.books import Book
+from src.models.orders import Order
+from src.models.sellers import Seller
+from src.utils.statements import PURCHASE
+
+
+async def purchase(session, book_id: int) -> bool:
+    result = await session.execute(PURCHASE, {"book_id": book_id, "quantity": 1})
+    sold = result.one_or_none() is not None
+    await session.commit()
+    return sold
+
+
+async def naive_purchase(session, book_id: int) -> bool:
+    # Read-modify-write: two buyers can read the same stock and both sell it
+    stock = await session.scalar(select(Book.stock).where(Book.id == book_id))
+    if stock < 1:
+        await session.commit()
+        return False
+    await session.execute(update(Book).where(Book.id == book_id).values(stock=stock - 1))
+    await session.execute(
+        insert(Order.__table__).values(book_id=book_id, quantity=1, unit_price=10)
+    )
+    await session.commit()
+    return True
+
+
+async def run(buy, session_factory, book_id: int, buyers: int) -> tuple[int, list[float]]:
+    latencies = []
+
+    async def buyer() -> int:
+        bought = 0
+        while True:
+            started = time.perf_counter()
+            async with session_factory() as session:
+                sold = await buy(session, book_id)
+            latencies.append(time.perf_counter() - started)
+            if not sold:
+                return bought
+            bought += 1
+
+    return sum(await asyncio.gather(*(buyer() for _ in range(buyers)))), latencies
+
+
+async def bench(buyers: int, stock: int, pool: int, naive: bool) -> None:
+    engine = create_async_engine(settings.database_url, pool_size=pool, max_overflow=0, pool_timeout=300)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    cases = [("conditional UPDATE", purchase)]
+    if naive:
+        cases.append(("SELECT then UPDATE", naive_purchase))
+
+    async with session_factory() as session:
+        seller = Seller(first_name="Bench", last_name="Mark", e_mail=f"bench+{uuid.uuid4()}@example.com", password="password123")
+        session.add(seller)
+        await session.flush()
+        seller_id = seller.id
+        await session.commit()
+
+    print(f"{buyers} buyers, {stock} copies, {pool} connections")
+    try:
+        for name, buy in cases:
+            async with session_factory() as session:
+                book = Book(title="Hot book", author="Bench", year=2025, pages=100, seller_id=seller_id, price=10, stock=stock)
+                session.add(book)
+                await session.commit()
+
+            started = time.perf_counter()
+            sold, latencies = await run(buy, session_factory, book.id, buyers)
+            elapsed = time.perf_counter() - started
+
+            async with session_factory() as session:
+                left = await session.scalar(select(Book.stock).where(Book.id == book.id))
+                orders = await session.scalar(select(func.count()).where(Order.book_id == book.id))
+            latencies.sort()
+            print(
+                f"  {name:<20} {sold / elapsed:8,.0f} purchases/s   "
+                f"p50 {latencies[len(latencies) // 2] * 1e3:6.1f} ms   "
+                f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:6.1f} ms   "
+                f"orders {orders} for {stock} copies, {left} left"
+                + ("   OVERSOLD" if orders > stock else "")
+            )
+    finally:
+        async with session_factory() as session:
+            books = select(Book.id).where(Book.seller_id == seller_id)
+            await session.execute(delete(Order).where(Order.book_id.in_(books)))
+            await session.execute(delete(Book).where(Book.seller_id == seller_id))
+            await session.execute(delete(Seller).where(Seller.id == seller_id))
+            await session.commit()
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--buyers", type=int, default=2_000)
+    parser.add_argument("--stock", type=int, default=10_000)
+    parser.add_argument("--pool", type=int, default=10, help="database connections")
+    parser.add_argument("--naive", action="store_true", help="also run a read-modify-write purchase")
+    args = parser.parse_args()
+
+    asyncio.run(bench(args.buyers, args.stock, args.pool, args.naive))
+
+
+if __name__ == "__main__":
+    main()
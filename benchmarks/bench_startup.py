@@ -0,0 +1,122 @@
+"""
+Cold start: import time of the app, the migration check a container runs
+on boot, and time from process start to the first served request.
+
+Every sample runs in a fresh interpreter. Run from the repository root
+against a migrated database:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --top 15
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+IMPORT_APP = "import time; t = time.perf_counter(); import src.main; print(time.perf_counter() - t)"
+
+
+def python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True)
+
+
+def import_time() -> float:
+    return float(python("-c", IMPORT_APP).stdout)
+
+
+def slowest_imports(top: int) -> list[tuple[float, str]]:
+    """Top-level packages by cumulative import time, from -X importtime."""
+    modules = {}
+    for line in python("-X", "importtime", "-c", "import src.main").stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line[13:]:
+            continue
+        _, cumulative, name = line[12:].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        package = name.strip().split(".")[0]
+        # The outermost import of a package carries its whole cost
+        modules[package] = max(modules.get(package, 0), int(cumulative) / 1e6)
+    modules.pop("src", None)
+    return sorted(((seconds, name) for name, seconds in modules.items()), reverse=True)[:top]
+
+
+def migrate_time() -> float:
+    started = time.perf_counter()
+    python("-m", "src.cli", "migrate")
+    return time.perf_counter() - started
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_request_times(timeout: float = 60) -> tuple[float, float]:
+    """Seconds from spawning uvicorn to the first 200 of /api/v1/books/ and of /ready."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, "PYTHONUNBUFFERED": "1"},
+    )
+    first_request = ready = None
+    try:
+        while ready is None and time.perf_counter() - started < timeout:
+            if first_request is None and get(f"http://127.0.0.1:{port}/api/v1/books/"):
+                first_request = time.perf_counter() - started
+            if first_request is not None and get(f"http://127.0.0.1:{port}/ready"):
+                ready = time.perf_counter() - started
+            time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait()
+    if ready is None:
+        raise RuntimeError(f"server was not ready within {timeout}s")
+    return first_request, ready
+
+
+def get(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status == 200
+    except (OSError, urllib.error.URLError):
+        return False
+
+
+def report(name: str, samples: list[float]) -> None:
+    print(
+        f"  {name:<24} median {statistics.median(samples) * 1e3:7.0f} ms   "
+        f"min {min(samples) * 1e3:7.0f} ms   max {max(samples) * 1e3:7.0f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imported packages to list")
+    args = parser.parse_args()
+
+    # Warm the bytecode caches so that every run measures the same thing
+    import_time()
+
+    print(f"{args.runs} runs each")
+    report("import src.main", [import_time() for _ in range(args.runs)])
+    report("migrate (at head)", [migrate_time() for _ in range(args.runs)])
+    served = [first_request_times() for _ in range(args.runs)]
+    report("first request", [first for first, _ in served])
+    report("ready (pool warmed)", [ready for _, ready in served])
+
+    print("slowest imports:")
+    for seconds, name in slowest_imports(args.top):
+        print(f"  {name:<24} {seconds * 1e3:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
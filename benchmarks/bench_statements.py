@@ -0,0 +1,98 @@
+"""
+Python-side overhead per query: statements rebuilt on every request vs
+the pre-built ones in src.utils.statements.
+
+Run from the repository root:
+    python -m benchmarks.bench_statements          # construction + cache key only
+    python -m benchmarks.bench_statements --db     # also execute against the database
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from src.configurations.settings import settings
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.utils.statements import BOOK_BY_ID, SELLER_BY_EMAIL, SELLER_WITH_BOOKS
+
+
+def rebuilt_cases():
+    return {
+        "book by id": (
+            lambda: select(Book).where(Book.id == 1),
+            BOOK_BY_ID,
+            {"book_id": 1},
+        ),
+        "seller by e-mail": (
+            lambda: select(Seller).filter(Seller.e_mail == "john@example.com"),
+            SELLER_BY_EMAIL,
+            {"e_mail": "john@example.com"},
+        ),
+        "seller with books": (
+            lambda: select(Seller).where(Seller.id == 1).options(selectinload(Seller.books)),
+            SELLER_WITH_BOOKS,
+            {"seller_id": 1},
+        ),
+    }
+
+
+def per_call(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def bench_construction(rounds: int) -> None:
+    print("Statement construction + cache key generation (µs/query)")
+    for name, (build, prebuilt, _) in rebuilt_cases().items():
+        before = per_call(lambda: build()._generate_cache_key(), rounds)
+        after = per_call(lambda: prebuilt._generate_cache_key(), rounds)
+        print(f"  {name:<20} rebuilt {before:8.2f}   pre-built {after:8.2f}")
+
+
+async def bench_execution(rounds: int) -> None:
+    url = make_url(settings.database_url).update_query_dict(
+        {"prepared_statement_cache_size": str(settings.db_prepared_statement_cache_size)}
+    )
+    engine = create_async_engine(url, pool_size=1)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    print("Execution on one warm connection, whole round trip (µs/query)")
+    async with session_factory() as session:
+        for name, (build, prebuilt, params) in rebuilt_cases().items():
+            for _ in range(100):
+                await session.execute(build())
+                await session.execute(prebuilt, params)
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                (await session.execute(build())).scalars().all()
+            before = (time.perf_counter() - start) / rounds * 1e6
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                (await session.execute(prebuilt, params)).scalars().all()
+            after = (time.perf_counter() - start) / rounds * 1e6
+            print(f"  {name:<20} rebuilt {before:8.2f}   pre-built {after:8.2f}")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5_000)
+    parser.add_argument("--db", action="store_true", help="also execute against the database")
+    args = parser.parse_args()
+
+    bench_construction(args.rounds)
+    if args.db:
+        asyncio.run(bench_execution(args.rounds))
+
+
+if __name__ == "__main__":
+    main()
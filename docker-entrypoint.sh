@@ -20,9 +20,20 @@ else
     exit 1
 fi
 
-echo "🔄 Running Alembic migrations..."
-alembic upgrade head
-echo "✅ Migrations applied."
+# Returns at once when the database is already at head; replicas starting
+# together take an advisory lock so that only one of them migrates
+echo "🔄 Checking Alembic migrations..."
+python -m src.cli migrate || exit 1
+
+if [ "$SERVER_MODE" = "worker" ]; then
+    echo "Starting job worker..."
+    exec python -m src.worker
+fi
+
+if [ "$SERVER_MODE" = "production" ]; then
+    echo "Starting production server..."
+    exec python -m src.server
+fi
 
 echo "Starting Uvicorn..."
 exec uvicorn src.main:app --host 0.0.0.0 --port 8000 --log-level debug
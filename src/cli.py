@@ -0,0 +1,105 @@
+"""
+Command-line entry points.
+
+    python -m src.cli migrate
+    python -m src.cli import books.csv
+    python -m src.cli import feed.ndjson --chunk-size 20000 --workers 4
+    python -m src.cli export snapshot/ --format arrow --partition-by-seller
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from src.configurations.settings import settings
+
+
+def run_migrate(args: argparse.Namespace) -> int:
+    from src.configurations.migrations import migrate
+
+    started = time.perf_counter()
+    applied = migrate()
+    elapsed = time.perf_counter() - started
+    print(f"{'Migrations applied' if applied else 'Already at head'} in {elapsed:.2f}s")
+    return 0
+
+
+def run_import(args: argparse.Namespace) -> int:
+    from src.utils.imports import import_file
+
+    def progress(report):
+        print(f"\r{report.read} rows, {report.rows_per_second:,.0f} rows/s", end="", file=sys.stderr)
+
+    report = asyncio.run(
+        import_file(
+            settings.database_url.replace("+asyncpg", ""),
+            args.path,
+            fmt=args.format,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            progress=progress,
+        )
+    )
+    print(file=sys.stderr)
+    for error in report.errors:
+        print(error, file=sys.stderr)
+    print(report.summary())
+    return 1 if report.invalid or report.unknown_seller else 0
+
+
+def run_export(args: argparse.Namespace) -> int:
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from src.utils.exports import SNAPSHOT_OPTIONS, export_snapshot
+
+    async def run():
+        engine = create_async_engine(settings.database_url, poolclass=NullPool)
+        try:
+            async with engine.connect() as connection:
+                connection = await connection.execution_options(**SNAPSHOT_OPTIONS)
+                return await export_snapshot(
+                    connection, args.directory, args.format, args.partition_by_seller, args.batch_size
+                )
+        finally:
+            await engine.dispose()
+
+    started = time.perf_counter()
+    counts = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    rows = sum(counts.values())
+    print(
+        ", ".join(f"{count} {table}" for table, count in counts.items())
+        + f" in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)"
+    )
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrator = commands.add_parser("migrate", help="Apply pending Alembic migrations, if any")
+    migrator.set_defaults(handler=run_migrate)
+
+    importer = commands.add_parser("import", help="Upsert books from a CSV or NDJSON file")
+    importer.add_argument("path", type=Path)
+    importer.add_argument("--format", choices=("csv", "ndjson"), help="default: from the file extension")
+    importer.add_argument("--chunk-size", type=int, default=50_000, help="rows per COPY and merge")
+    importer.add_argument("--workers", type=int, help="validation processes (default: CPU count)")
+    importer.set_defaults(handler=run_import)
+
+    exporter = commands.add_parser("export", help="Write books and sellers as Parquet or Arrow files")
+    exporter.add_argument("directory", type=Path)
+    exporter.add_argument("--format", choices=("parquet", "arrow"), default="parquet")
+    exporter.add_argument("--partition-by-seller", action="store_true", help="one books file per seller")
+    exporter.add_argument("--batch-size", type=int, default=65_536, help="rows per row group")
+    exporter.set_defaults(handler=run_export)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,13 @@
-from .database import *
+from importlib import import_module
 
-__all__ = database.__all__
+
+def __getattr__(name):
+    # `database` is imported on first use, so that importing just the
+    # settings (the CLI, migrations) does not load FastAPI and the ORM
+    database = import_module(".database", __name__)
+    if name == "__all__":
+        return database.__all__
+    try:
+        return getattr(database, name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
@@ -1,12 +1,19 @@
 import asyncio
+import functools
 import logging
 import sys
+from contextvars import ContextVar
+from typing import Callable, Optional
 
-from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
+from fastapi import Request
+from fastapi.routing import APIRoute, request_response
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (AsyncConnection, AsyncEngine,
+                                    AsyncSession, async_sessionmaker,
                                     create_async_engine)
+from sqlalchemy.orm import Session
 
-from alembic import command
-from alembic.config import Config
 from src.configurations.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -15,12 +22,27 @@ SQLALCHEMY_DATABASE_URL = settings.database_url
 
 __async_engine = None
 __session_factory = None
+__read_session_factory = None
+
+# The session handed to the current request by get_async_session()
+_request_session: ContextVar[Optional[AsyncSession]] = ContextVar("request_session", default=None)
+# statement_timeout (ms) for the current request, set by route deadlines
+statement_timeout: ContextVar[Optional[int]] = ContextVar("statement_timeout", default=None)
+
+READ_METHODS = frozenset({"GET", "HEAD"})
 
 __all__ = [
     "global_init",
     "get_async_session",
+    "get_session_factory",
+    "warm_up",
+    "drain",
+    "release_request_session",
+    "statement_timeout",
+    "SessionReleasingRoute",
     "run_alembic_upgrade",
     "create_db_and_tables",
+    "on_commit",
 ]
 
 
@@ -28,46 +50,243 @@ def global_init() -> None:
     """
     Initializes the async database engine and session factory.
     """
-    global __async_engine, __session_factory
+    global __async_engine, __session_factory, __read_session_factory
     if __session_factory:
         return
     if not __async_engine:
-        __async_engine = create_async_engine(url=SQLALCHEMY_DATABASE_URL, echo=True)
+        # asyncpg keeps a per-connection cache of prepared statements, keyed by SQL text
+        url = make_url(SQLALCHEMY_DATABASE_URL).update_query_dict(
+            {"prepared_statement_cache_size": str(settings.db_prepared_statement_cache_size)}
+        )
+        __async_engine = create_async_engine(
+            url=url,
+            echo=settings.db_echo,
+            pool_size=settings.max_connection_count,
+            max_overflow=settings.db_max_overflow,
+            query_cache_size=settings.db_query_cache_size,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            connect_args={
+                "server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}
+            },
+        )
+        event.listen(__async_engine.sync_engine, "connect", _record_statement_timeout)
     __session_factory = async_sessionmaker(__async_engine, expire_on_commit=False)
+    # Reads run each statement in its own implicit transaction: no BEGIN/COMMIT
+    # round trips. Shares the pool; the isolation level is reset on checkin.
+    __read_session_factory = async_sessionmaker(
+        __async_engine.execution_options(isolation_level="AUTOCOMMIT"),
+        expire_on_commit=False,
+    )
+
+
+async def warm_up(
+    statements: dict[str, tuple], connections: int, engine: Optional[AsyncEngine] = None
+) -> None:
+    """
+    Opens `connections` pooled connections and runs `statements` (name ->
+    (statement, sample parameters)) on each, so that the SQL is compiled
+    once and prepared on every connection before the first request. Each
+    connection's work is rolled back.
+    """
+    engine = engine or __async_engine
+    if engine is None:
+        raise ValueError("You must call global_init() before using this method")
+
+    async def warm(connection: AsyncConnection) -> None:
+        async with AsyncSession(bind=connection) as session:
+            for name, (statement, params) in statements.items():
+                await session.execute(statement, params)
+            await session.rollback()
+
+    # Never more than the pool keeps open
+    if hasattr(engine.pool, "size"):
+        connections = min(connections, engine.pool.size())
+    # All checked out at once, so that each one is a distinct connection
+    opened = [await engine.connect() for _ in range(connections)]
+    try:
+        await asyncio.gather(*(warm(connection) for connection in opened))
+    finally:
+        for connection in opened:
+            await connection.close()
+    logger.info("Warmed up %d connections, %d statements", connections, len(statements))
+
+
+async def drain(timeout: float, engine: Optional[AsyncEngine] = None) -> None:
+    """
+    Waits up to `timeout` seconds for checked-out connections to come back
+    to the pool, then closes all of them.
+    """
+    engine = engine or __async_engine
+    if engine is None:
+        return
 
+    loop = asyncio.get_running_loop()
+    give_up = loop.time() + timeout
+    while engine.pool.checkedout() and loop.time() < give_up:
+        await asyncio.sleep(0.05)
+    if busy := engine.pool.checkedout():
+        logger.warning("Closing the pool with %d connections still in use", busy)
+    await engine.dispose()
 
 
-async def get_async_session() -> AsyncSession:
+def get_session_factory() -> async_sessionmaker:
+    """
+    Returns the session factory, for code that runs outside a request.
+    """
+    if not __session_factory:
+        raise ValueError("You must call global_init() before using this method")
+    return __session_factory
+
+
+async def get_async_session(request: Request) -> AsyncSession:
     """
     Provides an async database session.
+
+    The session only checks out a connection when it first runs a statement.
+    GET and HEAD requests get an autocommit session; other requests run in a
+    transaction that is committed only if something was written. Routes using
+    `SessionReleasingRoute` give the connection back as soon as the endpoint
+    returns, before the response is serialised.
     """
-    global __session_factory
     if not __session_factory:
         raise ValueError("You must call global_init() before using this method")
 
-    session: AsyncSession = __session_factory()
+    factory = __read_session_factory if request.method in READ_METHODS else __session_factory
+    session: AsyncSession = factory()
+    token = _request_session.set(session)
     try:
         yield session
-        await session.commit()
+        await _finish(session)
     except Exception as e:
         logger.error("Exception occurred: %s", e)
         raise e
     finally:
-        await session.rollback()
+        _request_session.reset(token)
+        # Returning the connection to the pool rolls back anything left open
         await session.close()
 
 
+async def release_request_session() -> None:
+    """
+    Commits (if needed) and closes the current request's session early.
+    """
+    session = _request_session.get()
+    if session is not None:
+        await _finish(session)
+        await session.close()
+
+
+async def _finish(session: AsyncSession) -> None:
+    sync_session = session.sync_session
+    if sync_session.info.pop("released", False):
+        return
+    if sync_session.info.get("has_writes") or session.new or session.dirty or session.deleted:
+        await session.commit()
+    sync_session.info["released"] = True
+
+
+class SessionReleasingRoute(APIRoute):
+    """
+    Route that releases the request's database session when the endpoint
+    returns, instead of after the response has been serialised.
+
+    Endpoints must not lazy-load attributes of the objects they return.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        call = self.dependant.call
+        if not asyncio.iscoroutinefunction(call):
+            return
+
+        @functools.wraps(call)
+        async def release_after(*args, **kwargs):
+            result = await call(*args, **kwargs)
+            await release_request_session()
+            return result
+
+        self.dependant.call = release_after
+        self.app = request_response(self.get_route_handler())
+
+
+def on_commit(session: AsyncSession, callback: Callable, *args) -> None:
+    """
+    Schedules `callback(*args)` to run once the session's current transaction
+    commits. Callbacks are discarded if the transaction is rolled back.
+    """
+    session.sync_session.info.setdefault("on_commit", []).append((callback, args))
+
+
+@event.listens_for(Session, "after_commit")
+def _run_commit_callbacks(session: Session) -> None:
+    for callback, args in session.info.pop("on_commit", ()):
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error("Commit callback %r failed: %s", callback, e)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_commit_callbacks(session: Session) -> None:
+    session.info.pop("on_commit", None)
+
+
+def _record_statement_timeout(dbapi_connection, connection_record) -> None:
+    connection_record.info["statement_timeout"] = settings.db_statement_timeout_ms
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session: Session, transaction, connection) -> None:
+    """
+    Gives the connection the current request's statement_timeout.
+
+    The value last set on each connection is remembered, so requests with the
+    usual timeout cost no extra round trip. Autocommit connections are changed
+    for the session; in a transaction, SET LOCAL reverts on commit/rollback.
+    """
+    info = connection.connection.info
+    current = info.get("statement_timeout")
+    wanted = statement_timeout.get()
+    if wanted is None:
+        if current is None or current == settings.db_statement_timeout_ms:
+            return
+        wanted = settings.db_statement_timeout_ms
+    elif wanted == current:
+        return
+
+    if connection.get_execution_options().get("isolation_level") == "AUTOCOMMIT":
+        connection.exec_driver_sql(f"SET statement_timeout = {int(wanted)}")
+        info["statement_timeout"] = wanted
+    else:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(wanted)}")
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush_written(session: Session, flush_context) -> None:
+    session.info["has_writes"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement_written(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["has_writes"] = True
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _reset_written(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop("has_writes", None)
+
+
 def run_alembic_upgrade():
     """
     Runs Alembic migrations synchronously. Ensures that all migrations are applied.
     """
-    logger.info("Running Alembic migrations...")
-    alembic_cfg = Config("alembic.ini")
-    alembic_cfg.set_main_option(
-        "sqlalchemy.url", settings.database_url.replace("+asyncpg", "")
-    )
-    command.upgrade(alembic_cfg, "head")
-    logger.info("✅ Alembic migrations applied successfully.")
+    # Alembic is imported only if the database is behind
+    from src.configurations.migrations import migrate
+
+    if not migrate():
+        logger.info("Database is already at the latest migration.")
 
 
 async def create_db_and_tables():
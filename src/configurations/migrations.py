@@ -0,0 +1,109 @@
+"""
+Migration-aware startup.
+
+`migrate()` is what a booting container runs instead of `alembic upgrade
+head`. The common case, a database that is already at head, is answered
+with one query and without importing alembic: the head revisions are read
+straight from the version files. Only when the database is behind does it
+take a Postgres advisory lock, check again and run the alembic upgrade, so
+replicas starting together apply each migration once and the rest go on
+without waiting for each other.
+"""
+import ast
+import logging
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.pool import NullPool
+
+from src.configurations.settings import settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["MIGRATION_LOCK_ID", "current_revisions", "head_revisions", "migrate"]
+
+ALEMBIC_INI = "alembic.ini"
+# script_location in alembic.ini
+VERSIONS_DIRECTORY = Path("alembic") / "versions"
+
+# Key of the session-level advisory lock held while migrating
+MIGRATION_LOCK_ID = 0x6D696772617465  # "migrate"
+
+
+def _sync_url(url: Optional[str] = None) -> str:
+    return (url or settings.database_url).replace("+asyncpg", "")
+
+
+def head_revisions(directory: Path = VERSIONS_DIRECTORY) -> set[str]:
+    """
+    Head revisions of the migration scripts in `directory`.
+
+    Reads the `revision` and `down_revision` assignments with `ast` instead
+    of loading the scripts through alembic.
+    """
+    revisions, parents = set(), set()
+    for path in directory.glob("*.py"):
+        values = {}
+        for node in ast.parse(path.read_bytes(), str(path)).body:
+            if isinstance(node, ast.AnnAssign) and node.value is not None:
+                target, value = node.target, node.value
+            elif isinstance(node, ast.Assign) and len(node.targets) == 1:
+                target, value = node.targets[0], node.value
+            else:
+                continue
+            if isinstance(target, ast.Name) and target.id in ("revision", "down_revision"):
+                values[target.id] = ast.literal_eval(value)
+        if "revision" not in values:
+            continue
+        revisions.add(values["revision"])
+        down = values.get("down_revision")
+        parents.update(down if isinstance(down, (tuple, list)) else [down] if down else [])
+    return revisions - parents
+
+
+def current_revisions(connection: Connection) -> set[str]:
+    """Revisions recorded in alembic_version; empty for a fresh database."""
+    if connection.scalar(text("SELECT to_regclass('alembic_version')")) is None:
+        return set()
+    return set(connection.scalars(text("SELECT version_num FROM alembic_version")))
+
+
+def _upgrade(url: str) -> None:
+    # Imported here: alembic is only needed when there is something to apply
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+
+
+def migrate(url: Optional[str] = None) -> bool:
+    """
+    Brings the database up to head. Returns True if migrations were applied,
+    False if it already was at head.
+    """
+    url = _sync_url(url)
+    heads = head_revisions()
+    engine = create_engine(url, poolclass=NullPool)
+    try:
+        with engine.connect() as connection:
+            connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+            if current_revisions(connection) == heads:
+                return False
+
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_ID})
+            try:
+                # Another replica may have migrated while we waited for the lock
+                if current_revisions(connection) == heads:
+                    return False
+                logger.info("Running Alembic migrations...")
+                _upgrade(url)
+                logger.info("✅ Alembic migrations applied successfully.")
+                return True
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_ID})
+    finally:
+        engine.dispose()
@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 
 from dotenv import load_dotenv
 from pydantic import BaseModel
@@ -14,7 +15,38 @@ class Settings(BaseSettings):
     db_password: str = os.getenv("DB_PASSWORD", "postgres_pass")
     db_test_name: str = os.getenv("DB_TEST_NAME", "fastapi_project_test_db")
     db_port: int = int(os.getenv("DB_PORT", 5432))
+    # Pooled connections per process: max_connection_count + db_max_overflow
     max_connection_count: int = 10
+    db_max_overflow: int = 5
+    db_echo: bool = True
+    db_query_cache_size: int = 1200
+    db_prepared_statement_cache_size: int = 500
+    # Postgres statement_timeout unless the route sets a deadline of its own
+    db_statement_timeout_ms: int = 10_000
+    # Fail fast with 503 instead of queueing when no pooled connection frees up
+    db_pool_timeout_seconds: float = 1.0
+    # Connections opened and primed with the hot statements at startup
+    db_warmup_connections: int = 5
+    # How long shutdown waits for in-use connections before closing the pool
+    db_drain_timeout_seconds: float = 10.0
+
+    # Production server (python -m src.server)
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    # Worker processes; defaults to the CPU count
+    server_workers: Optional[int] = None
+    server_keep_alive_seconds: int = 5
+    server_backlog: int = 2048
+    # Above this many open connections and tasks a worker answers 503
+    server_limit_concurrency: Optional[int] = None
+    server_log_level: str = "info"
+    server_access_log: bool = False
+    # Containers running the server against the same database
+    server_replicas: int = 1
+    # Postgres max_connections; asked from the server when unset
+    db_max_connections: Optional[int] = None
+    # Left for migrations, admin sessions and other clients
+    db_reserved_connections: int = 10
 
     postgres_user: str = os.getenv("POSTGRES_USER", "postgres_user")
     postgres_password: str = os.getenv("POSTGRES_PASSWORD", "postgres_pass")
@@ -23,6 +55,105 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    idempotency_ttl_seconds: int = 24 * 60 * 60
+    # How long a retry waits for a request still running on another worker before 409
+    idempotency_wait_seconds: float = 10.0
+    idempotency_purge_interval_seconds: int = 60
+
+    compression_minimum_size: int = 1024
+    compression_offload_size: int = 256 * 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+
+    change_feed_queue_size: int = 256
+    change_feed_heartbeat_seconds: int = 15
+
+    # How often the facets snapshot catches up with writes of other workers and hosts
+    catalogue_refresh_seconds: float = 2.0
+
+    # Opt-in group commit for POST /api/v1/books/
+    book_write_batching: bool = False
+    book_write_batch_window_ms: float = 2.0
+    book_write_batch_max_size: int = 500
+
+    # Catalogue change webhooks, delivered from the outbox; off while empty
+    webhook_urls: list[str] = []
+    # Events per POST, and outbox rows locked per delivery round
+    webhook_batch_size: int = 100
+    webhook_claim_size: int = 500
+    # Requests in flight per worker, over all destinations
+    webhook_concurrency: int = 8
+    webhook_timeout_seconds: float = 5.0
+    webhook_poll_interval_seconds: float = 1.0
+    # Retried with exponential backoff, then kept as failed
+    webhook_max_attempts: int = 12
+    webhook_retry_base_seconds: float = 1.0
+    webhook_retry_max_seconds: float = 600.0
+    # Claimed events are hidden from other dispatchers while being delivered;
+    # outlasts a round of requests
+    webhook_lease_seconds: float = 60.0
+
+    # Background job queue and its workers (python -m src.worker)
+    job_worker_concurrency: int = 8
+    job_poll_interval_seconds: float = 1.0
+    # A job whose worker stops extending its lease is claimed again after this long
+    job_visibility_timeout_seconds: float = 30.0
+    # Per run, unless the job kind sets its own
+    job_timeout_seconds: float = 300.0
+    job_max_attempts: int = 5
+    job_retry_base_seconds: float = 2.0
+    job_retry_max_seconds: float = 600.0
+    # How long a stopping worker waits for running jobs
+    job_shutdown_timeout_seconds: float = 30.0
+    # Worker processes against the same database; their connections are
+    # taken out of the server's budget
+    job_worker_replicas: int = 1
+
+    # Rendered book and seller responses, shared by the workers of a host
+    shared_cache_enabled: bool = True
+    # Defaults to a file in /dev/shm named after the database and the layout
+    shared_cache_path: str = ""
+    shared_cache_slots: int = 4096
+    shared_cache_slot_size: int = 4096
+    shared_cache_generations: int = 65536
+    # Bounds how long writes made on other hosts go unseen
+    shared_cache_ttl_seconds: float = 5.0
+
+    # List responses cached per worker, invalidated by table and seller tags
+    result_cache_max_bytes: int = 64 * 1024 * 1024
+    result_cache_ttl_seconds: float = 5.0
+    # How long an expired entry is still served while it is refreshed
+    result_cache_stale_seconds: float = 30.0
+
+    # Write-behind audit log of book and seller changes
+    audit_enabled: bool = True
+    # Events per COPY, and the longest an event waits for one
+    audit_batch_size: int = 1000
+    audit_flush_interval_ms: float = 200.0
+    # Held in memory while the database is unreachable; beyond, the oldest are dropped
+    audit_max_buffer: int = 100_000
+    audit_retry_seconds: float = 1.0
+
+    # Event-loop lag monitor and blocking-call detector, for staging
+    loop_monitor_enabled: bool = False
+    loop_monitor_interval_ms: float = 20.0
+    # Stalls longer than this are reported with the blocking stack
+    loop_monitor_threshold_ms: float = 100.0
+    loop_monitor_max_reports: int = 20
+
+    # On-demand request profiling; off while the token is empty
+    profiling_token: str = ""
+    profiling_interval_ms: float = 1.0
+    profiling_max_profiles: int = 50
+
+    # Adaptive concurrency limit in front of the database-bound routes
+    db_limiter_initial: int = 20
+    db_limiter_min: int = 2
+    db_limiter_max: int = 200
+    db_limiter_target_latency_ms: float = 250.0
+    db_limiter_queue_timeout_ms: float = 100.0
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -1,18 +1,70 @@
+import asyncio
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
-from src.configurations.database import global_init
+from src.configurations.database import drain, global_init, warm_up
+from src.configurations.settings import settings
 from src.routers import v1_router
+from src.utils.audit import AuditMiddleware, audit_log
+from src.utils.batching import book_writer
+from src.utils.changes import change_feed
+from src.utils.compression import CompressionMiddleware
+from src.utils.idempotency import IdempotencyMiddleware, idempotency_store
+from src.utils.loop_monitor import LoopMonitorMiddleware, loop_monitor
+from src.utils.outbox import outbox_dispatcher
+from src.utils.overload import Overloaded, handle_overload
+from src.utils.profiling import ProfilingMiddleware
+from src.utils.result_cache import result_cache
+from src.utils.statements import HOT_STATEMENTS
+
+
+async def warm_pool(app: FastAPI) -> None:
+    """Warms the pool, retrying until the database is reachable, then reports ready."""
+    while True:
+        try:
+            await warm_up(HOT_STATEMENTS, settings.db_warmup_connections)
+        except (OSError, SQLAlchemyError) as e:
+            print(f"⏳ Database warm-up failed, retrying: {e}")
+            await asyncio.sleep(1)
+        else:
+            app.state.ready = True
+            print("✅ Connection pool warmed up, ready for traffic")
+            return
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 Running global_init() at startup...")
     global_init()
+    if settings.loop_monitor_enabled:
+        await loop_monitor.start()
+    if settings.audit_enabled:
+        await audit_log.start()
+    app.state.ready = False
+    warming = asyncio.create_task(warm_pool(app))
+    purger = asyncio.create_task(
+        idempotency_store.run_purger(settings.idempotency_purge_interval_seconds)
+    )
+    if settings.webhook_urls:
+        outbox_dispatcher.start()
     yield
     print("🛑 FastAPI is shutting down...")
+    app.state.ready = False
+    warming.cancel()
+    purger.cancel()
+    await book_writer.close()
+    await outbox_dispatcher.close()
+    # After the last writes have committed, so that their events are in the buffer
+    await audit_log.close()
+    await change_feed.close()
+    await result_cache.close()
+    await drain(settings.db_drain_timeout_seconds)
+    await loop_monitor.stop()
 
 app = FastAPI(
     title="Book Library App",
@@ -25,6 +77,24 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Shed load with 503 (pool exhausted, limiter full) or 504 (statement_timeout)
+app.add_exception_handler(Overloaded, handle_overload)
+app.add_exception_handler(PoolTimeoutError, handle_overload)
+app.add_exception_handler(DBAPIError, handle_overload)
+
+if settings.loop_monitor_enabled:
+    # Attributes event-loop stalls to the route being served
+    app.add_middleware(LoopMonitorMiddleware, monitor=loop_monitor)
+
+if settings.audit_enabled:
+    # Lets the audit log tell who made each change
+    app.add_middleware(AuditMiddleware)
+
+# Retried POSTs carrying an Idempotency-Key get the original response back
+app.add_middleware(
+    IdempotencyMiddleware,
+    paths=("/api/v1/books/", "/api/v1/sellers/"),
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -34,8 +104,22 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Requests carrying X-Profile-Token (or sampled) are profiled
+app.add_middleware(ProfilingMiddleware)
+
+# Outermost, so that every response body leaving the app is compressed once
+app.add_middleware(CompressionMiddleware)
+
 @app.get("/")
 async def root():
     return {"message": "Book Library API is running. Visit http://localhost:8000/api/v1/redoc for documentation"}
 
+
+@app.get("/ready")
+async def ready(request: Request):
+    """Readiness probe: 503 until the pool is warmed up, and again while shutting down."""
+    if getattr(request.app.state, "ready", False):
+        return {"status": "ready"}
+    return ORJSONResponse({"status": "not ready"}, status_code=503)
+
 app.include_router(v1_router)
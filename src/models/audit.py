@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import BigInteger, DateTime, Index, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+
+class AuditEntry(BaseModel):
+    """A committed change to a book or a seller, written in batches by src/utils/audit.py."""
+
+    __tablename__ = "audit_log"
+    # "Who changed this book, and when?"
+    __table_args__ = (Index("ix_audit_log_entity", "entity", "entity_id", "occurred_at"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    occurred_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # Subject of the request's bearer token; None for anonymous requests
+    actor: Mapped[Optional[str]] = mapped_column(String(320))
+    client: Mapped[Optional[str]] = mapped_column(String(64))
+    action: Mapped[str] = mapped_column(String(32), nullable=False)
+    entity: Mapped[str] = mapped_column(String(16), nullable=False)
+    entity_id: Mapped[int] = mapped_column(nullable=False)
+    # The created or deleted row, or {field: [old, new]} for updates
+    changes: Mapped[Optional[dict[str, Any]]] = mapped_column(JSONB)
@@ -1,17 +1,36 @@
-from sqlalchemy import ForeignKey, String
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import (BigInteger, CheckConstraint, ForeignKey, Numeric, String,
+                        UniqueConstraint)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import BaseModel
+from .tombstones import NEXT_CHANGE_SEQ
 
 
 class Book(BaseModel):
     __tablename__ = "books_table"
+    # Natural key for partner feed imports; see POST /api/v1/books/import
+    __table_args__ = (
+        UniqueConstraint("seller_id", "isbn", name="uq_books_table_seller_id_isbn"),
+        # Purchases decrement stock conditionally; this is the last line of defence
+        CheckConstraint("stock >= 0", name="ck_books_table_stock_non_negative"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(String(50), nullable=False)
     author: Mapped[str] = mapped_column(String(100), nullable=False)
     year: Mapped[int]
     pages: Mapped[int]
+    isbn: Mapped[Optional[str]] = mapped_column(String(13))
+    price: Mapped[Decimal] = mapped_column(Numeric(10, 2), server_default="0", nullable=False)
+    stock: Mapped[int] = mapped_column(server_default="0", nullable=False)
+
+    # Bumped by a trigger on every change; see GET /api/v1/books/changes
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, server_default=NEXT_CHANGE_SEQ, index=True
+    )
 
     seller_id: Mapped[int] = mapped_column(ForeignKey("sellers.id"), nullable=False)
     seller = relationship("Seller", back_populates="books")
@@ -0,0 +1,39 @@
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import Boolean, DateTime, Index, LargeBinary, SmallInteger, Uuid, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+
+class IdempotencyKey(BaseModel):
+    """
+    An Idempotency-Key seen on a create request; see src/utils/idempotency.py.
+
+    Claimed in the transaction that makes the change, so the row commits or
+    rolls back with it; the response is filled in once it has been sent.
+    """
+
+    __tablename__ = "idempotency_keys"
+    # The purger deletes expired keys
+    __table_args__ = (Index("ix_idempotency_keys_expires_at", "expires_at"),)
+
+    # SHA-256 of the path, the caller's credentials and the key
+    key: Mapped[bytes] = mapped_column(LargeBinary(32), primary_key=True)
+    # SHA-256 of the request body
+    fingerprint: Mapped[bytes] = mapped_column(LargeBinary(32), nullable=False)
+    # The request holding the claim; its response is only stored under the same lease
+    lease: Mapped[Optional[uuid.UUID]] = mapped_column(Uuid)
+    # None while the response has not been stored yet
+    status: Mapped[Optional[int]] = mapped_column(SmallInteger)
+    # [name, value] pairs needed to replay the response
+    headers: Mapped[Optional[list[Any]]] = mapped_column(JSONB)
+    body: Mapped[Optional[bytes]] = mapped_column(LargeBinary)
+    compressed: Mapped[bool] = mapped_column(Boolean, server_default="false", nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,50 @@
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import BigInteger, DateTime, Index, SmallInteger, String, Text, Uuid, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+
+class Job(BaseModel):
+    """
+    A background job; see src/utils/jobs.py.
+
+    A job is claimable once `visible_at` has passed. Claiming it pushes
+    `visible_at` one visibility timeout ahead, which the worker keeps
+    extending while the job runs; retries push it back by the backoff.
+    Finished jobs are deleted.
+    """
+
+    __tablename__ = "jobs"
+    # Claims scan the jobs still to run, highest priority and longest due first
+    __table_args__ = (
+        Index(
+            "ix_jobs_ready",
+            text("priority DESC"),
+            "visible_at",
+            postgresql_where=text("failed_at IS NULL"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(64), nullable=False)
+    # Keyword arguments of the handler
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB, server_default="{}", nullable=False)
+    priority: Mapped[int] = mapped_column(SmallInteger, server_default="0", nullable=False)
+    visible_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    attempts: Mapped[int] = mapped_column(server_default="0", nullable=False)
+    max_attempts: Mapped[int] = mapped_column(nullable=False)
+    # The worker holding the job; its acknowledgements are ignored once another one took over
+    lease: Mapped[Optional[uuid.UUID]] = mapped_column(Uuid)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    # Set once the job has run out of attempts; kept for inspection
+    failed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
@@ -0,0 +1,25 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Numeric, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+
+class Order(BaseModel):
+    """A purchase of `quantity` copies of a book at its price at the time."""
+
+    __tablename__ = "orders"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # Orders outlive the books they were placed for
+    book_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("books_table.id", ondelete="SET NULL"), index=True
+    )
+    quantity: Mapped[int] = mapped_column(nullable=False)
+    unit_price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
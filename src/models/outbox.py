@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import BigInteger, DateTime, Index, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+
+class OutboxEvent(BaseModel):
+    """
+    A catalogue change waiting to be delivered to one webhook destination.
+
+    Written in the transaction that made the change and deleted once
+    delivered; see src/utils/outbox.py.
+    """
+
+    __tablename__ = "webhook_outbox"
+    # The dispatcher only ever scans rows that are still to be delivered
+    __table_args__ = (
+        Index("ix_webhook_outbox_pending", "available_at", postgresql_where=text("failed_at IS NULL")),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    destination: Mapped[str] = mapped_column(String(2048), nullable=False)
+    # The event as POSTed: id, type, occurred_at and data
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    # Pushed back after each failed attempt
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    attempts: Mapped[int] = mapped_column(server_default="0", nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    # Set once the event has run out of attempts; kept for inspection
+    failed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
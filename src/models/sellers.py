@@ -1,7 +1,8 @@
-from sqlalchemy import String
+from sqlalchemy import BigInteger, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import BaseModel
+from .tombstones import NEXT_CHANGE_SEQ
 
 
 class Seller(BaseModel):
@@ -13,6 +14,11 @@ class Seller(BaseModel):
     e_mail: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
     password: Mapped[str] = mapped_column(String(100), nullable=False)
 
+    # Bumped by a trigger on every change
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, server_default=NEXT_CHANGE_SEQ, index=True
+    )
+
     books: Mapped[list["Book"]] = relationship(
         "Book", back_populates="seller", cascade="all, delete-orphan"
     )
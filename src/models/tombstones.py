@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from sqlalchemy import (BigInteger, DateTime, Index, Integer, Sequence, String,
+                        func, text)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+# Shared by books_table, sellers and catalogue_tombstones, so one number orders all changes.
+catalogue_change_seq = Sequence("catalogue_change_seq", metadata=BaseModel.metadata)
+# Takes the transaction id first, then a number; see ChangeWatermark
+NEXT_CHANGE_SEQ = text("next_catalogue_change_seq()")
+
+
+class Tombstone(BaseModel):
+    """A deleted book or seller, written by the record_catalogue_tombstone() trigger."""
+
+    __tablename__ = "catalogue_tombstones"
+    __table_args__ = (Index("ix_catalogue_tombstones_entity_seq", "entity", "seq"),)
+
+    seq: Mapped[int] = mapped_column(
+        BigInteger, server_default=NEXT_CHANGE_SEQ, primary_key=True
+    )
+    entity: Mapped[str] = mapped_column(String(16), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    seller_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
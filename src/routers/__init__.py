@@ -2,6 +2,10 @@ from fastapi import APIRouter
 
 from .v1.auth import auth_router
 from .v1.books import books_router
+from .v1.changes import changes_router
+from .v1.exports import exports_router
+from .v1.metrics import metrics_router
+from .v1.profiling import profiling_router
 from .v1.sellers import sellers_router
 
 v1_router = APIRouter(tags=["v1"], prefix="/api/v1")
@@ -9,3 +13,7 @@ v1_router = APIRouter(tags=["v1"], prefix="/api/v1")
 v1_router.include_router(books_router)
 v1_router.include_router(sellers_router)
 v1_router.include_router(auth_router)
+v1_router.include_router(changes_router)
+v1_router.include_router(metrics_router)
+v1_router.include_router(exports_router)
+v1_router.include_router(profiling_router)
@@ -1,17 +1,22 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.configurations import get_async_session
-from src.models.sellers import Seller
+from src.configurations import SessionReleasingRoute, get_async_session
 from src.schemas import (IncomingSeller, LoginSeller, ReturnedAllSellers,
                          ReturnedSeller)
 from src.utils.auth import (create_access_token, get_current_user,
                             verify_password)
+from src.utils.overload import limit_db_concurrency
+from src.utils.statements import SELLER_BY_EMAIL
 
-auth_router = APIRouter(tags=["auth"], prefix="/auth")
+auth_router = APIRouter(
+    tags=["auth"],
+    prefix="/auth",
+    route_class=SessionReleasingRoute,
+    dependencies=[Depends(limit_db_concurrency)],
+)
 
 DBSession = Annotated[AsyncSession, Depends(get_async_session)]
 
@@ -19,9 +24,7 @@ DBSession = Annotated[AsyncSession, Depends(get_async_session)]
 @auth_router.post("/token")
 async def login_for_access_token(seller: LoginSeller, session: DBSession):
     """Authenticate seller and return JWT token."""
-    result = await session.execute(
-        select(Seller).filter(Seller.e_mail == seller.e_mail)
-    )
+    result = await session.execute(SELLER_BY_EMAIL, {"e_mail": seller.e_mail})
     seller_from_db = result.scalar_one_or_none()
 
     if not seller_from_db or not verify_password(
@@ -1,18 +1,44 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.configurations import get_async_session
+from src.configurations import SessionReleasingRoute, get_async_session, on_commit
+from src.configurations.settings import settings
 from src.models.books import Book
 from src.models.sellers import Seller
-from src.schemas import IncomingBook, ReturnedAllBooks, ReturnedBook
+from src.models.tombstones import Tombstone
+from src.schemas import (BookInventory, IncomingBook, IncomingBookImport,
+                         IncomingPurchase, ReturnedAllBooks, ReturnedBook,
+                         ReturnedBookChanges, ReturnedBookFacets,
+                         ReturnedBookImport, ReturnedOrder)
+from src.utils.audit import audit, changed_fields
+from src.utils.batching import book_writer
+from src.utils.catalogue import catalogue
+from src.utils.changes import change_watermark
+from src.utils.fields import sparse_fields
+from src.utils.imports import upsert_books
+from src.utils.outbox import book_payload, enqueue
+from src.utils.overload import deadline, limit_db_concurrency
+from src.utils.result_cache import cache_key, refresh_with_session, result_cache
+from src.utils.shared_cache import (BOOKS_TABLE, book_entity, response_cache,
+                                    seller_entity)
+from src.utils.singleflight import book_flights
+from src.utils.statements import (ALL_BOOKS, BOOK_BY_ID, BOOK_INVENTORY,
+                                  BOOKS_BY_SELLER, PURCHASE, SELLER_EXISTS)
 
-books_router = APIRouter(tags=["books"], prefix="/books")
+books_router = APIRouter(
+    tags=["books"],
+    prefix="/books",
+    route_class=SessionReleasingRoute,
+    dependencies=[Depends(limit_db_concurrency)],
+)
 
 # Dependency injection
 DBSession = Annotated[AsyncSession, Depends(get_async_session)]
+BookFields = Annotated[Optional[tuple[str, ...]], Depends(sparse_fields(ReturnedBook))]
 
 
 @books_router.post(
@@ -22,11 +48,14 @@ async def create_book(
     book: IncomingBook,
     session: DBSession,
 ):
+    if settings.book_write_batching:
+        # Coalesced with concurrent creates into one INSERT and one commit
+        return await book_writer.submit(book)
+
     # Check that the seller exists in the database
-    seller = await session.execute(select(Seller).filter(Seller.id == book.seller_id))
-    seller = seller.scalar_one_or_none()
+    seller = await session.execute(SELLER_EXISTS, {"seller_id": book.seller_id})
 
-    if not seller:
+    if seller.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Seller not found"
         )
@@ -42,31 +71,198 @@ async def create_book(
     session.add(new_book)
     await session.flush()
 
+    on_commit(
+        session, catalogue.upsert,
+        new_book.id, new_book.year, new_book.pages, new_book.seller_id, new_book.author,
+    )
+    on_commit(session, response_cache.invalidate, seller_entity(new_book.seller_id), BOOKS_TABLE)
+    enqueue(session, "book.created", book_payload(new_book))
+    audit(session, "book.created", new_book.id, book_payload(new_book))
+
     return new_book
 
 
-@books_router.get("/", response_model=ReturnedAllBooks)
-async def get_all_books(session: DBSession):
-    query = select(Book)  # SELECT * FROM book
-    result = await session.execute(query)
+@books_router.post(
+    "/import", response_model=ReturnedBookImport, dependencies=[Depends(deadline(120))]
+)
+async def import_books(feed: IncomingBookImport, session: DBSession):
+    """
+    Imports a partner feed, keyed by (seller_id, isbn).
+
+    New books are inserted and changed ones updated in place; re-sending an
+    unchanged feed writes nothing.
+    """
+    seller_ids = {book.seller_id for book in feed.books}
+    result = await session.execute(select(Seller.id).where(Seller.id.in_(seller_ids)))
+    if missing := seller_ids - set(result.scalars()):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Sellers not found: {sorted(missing)}",
+        )
+
+    inserted, updated = await upsert_books(
+        session, (book.model_dump() for book in feed.books)
+    )
+    return ReturnedBookImport(
+        received=len(feed.books),
+        inserted=inserted,
+        updated=updated,
+        unchanged=len(feed.books) - inserted - updated,
+    )
+
+
+async def render_books(session, fields: Optional[tuple[str, ...]], seller_id: Optional[int]) -> bytes:
+    """Loads all books, or one seller's, and serialises them to JSON."""
+    if fields:
+        # SELECT only the requested columns and skip ORM hydration
+        query = select(*(getattr(Book, name) for name in fields))
+        if seller_id is not None:
+            query = query.where(Book.seller_id == seller_id)
+        result = await session.execute(query)
+        return orjson.dumps({"books": [row._asdict() for row in result]})
+
+    if seller_id is None:
+        result = await session.execute(ALL_BOOKS)  # SELECT * FROM book
+    else:
+        result = await session.execute(BOOKS_BY_SELLER, {"seller_id": seller_id})
     books = result.scalars().all()
+    return ReturnedAllBooks.model_validate({"books": books}, from_attributes=True).model_dump_json().encode()
 
-    return {"books": books}
 
+@books_router.get("/", response_model=ReturnedAllBooks)
+async def get_all_books(session: DBSession, fields: BookFields, seller_id: Optional[int] = None):
+    # One seller's list only goes stale when that seller's books change
+    tags = (BOOKS_TABLE,) if seller_id is None else (seller_entity(seller_id),)
+    body = await result_cache.fetch(
+        cache_key("books", fields=fields, seller_id=seller_id),
+        tags,
+        lambda: render_books(session, fields, seller_id),
+        refresh_with_session(render_books, fields, seller_id),
+    )
+    return Response(content=body, media_type="application/json")
 
-@books_router.get("/{book_id}", response_model=ReturnedBook)
-async def get_book(book_id: int, session: DBSession):
-    if result := await session.get(Book, book_id):
-        return result
 
-    return Response(status_code=status.HTTP_404_NOT_FOUND)
+@books_router.get("/facets", response_model=ReturnedBookFacets)
+async def get_book_facets(
+    session: DBSession,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    pages_min: Optional[int] = None,
+    pages_max: Optional[int] = None,
+    seller_id: Optional[int] = None,
+    author: Optional[str] = None,
+    top_authors: int = Query(20, ge=0, le=1000),
+):
+    # Served from the in-memory snapshot; the database is only read on first use
+    await catalogue.ensure_loaded(session)
+    return catalogue.facets(
+        year_from=year_from,
+        year_to=year_to,
+        pages_min=pages_min,
+        pages_max=pages_max,
+        seller_id=seller_id,
+        author=author,
+        top_authors=top_authors,
+    )
+
+
+@books_router.get("/changes", response_model=ReturnedBookChanges)
+async def get_book_changes(
+    session: DBSession,
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+):
+    """
+    Books created, updated or deleted after change number `since`, oldest first.
+    Pass the returned `next_since` to the next call to continue syncing.
+
+    Sequence numbers are taken when a row is written but become visible when
+    its transaction commits, so only changes up to the watermark, below
+    which no transaction is still writing, are returned: a lower number can
+    never turn up after `next_since` has passed it.
+    """
+    watermark = await change_watermark.current(session)
+    # Both scans are served by the change_seq / (entity, seq) indexes; one extra
+    # row each tells whether another page follows
+    upserts = await session.execute(
+        select(Book)
+        .where(Book.change_seq > since, Book.change_seq <= watermark)
+        .order_by(Book.change_seq)
+        .limit(limit + 1)
+        .execution_options(populate_existing=True)
+    )
+    deletes = await session.execute(
+        select(Tombstone)
+        .where(Tombstone.entity == "book", Tombstone.seq > since, Tombstone.seq <= watermark)
+        .order_by(Tombstone.seq)
+        .limit(limit + 1)
+    )
+
+    changes = [
+        {"seq": book.change_seq, "op": "upsert", "id": book.id, "seller_id": book.seller_id, "book": book}
+        for book in upserts.scalars()
+    ]
+    changes.extend(
+        {"seq": tomb.seq, "op": "delete", "id": tomb.entity_id, "seller_id": tomb.seller_id}
+        for tomb in deletes.scalars()
+    )
+    changes.sort(key=lambda change: change["seq"])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    return {
+        "changes": changes,
+        # Everything up to the watermark has been seen unless the page was full
+        "next_since": changes[-1]["seq"] if has_more else max(since, watermark),
+        "has_more": has_more,
+    }
+
+
+async def render_book(session, book_id: int, fields: Optional[tuple[str, ...]]) -> Optional[bytes]:
+    """Loads a book and serialises it to JSON; None if there is no such book."""
+    if fields:
+        query = select(*(getattr(Book, name) for name in fields)).where(Book.id == book_id)
+        if row := (await session.execute(query)).first():
+            return orjson.dumps(row._asdict())
+        return None
+
+    result = await session.execute(BOOK_BY_ID, {"book_id": book_id})
+    if book := result.scalar_one_or_none():
+        return ReturnedBook.model_validate(book, from_attributes=True).model_dump_json().encode()
+    return None
+
+
+@books_router.get(
+    "/{book_id}", response_model=ReturnedBook, dependencies=[Depends(deadline(2))]
+)
+async def get_book(book_id: int, session: DBSession, fields: BookFields):
+    # Served from the host-wide cache; on a miss, identical concurrent
+    # requests share one query and one serialisation
+    body = await response_cache.fetch(
+        f"book:{book_id}:{','.join(fields or ())}",
+        book_entity(book_id),
+        lambda: render_book(session, book_id, fields),
+        book_flights,
+    )
+    if body is None:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+    return Response(content=body, media_type="application/json")
 
 
 @books_router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_book(book_id: int, session: DBSession):
-    deleted_book = await session.get(Book, book_id)
+    result = await session.execute(BOOK_BY_ID, {"book_id": book_id})
+    deleted_book = result.scalar_one_or_none()
 
     if deleted_book:
+        on_commit(session, catalogue.remove, deleted_book.id)
+        on_commit(
+            session, response_cache.invalidate,
+            book_entity(deleted_book.id), seller_entity(deleted_book.seller_id), BOOKS_TABLE,
+        )
+        enqueue(session, "book.deleted", {"id": deleted_book.id, "seller_id": deleted_book.seller_id})
+        audit(session, "book.deleted", deleted_book.id, book_payload(deleted_book))
         await session.delete(deleted_book)
         await session.commit()
     else:
@@ -77,14 +273,69 @@ async def delete_book(book_id: int, session: DBSession):
 
 @books_router.put("/{book_id}", response_model=ReturnedBook)
 async def update_book(book_id: int, new_book_data: ReturnedBook, session: DBSession):
-    if updated_book := await session.get(Book, book_id):
+    result = await session.execute(BOOK_BY_ID, {"book_id": book_id})
+    if updated_book := result.scalar_one_or_none():
         updated_book.author = new_book_data.author
         updated_book.title = new_book_data.title
         updated_book.year = new_book_data.year
         updated_book.pages = new_book_data.pages
+        audit(session, "book.updated", updated_book.id, changed_fields(updated_book))
 
         await session.flush()
 
+        on_commit(
+            session, catalogue.upsert,
+            updated_book.id, updated_book.year, updated_book.pages,
+            updated_book.seller_id, updated_book.author,
+        )
+        on_commit(
+            session, response_cache.invalidate,
+            book_entity(updated_book.id), seller_entity(updated_book.seller_id), BOOKS_TABLE,
+        )
+        enqueue(session, "book.updated", book_payload(updated_book))
+
         return updated_book
 
     return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+
+@books_router.get("/{book_id}/inventory", response_model=BookInventory)
+async def get_book_inventory(book_id: int, session: DBSession):
+    result = await session.execute(BOOK_INVENTORY, {"book_id": book_id})
+    if inventory := result.one_or_none():
+        return inventory
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+
+
+@books_router.put("/{book_id}/inventory", response_model=BookInventory)
+async def update_book_inventory(book_id: int, inventory: BookInventory, session: DBSession):
+    result = await session.execute(BOOK_BY_ID, {"book_id": book_id})
+    if book := result.scalar_one_or_none():
+        book.price = inventory.price
+        book.stock = inventory.stock
+        audit(session, "book.updated", book.id, changed_fields(book))
+        await session.flush()
+        return book
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+
+
+@books_router.post(
+    "/{book_id}/purchase",
+    response_model=ReturnedOrder,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(deadline(2))],
+)
+async def purchase_book(book_id: int, purchase: IncomingPurchase, session: DBSession):
+    """
+    Buys `quantity` copies of a book. Stock is decremented atomically, so
+    concurrent buyers of the last copies never oversell.
+    """
+    result = await session.execute(PURCHASE, {"book_id": book_id, "quantity": purchase.quantity})
+    if order := result.one_or_none():
+        return ReturnedOrder(**order._asdict(), total=order.unit_price * order.quantity)
+
+    # Only reached on failure: tell a missing book from an exhausted one
+    result = await session.execute(BOOK_INVENTORY, {"book_id": book_id})
+    if result.one_or_none() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Not enough stock")
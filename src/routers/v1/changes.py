@@ -0,0 +1,73 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from src.configurations.settings import settings
+from src.utils.changes import change_feed
+
+changes_router = APIRouter(tags=["changes"], prefix="/changes")
+
+HEARTBEAT = b": ping\n\n"
+
+
+@changes_router.get("/stream")
+async def stream_changes(seller_id: Optional[int] = None):
+    """Server-Sent Events stream of book and seller changes, optionally for one seller."""
+    subscription = change_feed.subscribe(seller_id)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.get(), settings.change_feed_heartbeat_seconds
+                    )
+                except asyncio.TimeoutError:
+                    # Keeps idle connections open through proxies
+                    yield HEARTBEAT
+                    continue
+                if event is None:
+                    return
+                yield event.sse
+        finally:
+            change_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@changes_router.websocket("/ws")
+async def websocket_changes(websocket: WebSocket, seller_id: Optional[int] = None):
+    """WebSocket stream of book and seller changes, one JSON message per change."""
+    await websocket.accept()
+    subscription = change_feed.subscribe(seller_id)
+
+    async def wait_for_disconnect():
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    disconnected = asyncio.create_task(wait_for_disconnect())
+    try:
+        while not disconnected.done():
+            next_event = asyncio.create_task(subscription.get())
+            await asyncio.wait(
+                (next_event, disconnected), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not next_event.done():
+                next_event.cancel()
+                break
+            if (event := next_event.result()) is None:
+                await websocket.close()
+                break
+            await websocket.send_text(event.payload)
+    finally:
+        disconnected.cancel()
+        change_feed.unsubscribe(subscription)
@@ -0,0 +1,39 @@
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.configurations import get_session_factory
+from src.utils.exports import EXPORT_FORMATS, EXPORTS, SNAPSHOT_OPTIONS, stream_table
+
+exports_router = APIRouter(tags=["exports"], prefix="/export")
+
+# The stream outlives the request's dependencies, so it opens its own session
+SessionFactory = Annotated[async_sessionmaker, Depends(get_session_factory)]
+
+
+@exports_router.get("/{table}")
+async def export_table(
+    table: Literal["books", "sellers"],
+    session_factory: SessionFactory,
+    format: Literal["parquet", "arrow"] = "parquet",
+):
+    """Streams a table as a Parquet or Arrow IPC file."""
+    if not EXPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="pyarrow is not installed"
+        )
+    extension, media_type = EXPORT_FORMATS[format]
+
+    async def content():
+        async with session_factory() as session:
+            connection = await session.connection(execution_options=SNAPSHOT_OPTIONS)
+            async for chunk in stream_table(connection, table, format):
+                yield chunk
+
+    return StreamingResponse(
+        content(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}{extension}"'},
+    )
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+
+from src.utils.metrics import collect
+
+metrics_router = APIRouter(tags=["metrics"], prefix="/metrics")
+
+
+@metrics_router.get("/")
+async def get_metrics():
+    """Current values of the in-process counters and histograms."""
+    return collect()
@@ -0,0 +1,45 @@
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from src.configurations.settings import settings
+from src.schemas import ProfilingSampling, ReturnedProfiles
+from src.utils.profiling import is_authorised, profiler
+
+
+def require_profiling_token(x_profile_token: Annotated[Optional[str], Header()] = None) -> None:
+    if not settings.profiling_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled")
+    if not is_authorised(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profiling token")
+
+
+profiling_router = APIRouter(
+    tags=["profiling"],
+    prefix="/profiling",
+    dependencies=[Depends(require_profiling_token)],
+)
+
+
+@profiling_router.get("/", response_model=ReturnedProfiles)
+async def get_profiles():
+    """The sampling rate and the profiles kept by this worker, newest first."""
+    return {
+        "sample_every": profiler.sample_every,
+        "profiles": [profile.summary() for profile in reversed(profiler.profiles)],
+    }
+
+
+@profiling_router.put("/", response_model=ProfilingSampling)
+async def set_sampling(sampling: ProfilingSampling):
+    profiler.sample_every = sampling.sample_every
+    return sampling
+
+
+@profiling_router.get("/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    """The profile as collapsed stacks, e.g. for flamegraph.pl or speedscope."""
+    if (profile := profiler.get(profile_id)) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return PlainTextResponse(profile.collapsed())
@@ -1,21 +1,41 @@
 import logging
-from typing import Annotated, List
+from typing import Annotated, List, Optional
 
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, Response, status
+from pydantic import TypeAdapter
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import load_only, selectinload
 
-from src.configurations import get_async_session
+from src.configurations import SessionReleasingRoute, get_async_session, on_commit
 from src.models.sellers import Seller
-from src.schemas import IncomingSeller, ReturnedAllSellers, ReturnedSeller
+from src.schemas import (IncomingSeller, ReturnedAllSellers, ReturnedBook,
+                         ReturnedSeller)
+from src.utils.audit import audit, changed_fields
+from src.utils.catalogue import catalogue
+from src.utils.fields import sparse_fields
+from src.utils.outbox import enqueue, seller_payload
+from src.utils.overload import deadline, is_overload, limit_db_concurrency
+from src.utils.result_cache import cache_key, refresh_with_session, result_cache
+from src.utils.shared_cache import (BOOKS_TABLE, SELLERS_TABLE, response_cache,
+                                    seller_entity)
+from src.utils.singleflight import seller_flights
+from src.utils.statements import ALL_SELLERS_WITH_BOOKS, SELLER_WITH_BOOKS
 
 logger = logging.getLogger(__name__)
 
-sellers_router = APIRouter(tags=["sellers"], prefix="/sellers")
+sellers_router = APIRouter(
+    tags=["sellers"],
+    prefix="/sellers",
+    route_class=SessionReleasingRoute,
+    dependencies=[Depends(limit_db_concurrency)],
+)
 
 DBSession = Annotated[AsyncSession, Depends(get_async_session)]
+SellerFields = Annotated[Optional[tuple[str, ...]], Depends(sparse_fields(ReturnedSeller))]
+SELLER_LIST = TypeAdapter(List[ReturnedSeller])
 
 async def handle_integrity_error(session, email: str):
     """Handles IntegrityError (duplicate email) in create/update operations."""
@@ -26,6 +46,30 @@ async def handle_integrity_error(session, email: str):
         detail="Email already in use by another seller",
     )
 
+async def fetch_projected_sellers(session, fields: tuple[str, ...], *where) -> list[dict]:
+    """Loads only the requested seller fields; books are eager-loaded only when asked for."""
+    columns = [getattr(Seller, name) for name in fields if name != "books"]
+
+    if "books" not in fields:
+        result = await session.execute(select(*columns).where(*where))
+        return [row._asdict() for row in result]
+
+    stmt = (
+        select(Seller)
+        .where(*where)
+        .options(load_only(Seller.id, *columns), selectinload(Seller.books))
+    )
+    result = await session.execute(stmt)
+    projected = []
+    for seller in result.scalars():
+        data = {name: getattr(seller, name) for name in fields if name != "books"}
+        data["books"] = [
+            ReturnedBook.model_validate(book, from_attributes=True).model_dump()
+            for book in seller.books
+        ]
+        projected.append(data)
+    return projected
+
 @sellers_router.post("/", response_model=ReturnedSeller, status_code=status.HTTP_201_CREATED)
 async def create_seller(
     seller: IncomingSeller,
@@ -42,14 +86,13 @@ async def create_seller(
         )
 
         session.add(new_seller)
+        await session.flush()
+        on_commit(session, response_cache.invalidate, SELLERS_TABLE)
+        enqueue(session, "seller.created", seller_payload(new_seller))
+        audit(session, "seller.created", new_seller.id, seller_payload(new_seller))
         await session.commit()
 
-        stmt = (
-            select(Seller)
-            .where(Seller.id == new_seller.id)
-            .options(selectinload(Seller.books))
-        )
-        result = await session.execute(stmt)
+        result = await session.execute(SELLER_WITH_BOOKS, {"seller_id": new_seller.id})
         seller_instance = result.scalar_one()
 
         # Convert to Pydantic model (this now works because the instance is fully loaded)
@@ -59,6 +102,8 @@ async def create_seller(
         await handle_integrity_error(session, seller.e_mail)
 
     except SQLAlchemyError as e:
+        if is_overload(e):
+            raise
         logger.error(f"Database error while creating seller: {str(e)}")
         await session.rollback()
         raise HTTPException(
@@ -71,29 +116,47 @@ async def create_seller(
         raise
 
 
-@sellers_router.get("/{seller_id}", response_model=ReturnedSeller)
-async def get_seller(seller_id: int, session: DBSession):
-    try:
-        logger.info(f"Fetching seller with ID: {seller_id}")
+async def render_seller(session, seller_id: int, fields: Optional[tuple[str, ...]]) -> bytes:
+    """Loads a seller and serialises it to JSON, honouring the `fields` projection."""
+    if fields:
+        projected = await fetch_projected_sellers(session, fields, Seller.id == seller_id)
+        seller = projected[0] if projected else None
+    else:
+        # SELLER_WITH_BOOKS uses selectinload to eagerly load the relationship
+        result = await session.execute(SELLER_WITH_BOOKS, {"seller_id": seller_id})
+        seller = result.scalar_one_or_none()
 
-        # Use selectinload to eagerly load the relationship
-        stmt = (
-            select(Seller)
-            .where(Seller.id == seller_id)
-            .options(selectinload(Seller.books))
+    if not seller:
+        logger.warning(f"Seller with ID {seller_id} not found")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Seller not found"
         )
-        result = await session.execute(stmt)
-        seller = result.scalar_one_or_none()
 
-        if not seller:
-            logger.warning(f"Seller with ID {seller_id} not found")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Seller not found"
-            )
+    if fields:
+        return orjson.dumps(seller)
+    return ReturnedSeller.model_validate(seller, from_attributes=True).model_dump_json().encode()
 
-        return seller
+
+@sellers_router.get(
+    "/{seller_id}", response_model=ReturnedSeller, dependencies=[Depends(deadline(2))]
+)
+async def get_seller(seller_id: int, session: DBSession, fields: SellerFields):
+    try:
+        logger.info(f"Fetching seller with ID: {seller_id}")
+
+        # Served from the host-wide cache; on a miss, identical concurrent
+        # requests share one query and one serialisation
+        body = await response_cache.fetch(
+            f"seller:{seller_id}:{','.join(fields or ())}",
+            seller_entity(seller_id),
+            lambda: render_seller(session, seller_id, fields),
+            seller_flights,
+        )
+        return Response(content=body, media_type="application/json")
 
     except SQLAlchemyError as e:
+        if is_overload(e):
+            raise
         logger.error(f"Database error while fetching seller {seller_id}: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -101,18 +164,37 @@ async def get_seller(seller_id: int, session: DBSession):
         )
 
 
+async def render_sellers(session, fields: Optional[tuple[str, ...]]) -> bytes:
+    """Loads all sellers and serialises them to JSON, honouring the `fields` projection."""
+    if fields:
+        projected = await fetch_projected_sellers(session, fields)
+        logger.info(f"Retrieved {len(projected)} sellers")
+        return orjson.dumps(projected)
+
+    result = await session.execute(ALL_SELLERS_WITH_BOOKS)
+    sellers = result.scalars().all()
+
+    logger.info(f"Retrieved {len(sellers)} sellers")
+    return SELLER_LIST.dump_json(SELLER_LIST.validate_python(sellers, from_attributes=True))
+
+
 @sellers_router.get("/", response_model=List[ReturnedSeller], response_model_exclude={"password"})
-async def get_all_sellers(session: DBSession):
+async def get_all_sellers(session: DBSession, fields: SellerFields):
     try:
         logger.info("Fetching all sellers")
-        query = select(Seller).options(selectinload(Seller.books))
-        result = await session.execute(query)
-        sellers = result.scalars().all()
-
-        logger.info(f"Retrieved {len(sellers)} sellers")
-        return sellers
+        # Lists that embed books also go stale when any book changes
+        tags = (SELLERS_TABLE, BOOKS_TABLE) if not fields or "books" in fields else (SELLERS_TABLE,)
+        body = await result_cache.fetch(
+            cache_key("sellers", fields=fields),
+            tags,
+            lambda: render_sellers(session, fields),
+            refresh_with_session(render_sellers, fields),
+        )
+        return Response(content=body, media_type="application/json")
 
     except SQLAlchemyError as e:
+        if is_overload(e):
+            raise
         logger.error(f"Database error while fetching all sellers: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -125,8 +207,7 @@ async def update_seller(seller_id: int, seller_data: IncomingSeller, session: DB
     try:
         logger.info(f"Attempting to update seller with ID: {seller_id}")
 
-        stmt = select(Seller).where(Seller.id == seller_id).options(selectinload(Seller.books))
-        result = await session.execute(stmt)
+        result = await session.execute(SELLER_WITH_BOOKS, {"seller_id": seller_id})
         seller = result.scalar_one_or_none()
 
         if not seller:
@@ -139,6 +220,9 @@ async def update_seller(seller_id: int, seller_data: IncomingSeller, session: DB
         seller.last_name = seller_data.last_name
         seller.e_mail = seller_data.e_mail
         seller.password = seller_data.password  # TODO: hash this password
+        on_commit(session, response_cache.invalidate, seller_entity(seller_id), SELLERS_TABLE)
+        enqueue(session, "seller.updated", seller_payload(seller))
+        audit(session, "seller.updated", seller_id, changed_fields(seller))
 
         try:
             await session.commit()
@@ -146,8 +230,7 @@ async def update_seller(seller_id: int, seller_data: IncomingSeller, session: DB
             logger.info(f"Successfully updated seller with ID: {seller_id}")
             
             # Fetch the updated seller with `selectinload` to avoid lazy loading issues
-            stmt = select(Seller).where(Seller.id == seller_id).options(selectinload(Seller.books))
-            result = await session.execute(stmt)
+            result = await session.execute(SELLER_WITH_BOOKS, {"seller_id": seller_id})
             updated_seller = result.scalar_one()
 
             return updated_seller
@@ -156,6 +239,8 @@ async def update_seller(seller_id: int, seller_data: IncomingSeller, session: DB
             await handle_integrity_error(session, seller.e_mail)
 
     except SQLAlchemyError as e:
+        if is_overload(e):
+            raise
         logger.error(f"Database error while updating seller {seller_id}: {str(e)}")
         await session.rollback()
         raise HTTPException(
@@ -176,6 +261,12 @@ async def delete_seller(seller_id: int, session: DBSession):
         logger.info(f"Attempting to delete seller with ID: {seller_id}")
 
         if seller := await session.get(Seller, seller_id):
+            on_commit(session, catalogue.remove_seller, seller_id)
+            # Its books go too; seller deletions are rare enough to flush everything
+            on_commit(session, response_cache.invalidate_all)
+            # Partners drop the seller's books along with it
+            enqueue(session, "seller.deleted", {"id": seller_id})
+            audit(session, "seller.deleted", seller_id, seller_payload(seller))
             await session.delete(seller)
             await session.commit()
 
@@ -187,6 +278,8 @@ async def delete_seller(seller_id: int, session: DBSession):
             status_code=status.HTTP_404_NOT_FOUND, detail="Seller not found"
         )
     except SQLAlchemyError as e:
+        if is_overload(e):
+            raise
         logger.error(f"Database error while deleting seller {seller_id}: {str(e)}")
         await session.rollback()
         raise HTTPException(
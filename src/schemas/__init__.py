@@ -1,4 +1,6 @@
 from .books import *
+from .orders import *
+from .profiling import *
 from .sellers import *
 
-__all__ = books.__all__ + sellers.__all__
+__all__ = books.__all__ + orders.__all__ + profiling.__all__ + sellers.__all__
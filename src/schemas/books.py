@@ -1,9 +1,19 @@
 import datetime
-from typing import List
+from decimal import Decimal
+from typing import List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field, field_validator
 
-__all__ = ["IncomingBook", "ReturnedBook", "ReturnedAllBooks"]
+__all__ = [
+    "IncomingBook",
+    "ReturnedBook",
+    "ReturnedAllBooks",
+    "ReturnedBookFacets",
+    "ReturnedBookChanges",
+    "IncomingBookImport",
+    "ReturnedBookImport",
+    "BookInventory",
+]
 
 
 class BaseBook(BaseModel):
@@ -25,11 +35,89 @@ class IncomingBook(BaseBook):
         return year
 
 
+def _isbn13(digits: str) -> str:
+    """The first 12 digits of an ISBN-13 followed by their check digit."""
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(digits[:12]))
+    return digits[:12] + str(-total % 10)
+
+
+class ImportedBook(IncomingBook):
+    isbn: str
+
+    @field_validator("isbn")
+    @classmethod
+    def validate_isbn(cls, isbn):
+        # Feeds format ISBNs inconsistently ("978-0-13...", "0 13 ..."); keep the digits
+        normalized = "".join(char for char in isbn.upper() if char.isdigit() or char == "X")
+        if len(normalized) == 10 and normalized[:9].isdigit():
+            total = sum(
+                (10 - position) * (10 if char == "X" else int(char))
+                for position, char in enumerate(normalized)
+            )
+            if total % 11:
+                raise ValueError("ISBN-10 check digit does not match")
+            # The same book under both forms must be the same key
+            return _isbn13("978" + normalized[:9])
+        if len(normalized) == 13 and normalized.isdigit():
+            if _isbn13(normalized) != normalized:
+                raise ValueError("ISBN-13 check digit does not match")
+            return normalized
+        raise ValueError("ISBN must have 10 or 13 digits")
+
+
+class IncomingBookImport(BaseModel):
+    books: List[ImportedBook]
+
+
+class ReturnedBookImport(BaseModel):
+    received: int
+    inserted: int
+    updated: int
+    unchanged: int
+
+
 class ReturnedBook(BaseBook):
     id: int
     pages: int
     seller_id: int
 
 
+class BookInventory(BaseModel):
+    price: Decimal = Field(ge=0, max_digits=10, decimal_places=2)
+    stock: int = Field(ge=0)
+
+
 class ReturnedAllBooks(BaseModel):
     books: List[ReturnedBook]
+
+
+class FacetCount(BaseModel):
+    value: Union[int, str]
+    count: int
+
+
+class PagesRangeCount(BaseModel):
+    start: int
+    end: Optional[int]
+    count: int
+
+
+class ReturnedBookFacets(BaseModel):
+    total: int
+    years: List[FacetCount]
+    pages: List[PagesRangeCount]
+    authors: List[FacetCount]
+
+
+class BookChange(BaseModel):
+    seq: int
+    op: Literal["upsert", "delete"]
+    id: int
+    seller_id: int
+    book: Optional[ReturnedBook] = None
+
+
+class ReturnedBookChanges(BaseModel):
+    changes: List[BookChange]
+    next_since: int
+    has_more: bool
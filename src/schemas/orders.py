@@ -0,0 +1,21 @@
+import datetime
+from decimal import Decimal
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+__all__ = ["IncomingPurchase", "ReturnedOrder"]
+
+
+class IncomingPurchase(BaseModel):
+    quantity: int = Field(default=1, ge=1)
+
+
+class ReturnedOrder(BaseModel):
+    id: int
+    book_id: Optional[int]
+    quantity: int
+    unit_price: Decimal
+    total: Decimal
+    remaining_stock: int
+    created_at: datetime.datetime
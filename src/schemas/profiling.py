@@ -0,0 +1,25 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+__all__ = ["ProfilingSampling", "ReturnedProfile", "ReturnedProfiles"]
+
+
+class ProfilingSampling(BaseModel):
+    # Profile one request in `sample_every`; 0 turns sampling off
+    sample_every: int = Field(ge=0)
+
+
+class ReturnedProfile(BaseModel):
+    id: str
+    method: str
+    path: str
+    status: Optional[int]
+    started_at: float
+    samples: int
+    statements: int
+    phases_ms: Dict[str, float]
+
+
+class ReturnedProfiles(ProfilingSampling):
+    profiles: List[ReturnedProfile]
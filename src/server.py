@@ -0,0 +1,113 @@
+"""
+Production launcher: several uvicorn workers on uvloop and httptools.
+
+    python -m src.server
+    python -m src.server --workers 8 --port 8080
+
+Each worker process has its own connection pool, so the pools are sized
+here, before the workers start, such that all workers of all replicas
+together stay under Postgres max_connections (less the connections kept
+for migrations and admin sessions, and those of the job_worker_replicas
+job workers). Sizes reach the workers through the environment, where
+`Settings` picks them up.
+"""
+import argparse
+import os
+import sys
+from typing import Optional
+
+from src.configurations.settings import settings
+from src.worker import connections as job_worker_connections
+
+# Connections a worker holds outside its pool: the change feed listener and
+# the audit log's COPY connection
+CONNECTIONS_OUTSIDE_POOL = 2
+
+
+def max_connections() -> int:
+    """Postgres max_connections, unless configured in db_max_connections."""
+    if settings.db_max_connections is not None:
+        return settings.db_max_connections
+
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import NullPool
+
+    engine = create_engine(settings.database_url.replace("+asyncpg", ""), poolclass=NullPool)
+    try:
+        with engine.connect() as connection:
+            return int(connection.scalar(text("SHOW max_connections")))
+    finally:
+        engine.dispose()
+
+
+def pool_per_worker(max_connections: int, workers: int, replicas: int = 1) -> tuple[int, int]:
+    """
+    (pool_size, max_overflow) for each worker, so that `replicas * workers`
+    pools fit in `max_connections - db_reserved_connections`, less what the
+    job workers hold. Never more than max_connection_count + db_max_overflow.
+    """
+    available = (
+        max_connections
+        - settings.db_reserved_connections
+        - settings.job_worker_replicas * job_worker_connections()
+    )
+    per_worker = available // (replicas * workers) - CONNECTIONS_OUTSIDE_POOL
+    if per_worker < 1:
+        raise ValueError(
+            f"{replicas * workers} workers do not fit in {available} database connections; "
+            "lower server_workers or job_worker_concurrency, or raise Postgres max_connections"
+        )
+    pool_size = min(settings.max_connection_count, per_worker)
+    max_overflow = min(settings.db_max_overflow, per_worker - pool_size)
+    return pool_size, max_overflow
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.server")
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument(
+        "--workers", type=int, default=settings.server_workers or os.cpu_count() or 1,
+        help="default: server_workers, or the CPU count",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        pool_size, max_overflow = pool_per_worker(max_connections(), args.workers, settings.server_replicas)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    os.environ["MAX_CONNECTION_COUNT"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+    # Logging every statement costs more than running some of them
+    os.environ.setdefault("DB_ECHO", "false")
+    # Never warm more connections than the pool keeps
+    os.environ["DB_WARMUP_CONNECTIONS"] = str(min(settings.db_warmup_connections, pool_size))
+
+    print(
+        f"Starting {args.workers} workers on {args.host}:{args.port}, "
+        f"{pool_size}+{max_overflow} database connections each"
+    )
+
+    import uvicorn
+
+    uvicorn.run(
+        "src.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop",
+        http="httptools",
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keep_alive_seconds,
+        limit_concurrency=settings.server_limit_concurrency,
+        log_level=settings.server_log_level,
+        access_log=settings.server_access_log,
+        # Open requests get as long to finish as the pool drain
+        timeout_graceful_shutdown=settings.db_drain_timeout_seconds,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
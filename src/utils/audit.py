@@ -0,0 +1,274 @@
+"""
+Write-behind audit log of book and seller changes.
+
+Write routes call `audit()` next to their other commit hooks: once the
+transaction commits, the event is appended to an in-memory buffer and the
+request moves on without another round trip. The buffer is written to
+audit_log with COPY on a connection of its own, as soon as
+`audit_batch_size` events are waiting or `audit_flush_interval_ms` after
+the first one. Failed writes are retried and the events kept in order;
+beyond `audit_max_buffer` buffered events the oldest are dropped. On
+shutdown everything buffered is written before the app exits.
+"""
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+import asyncpg
+import orjson
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.configurations.database import on_commit
+from src.configurations.settings import settings
+from src.utils.auth import token_subject
+from src.utils.metrics import Histogram, register
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "AuditLog",
+    "AuditMiddleware",
+    "audit",
+    "audit_event",
+    "audit_log",
+    "changed_fields",
+    "request_actor",
+]
+
+# audit_log columns, in the order of the buffered tuples
+COLUMNS = ("occurred_at", "actor", "client", "action", "entity", "entity_id", "changes")
+# Recorded as changed, never with their values
+REDACTED = frozenset({"password"})
+
+# The scope of the write request being served, set by AuditMiddleware
+_request_scope: ContextVar[Optional[dict]] = ContextVar("audit_request_scope", default=None)
+
+
+def request_actor() -> tuple[Optional[str], Optional[str]]:
+    """(token subject, client address) of the current request."""
+    scope = _request_scope.get()
+    if scope is None:
+        return None, None
+    actor = None
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                actor = token_subject(token)
+            break
+    client = scope.get("client")
+    return actor, client[0] if client else None
+
+
+def changed_fields(obj) -> dict:
+    """{field: [old, new]} for the pending, unflushed changes of an ORM object."""
+    changes = {}
+    for attr in inspect(obj).attrs:
+        history = attr.history
+        if not history.has_changes():
+            continue
+        if attr.key in REDACTED:
+            changes[attr.key] = ["[redacted]", "[redacted]"]
+        else:
+            changes[attr.key] = [
+                history.deleted[0] if history.deleted else None,
+                history.added[0] if history.added else None,
+            ]
+    return changes
+
+
+def audit_event(
+    action: str,
+    entity_id: int,
+    changes: Optional[dict] = None,
+    actor: Optional[tuple[Optional[str], Optional[str]]] = None,
+) -> tuple:
+    """An audit_log row, in COLUMNS order. `actor` defaults to the current request's."""
+    actor, client = actor or request_actor()
+    return (
+        datetime.now(timezone.utc),
+        actor,
+        client,
+        action,
+        action.partition(".")[0],
+        entity_id,
+        # Prices are Decimals; asyncpg encodes jsonb from its text
+        orjson.dumps(changes, default=str).decode() if changes is not None else None,
+    )
+
+
+def audit(
+    session: AsyncSession,
+    action: str,
+    entity_id: int,
+    changes: Optional[dict] = None,
+    actor: Optional[tuple[Optional[str], Optional[str]]] = None,
+) -> None:
+    """
+    Records a "book.updated"-style change once the session's transaction
+    commits. `actor` defaults to the current request's.
+    """
+    on_commit(session, audit_log.record, audit_event(action, entity_id, changes, actor))
+
+
+class AuditLog:
+    """
+    Buffers audit events and writes them in batches with COPY.
+
+    Events are only kept while the log is running, between `start()` and
+    `close()`; the app does both in its lifespan, and so does the job
+    worker. Events recorded at any other time are counted as dropped.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        batch_size: int = settings.audit_batch_size,
+        flush_interval: float = settings.audit_flush_interval_ms / 1000,
+        max_buffer: int = settings.audit_max_buffer,
+        retry_delay: float = settings.audit_retry_seconds,
+    ):
+        self.dsn = dsn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.retry_delay = retry_delay
+        self._buffer: list[tuple] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: Optional[asyncio.Task] = None
+        self._connection: Optional[asyncpg.Connection] = None
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.failures = 0
+        self.peak = 0
+        self.batch_sizes = Histogram((1, 10, 50, 100, 500, 1000, 5000))
+        self.flush_seconds = Histogram((0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    def record(self, event: tuple) -> None:
+        if not self.running:
+            # Nothing would ever write it: recorded by a process that never
+            # started the log, or after close()
+            self.dropped += 1
+            logger.warning("Audit log is not running, dropping %s of %s %s", event[3], event[4], event[5])
+            return
+        if len(self._buffer) >= self.max_buffer:
+            # The database has been unreachable for a while: keep the latest events
+            del self._buffer[0]
+            self.dropped += 1
+        self._buffer.append(event)
+        self.recorded += 1
+        self.peak = max(self.peak, len(self._buffer))
+        if len(self._buffer) >= self.batch_size:
+            self._flush_soon()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(self.flush_interval, self._flush_soon)
+
+    async def close(self, attempts: int = 3) -> None:
+        """Writes everything still buffered, then stops recording."""
+        if not self.running:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushing is not None:
+            await self._flushing
+        failures = 0
+        while self._buffer and failures < attempts:
+            if not await self._write_buffered():
+                failures += 1
+                await asyncio.sleep(self.retry_delay)
+        self._loop = None
+        if self._buffer:
+            # Last resort: the log keeps what the database could not take
+            logger.error("Could not write %d audit events:", len(self._buffer))
+            for event in self._buffer:
+                logger.error("audit %s", orjson.dumps(dict(zip(COLUMNS, event)), default=str).decode())
+            self._buffer.clear()
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    def _flush_soon(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushing is None or self._flushing.done():
+            self._flushing = asyncio.create_task(self._flush())
+
+    async def _flush(self) -> None:
+        # Events recorded meanwhile are picked up by the next round
+        while self._buffer and self.running:
+            if not await self._write_buffered():
+                if self._timer is None and self.running:
+                    self._timer = self._loop.call_later(self.retry_delay, self._flush_soon)
+                return
+
+    async def _write_buffered(self) -> bool:
+        """Writes the oldest batch; on failure it is put back in front."""
+        batch = self._buffer[:self.batch_size]
+        del self._buffer[:len(batch)]
+        started = time.perf_counter()
+        try:
+            if self._connection is None or self._connection.is_closed():
+                self._connection = await asyncpg.connect(self.dsn)
+            await self._connection.copy_records_to_table("audit_log", records=batch, columns=COLUMNS)
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            self.failures += 1
+            logger.warning("Writing %d audit events failed, will retry: %s", len(batch), e)
+            self._buffer[:0] = batch
+            if self._connection is not None:
+                self._connection.terminate()
+                self._connection = None
+            return False
+        self.written += len(batch)
+        self.batch_sizes.observe(len(batch))
+        self.flush_seconds.observe(time.perf_counter() - started)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "buffered": len(self._buffer),
+            "buffered_peak": self.peak,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "batch_size": self.batch_sizes.snapshot(),
+            "flush_seconds": self.flush_seconds.snapshot(),
+        }
+
+
+class AuditMiddleware:
+    """Makes the scope of write requests available to `audit()`."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+
+
+audit_log = AuditLog(dsn=settings.database_url.replace("+asyncpg", ""))
+register("audit_log", audit_log.stats)
@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from typing import Optional
 
 from authlib.jose import jwt
 from fastapi import Depends, HTTPException, status
@@ -58,3 +59,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid token: {str(e)}"
         )
+
+
+def token_subject(token: str) -> Optional[str]:
+    """The `sub` of a valid, unexpired token, or None."""
+    try:
+        claims = jwt.decode(token, SECRET_KEY)
+        claims.validate()
+    except Exception:
+        return None
+    return claims.get("sub")
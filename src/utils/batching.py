@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.configurations.database import get_session_factory, on_commit
+from src.configurations.settings import settings
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.schemas import IncomingBook
+from src.utils.audit import audit, request_actor
+from src.utils.catalogue import catalogue
+from src.utils.outbox import book_payload, enqueue
+from src.utils.shared_cache import BOOKS_TABLE, response_cache, seller_entity
+from src.utils.metrics import Histogram, register
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["BookWriteCoalescer", "book_writer"]
+
+
+class _Pending:
+    __slots__ = ("book", "future", "queued_at", "actor")
+
+    def __init__(self, book: IncomingBook):
+        self.book = book
+        self.future = asyncio.get_running_loop().create_future()
+        self.queued_at = time.perf_counter()
+        # The batch is written from another task, outside the request
+        self.actor = request_actor()
+
+
+class BookWriteCoalescer:
+    """
+    Group commit for `create_book`.
+
+    Books submitted within `window` seconds of each other (or until
+    `max_batch` are queued) are written with one seller lookup, one
+    multi-row INSERT ... RETURNING and one commit. Each caller gets back its
+    own row, or its own error: a missing seller fails only the books that
+    reference it.
+    """
+
+    def __init__(
+        self,
+        session_factory_getter: Optional[Callable[[], async_sessionmaker]] = None,
+        window: float = settings.book_write_batch_window_ms / 1000,
+        max_batch: int = settings.book_write_batch_max_size,
+    ):
+        # Resolved lazily: the engine only exists once global_init() has run
+        self._session_factory = session_factory_getter or get_session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: list[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.books = 0
+        self.batch_sizes = Histogram((1, 2, 5, 10, 20, 50, 100, 200, 500))
+        self.wait_seconds = Histogram((0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+        self.flush_seconds = Histogram((0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+
+    async def submit(self, book: IncomingBook) -> Book:
+        pending = _Pending(book)
+        self._queue.append(pending)
+        if len(self._queue) >= self.max_batch:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush_now)
+        return await pending.future
+
+    async def close(self) -> None:
+        """Writes whatever is queued and waits for in-flight batches."""
+        if self._queue:
+            self._flush_now()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "books": self.books,
+            "queued": len(self._queue),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_seconds": self.wait_seconds.snapshot(),
+            "flush_seconds": self.flush_seconds.snapshot(),
+        }
+
+    def _flush_now(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queue = self._queue, []
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[_Pending]) -> None:
+        started = time.perf_counter()
+        for pending in batch:
+            self.wait_seconds.observe(started - pending.queued_at)
+        self.batches += 1
+        self.books += len(batch)
+        self.batch_sizes.observe(len(batch))
+
+        try:
+            await self._write(batch)
+        except IntegrityError:
+            # A seller was deleted between the lookup and the insert; isolate the
+            # failing rows by writing the rest of the batch one by one.
+            logger.warning("Batched book insert failed, retrying %d books one by one", len(batch))
+            for pending in batch:
+                if not pending.future.done():
+                    await self._write_isolated(pending)
+        except Exception as e:
+            logger.error("Batched book insert failed: %s", e)
+            for pending in batch:
+                _fail(pending, e)
+        finally:
+            self.flush_seconds.observe(time.perf_counter() - started)
+
+    async def _write(self, batch: list[_Pending]) -> None:
+        async with self._session_factory()() as session:
+            seller_ids = {pending.book.seller_id for pending in batch}
+            result = await session.execute(select(Seller.id).where(Seller.id.in_(seller_ids)))
+            existing = set(result.scalars())
+
+            writable = []
+            for pending in batch:
+                if pending.book.seller_id in existing:
+                    writable.append(pending)
+                else:
+                    _fail(pending, _seller_not_found())
+            if not writable:
+                return
+
+            result = await session.execute(
+                insert(Book).returning(Book, sort_by_parameter_order=True),
+                [
+                    {
+                        "title": pending.book.title,
+                        "author": pending.book.author,
+                        "year": pending.book.year,
+                        "pages": pending.book.pages,
+                        "seller_id": pending.book.seller_id,
+                    }
+                    for pending in writable
+                ],
+            )
+            books = result.scalars().all()
+            for pending, book in zip(writable, books):
+                on_commit(session, catalogue.upsert, book.id, book.year, book.pages, book.seller_id, book.author)
+                on_commit(session, response_cache.invalidate, seller_entity(book.seller_id), BOOKS_TABLE)
+                enqueue(session, "book.created", book_payload(book))
+                audit(session, "book.created", book.id, book_payload(book), actor=pending.actor)
+            await session.commit()
+
+        for pending, book in zip(writable, books):
+            if not pending.future.done():
+                pending.future.set_result(book)
+
+    async def _write_isolated(self, pending: _Pending) -> None:
+        try:
+            await self._write([pending])
+        except IntegrityError:
+            _fail(pending, _seller_not_found())
+        except Exception as e:
+            _fail(pending, e)
+
+
+def _seller_not_found() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Seller not found")
+
+
+def _fail(pending: _Pending, error: Exception) -> None:
+    # The caller may have gone away (cancelled) while the batch was written
+    if not pending.future.done():
+        pending.future.set_exception(error)
+
+
+book_writer = BookWriteCoalescer()
+register("book_write_batching", book_writer.stats)
@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.configurations.settings import settings
+from src.models.books import Book
+from src.models.tombstones import Tombstone
+from src.utils.changes import change_watermark
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["CatalogueSnapshot", "catalogue"]
+
+# Upper bounds of the page-count ranges reported by facets(); the last range is open.
+PAGE_RANGE_EDGES = (100, 200, 300, 500, 1000)
+
+INITIAL_CAPACITY = 1024
+
+
+class CatalogueSnapshot:
+    """
+    In-memory, column-oriented copy of `books_table` for facet queries.
+
+    Each book occupies one row across parallel NumPy arrays; authors are
+    dictionary-encoded into integer codes. Deleted books are only marked
+    dead and the arrays are compacted once dead rows outnumber live ones.
+
+    The snapshot is loaded from the database once and then kept current by
+    the book and seller write routes through `on_commit` callbacks. Changes
+    committed by other workers and hosts are caught up from change_seq and
+    the tombstones, up to the change watermark, at most every
+    `refresh_interval` seconds. It is only touched from the event loop, so
+    no locking is needed.
+    """
+
+    def __init__(self, refresh_interval: float = settings.catalogue_refresh_seconds):
+        self.refresh_interval = refresh_interval
+        self._load_lock = asyncio.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        """Drops all data; the next `ensure_loaded()` reloads from the database."""
+        self.loaded = False
+        self._loading = False
+        self._pending: list[tuple] = []
+        # Every change up to this number is in the snapshot
+        self.synced_seq = 0
+        self._synced_at = 0.0
+        self._size = 0
+        self._dead = 0
+        self.ids = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.years = np.zeros(INITIAL_CAPACITY, dtype=np.int32)
+        self.pages = np.zeros(INITIAL_CAPACITY, dtype=np.int32)
+        self.seller_ids = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.author_codes = np.zeros(INITIAL_CAPACITY, dtype=np.int32)
+        self.alive = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self.authors: list[str] = []
+        self._author_codes: dict[str, int] = {}
+        self._row_of: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return self._size - self._dead
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        """Loads the snapshot on first use, then catches up with changes made elsewhere."""
+        if self.loaded:
+            if time.monotonic() - self._synced_at >= self.refresh_interval and not self._load_lock.locked():
+                async with self._load_lock:
+                    await self._catch_up(session)
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            self._loading = True
+            try:
+                # Everything up to the watermark is committed, and so in the SELECT
+                watermark = await change_watermark.current(session)
+                result = await session.execute(
+                    select(Book.id, Book.year, Book.pages, Book.seller_id, Book.author)
+                )
+                self.load(result.all())
+            finally:
+                self._loading = False
+            self.synced_seq = watermark
+            self._synced_at = time.monotonic()
+            # Apply changes committed while the initial SELECT was running.
+            pending, self._pending = self._pending, []
+            for method, args in pending:
+                getattr(self, method)(*args)
+            logger.info("Catalogue snapshot loaded with %d books", len(self))
+
+    async def _catch_up(self, session: AsyncSession) -> None:
+        """Applies the book changes numbered after `synced_seq`, up to the watermark."""
+        watermark = await change_watermark.current(session)
+        if watermark > self.synced_seq:
+            upserts = await session.execute(
+                select(Book.change_seq, Book.id, Book.year, Book.pages, Book.seller_id, Book.author)
+                .where(Book.change_seq > self.synced_seq, Book.change_seq <= watermark)
+            )
+            deletes = await session.execute(
+                select(Tombstone.seq, Tombstone.entity_id)
+                .where(Tombstone.entity == "book", Tombstone.seq > self.synced_seq, Tombstone.seq <= watermark)
+            )
+            changes = [(seq, "upsert", args) for seq, *args in upserts.all()]
+            changes.extend((seq, "remove", (book_id,)) for seq, book_id in deletes.all())
+            # Changes this worker committed itself are applied again, to the same effect
+            for _, method, args in sorted(changes, key=lambda change: change[0]):
+                getattr(self, method)(*args)
+            self.synced_seq = watermark
+        self._synced_at = time.monotonic()
+
+    def load(self, rows: Iterable[tuple]) -> None:
+        """Replaces the contents with `(id, year, pages, seller_id, author)` rows."""
+        pending, loading = self._pending, self._loading
+        self.clear()
+        self._pending, self._loading = pending, loading
+        for row in rows:
+            self._append(*row)
+        self.loaded = True
+
+    def upsert(self, book_id: int, year: int, pages: int, seller_id: int, author: str) -> None:
+        if self._defer("upsert", book_id, year, pages, seller_id, author):
+            return
+        row = self._row_of.get(book_id)
+        if row is None:
+            self._append(book_id, year, pages, seller_id, author)
+            return
+        self.years[row] = year
+        self.pages[row] = pages
+        self.seller_ids[row] = seller_id
+        self.author_codes[row] = self._encode_author(author)
+
+    def remove(self, book_id: int) -> None:
+        if self._defer("remove", book_id):
+            return
+        row = self._row_of.pop(book_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self._dead += 1
+            self._maybe_compact()
+
+    def remove_seller(self, seller_id: int) -> None:
+        """Removes all books of a seller, as the FK cascade does in the database."""
+        if self._defer("remove_seller", seller_id):
+            return
+        rows = np.flatnonzero(self.alive[: self._size] & (self.seller_ids[: self._size] == seller_id))
+        for book_id in self.ids[rows].tolist():
+            del self._row_of[book_id]
+        self.alive[rows] = False
+        self._dead += len(rows)
+        self._maybe_compact()
+
+    def facets(
+        self,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        pages_min: Optional[int] = None,
+        pages_max: Optional[int] = None,
+        seller_id: Optional[int] = None,
+        author: Optional[str] = None,
+        top_authors: int = 20,
+    ) -> dict:
+        """Counts the books matching all given filters, grouped by year, page range and author."""
+        n = self._size
+        mask = self.alive[:n].copy()
+        if year_from is not None:
+            mask &= self.years[:n] >= year_from
+        if year_to is not None:
+            mask &= self.years[:n] <= year_to
+        if pages_min is not None:
+            mask &= self.pages[:n] >= pages_min
+        if pages_max is not None:
+            mask &= self.pages[:n] <= pages_max
+        if seller_id is not None:
+            mask &= self.seller_ids[:n] == seller_id
+        if author is not None:
+            code = self._author_codes.get(author)
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= self.author_codes[:n] == code
+
+        years = self.years[:n][mask]
+        pages = self.pages[:n][mask]
+        codes = self.author_codes[:n][mask]
+        return {
+            "total": int(mask.sum()),
+            "years": self._year_histogram(years),
+            "pages": self._page_ranges(pages),
+            "authors": self._top_authors(codes, top_authors),
+        }
+
+    @staticmethod
+    def _year_histogram(years: np.ndarray) -> list[dict]:
+        if not len(years):
+            return []
+        first = int(years.min())
+        counts = np.bincount(years - first)
+        present = np.flatnonzero(counts)
+        return [
+            {"value": first + int(offset), "count": int(counts[offset])}
+            for offset in present
+        ]
+
+    @staticmethod
+    def _page_ranges(pages: np.ndarray) -> list[dict]:
+        counts = np.bincount(
+            np.searchsorted(PAGE_RANGE_EDGES, pages, side="right"),
+            minlength=len(PAGE_RANGE_EDGES) + 1,
+        )
+        starts = (0, *PAGE_RANGE_EDGES)
+        ends = (*PAGE_RANGE_EDGES, None)
+        return [
+            {"start": start, "end": end, "count": int(count)}
+            for start, end, count in zip(starts, ends, counts)
+        ]
+
+    def _top_authors(self, codes: np.ndarray, limit: int) -> list[dict]:
+        if not len(codes) or limit <= 0:
+            return []
+        counts = np.bincount(codes, minlength=len(self.authors))
+        present = np.flatnonzero(counts)
+        if len(present) > limit:
+            present = present[np.argpartition(counts[present], -limit)[-limit:]]
+        present = present[np.lexsort((present, -counts[present]))]
+        return [
+            {"value": self.authors[code], "count": int(counts[code])} for code in present
+        ]
+
+    def _defer(self, method: str, *args) -> bool:
+        if self._loading:
+            self._pending.append((method, args))
+            return True
+        # Until the first load there is nothing to keep current.
+        return not self.loaded
+
+    def _append(self, book_id: int, year: int, pages: int, seller_id: int, author: str) -> None:
+        if self._size == len(self.ids):
+            self._resize(2 * len(self.ids))
+        row = self._size
+        self.ids[row] = book_id
+        self.years[row] = year
+        self.pages[row] = pages
+        self.seller_ids[row] = seller_id
+        self.author_codes[row] = self._encode_author(author)
+        self.alive[row] = True
+        self._row_of[book_id] = row
+        self._size += 1
+
+    def _encode_author(self, author: str) -> int:
+        code = self._author_codes.get(author)
+        if code is None:
+            code = self._author_codes[author] = len(self.authors)
+            self.authors.append(author)
+        return code
+
+    def _resize(self, capacity: int) -> None:
+        for name in ("ids", "years", "pages", "seller_ids", "author_codes", "alive"):
+            column = getattr(self, name)
+            resized = np.zeros(capacity, dtype=column.dtype)
+            resized[: self._size] = column[: self._size]
+            setattr(self, name, resized)
+
+    def _maybe_compact(self) -> None:
+        if self._dead <= max(len(self), INITIAL_CAPACITY):
+            return
+        keep = np.flatnonzero(self.alive[: self._size])
+        for name in ("ids", "years", "pages", "seller_ids", "author_codes", "alive"):
+            column = getattr(self, name)
+            column[: len(keep)] = column[keep]
+        self._size = len(keep)
+        self._dead = 0
+        self.alive[self._size :] = False
+        self._row_of = {book_id: row for row, book_id in enumerate(self.ids[: self._size].tolist())}
+
+
+catalogue = CatalogueSnapshot()
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Optional
+
+import asyncpg
+import orjson
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.configurations.settings import settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "CHANNEL",
+    "ChangeEvent",
+    "ChangeFeed",
+    "ChangeWatermark",
+    "Subscription",
+    "change_feed",
+    "change_watermark",
+]
+
+# Notified by the notify_catalogue_change() trigger on books_table and sellers.
+CHANNEL = "catalogue_changes"
+
+
+class ChangeEvent:
+    """A change notification, encoded once and shared by all subscribers."""
+
+    __slots__ = ("payload", "seller_id", "sse")
+
+    def __init__(self, payload: str, seller_id: Optional[int]):
+        self.payload = payload
+        self.seller_id = seller_id
+        self.sse = b"event: change\ndata: " + payload.encode() + b"\n\n"
+
+
+class Subscription:
+    """A bounded queue of events for one SSE or WebSocket client."""
+
+    def __init__(self, seller_id: Optional[int], max_queue: int):
+        self.seller_id = seller_id
+        self.queue: asyncio.Queue[Optional[ChangeEvent]] = asyncio.Queue(max_queue)
+        self.overflowed = False
+
+    def push(self, event: Optional[ChangeEvent]) -> bool:
+        """Queues the event; a full queue is replaced by the closing None."""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            # The client is too far behind to catch up: end its stream
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+    async def get(self) -> Optional[ChangeEvent]:
+        """Returns the next event, or None once the subscription has been closed."""
+        return await self.queue.get()
+
+
+class ChangeFeed:
+    """
+    Fans out catalogue change notifications to subscribers.
+
+    A single LISTEN connection per process is opened on the first
+    subscription and shared by all subscribers, who are indexed by the
+    seller_id they filter on so that each event only visits the matching
+    queues. A subscriber whose queue fills up is disconnected rather than
+    buffering without bound; clients are expected to reconnect.
+    """
+
+    def __init__(self, dsn: str, max_queue: int = 256, reconnect_delay: float = 1.0):
+        self.dsn = dsn
+        self.max_queue = max_queue
+        self.reconnect_delay = reconnect_delay
+        self._all: set[Subscription] = set()
+        self._by_seller: dict[int, set[Subscription]] = {}
+        self._connection: Optional[asyncpg.Connection] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._lost = asyncio.Event()
+        self.listening = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._all) + sum(len(subs) for subs in self._by_seller.values())
+
+    def subscribe(self, seller_id: Optional[int] = None) -> Subscription:
+        subscription = Subscription(seller_id, self.max_queue)
+        if seller_id is None:
+            self._all.add(subscription)
+        else:
+            self._by_seller.setdefault(seller_id, set()).add(subscription)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription.seller_id is None:
+            self._all.discard(subscription)
+            return
+        subscribers = self._by_seller.get(subscription.seller_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._by_seller[subscription.seller_id]
+
+    def dispatch(self, payload: str) -> None:
+        try:
+            seller_id = orjson.loads(payload).get("seller_id")
+        except orjson.JSONDecodeError:
+            logger.warning("Ignoring malformed change notification: %s", payload)
+            return
+
+        event = ChangeEvent(payload, seller_id)
+        for subscription in (*self._all, *self._by_seller.get(seller_id, ())):
+            if not subscription.push(event):
+                logger.warning("Dropping slow change feed subscriber")
+                self.unsubscribe(subscription)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        for subscription in (*self._all, *(s for subs in self._by_seller.values() for s in subs)):
+            # Wakes the client loop up
+            subscription.push(None)
+        self._all.clear()
+        self._by_seller.clear()
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                self._lost.clear()
+                self._connection = await asyncpg.connect(self.dsn)
+                self._connection.add_termination_listener(lambda _: self._lost.set())
+                await self._connection.add_listener(CHANNEL, self._on_notification)
+                self.listening.set()
+                logger.info("Listening for catalogue changes")
+                await self._lost.wait()
+                self.listening.clear()
+                logger.warning("Change feed connection lost, reconnecting")
+            except asyncio.CancelledError:
+                self.listening.clear()
+                if self._connection is not None and not self._connection.is_closed():
+                    await self._connection.close()
+                raise
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.error("Change feed connection failed: %s", e)
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        self.dispatch(payload)
+
+
+LAST_CHANGE_SEQ = text("SELECT last_value FROM catalogue_change_seq")
+SNAPSHOT_BOUNDS = text(
+    "SELECT pg_snapshot_xmin(s)::text::bigint, pg_snapshot_xmax(s)::text::bigint FROM pg_current_snapshot() s"
+)
+
+
+class ChangeWatermark:
+    """
+    The highest catalogue change number up to which every change is
+    committed or rolled back, so that readers following change_seq never
+    step over a number that becomes visible later.
+
+    next_catalogue_change_seq() assigns the transaction id before taking a
+    number, so every number up to a `last_value` read belongs to a
+    transaction below the xmax of a snapshot taken right after. Once the
+    xmin of a later snapshot, the oldest transaction still running, has
+    passed that xmax, all of them have finished and the `last_value` is
+    safe. Samples are kept per process, so that regular callers find an
+    earlier one safe instead of waiting; long write transactions hold the
+    watermark back until they end.
+    """
+
+    def __init__(self, max_samples: int = 1024):
+        self._samples: deque[tuple[int, int]] = deque(maxlen=max_samples)
+        self.safe = 0
+
+    async def current(self, session: AsyncSession) -> int:
+        # Two statements: the snapshot must be taken after the number is read
+        last_value = await session.scalar(LAST_CHANGE_SEQ)
+        xmin, xmax = (await session.execute(SNAPSHOT_BOUNDS)).one()
+        if not self._samples or last_value > self._samples[-1][0]:
+            self._samples.append((last_value, xmax))
+        while self._samples and self._samples[0][1] <= xmin:
+            self.safe = max(self.safe, self._samples.popleft()[0])
+        return self.safe
+
+
+change_watermark = ChangeWatermark()
+
+change_feed = ChangeFeed(
+    dsn=settings.database_url.replace("+asyncpg", ""),
+    max_queue=settings.change_feed_queue_size,
+)
@@ -0,0 +1,264 @@
+import asyncio
+import zlib
+from typing import Callable, Optional
+
+from src.configurations.settings import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+__all__ = ["CompressionMiddleware", "available_encodings", "negotiate_encoding"]
+
+COMPRESSIBLE_TYPES = (
+    b"application/json",
+    b"application/x-ndjson",
+    b"application/xml",
+    b"application/javascript",
+    b"text/",
+)
+# Event streams must reach the client message by message, never compress them.
+EXCLUDED_TYPES = (b"text/event-stream",)
+
+
+class _Codec:
+    """One-shot and incremental compression for a single content-encoding."""
+
+    def __init__(self, name: str, compress: Callable[[bytes], bytes], stream: Callable[[], "_Stream"]):
+        self.name = name
+        self.compress = compress
+        self.stream = stream
+
+
+class _Stream:
+    def __init__(self, compress: Callable[[bytes], bytes], flush: Callable[[], bytes], finish: Callable[[], bytes]):
+        self.compress = compress
+        # flush() emits everything written so far so streamed chunks are not held back
+        self.flush = flush
+        self.finish = finish
+
+
+def _gzip_codec(level: int) -> _Codec:
+    def compress(data: bytes) -> bytes:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def stream() -> _Stream:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return _Stream(
+            compressor.compress,
+            lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+            compressor.flush,
+        )
+
+    return _Codec("gzip", compress, stream)
+
+
+def _brotli_codec(quality: int) -> _Codec:
+    def stream() -> _Stream:
+        compressor = brotli.Compressor(quality=quality)
+        return _Stream(compressor.process, compressor.flush, compressor.finish)
+
+    return _Codec("br", lambda data: brotli.compress(data, quality=quality), stream)
+
+
+def _zstd_codec(level: int) -> _Codec:
+    def stream() -> _Stream:
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        return _Stream(
+            compressor.compress,
+            lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+            compressor.flush,
+        )
+
+    # ZstdCompressor instances are not thread safe, so one-shot calls use a fresh one.
+    return _Codec(
+        "zstd",
+        lambda data: zstandard.ZstdCompressor(level=level).compress(data),
+        stream,
+    )
+
+
+def available_encodings() -> dict[str, _Codec]:
+    """Returns the supported codecs in server preference order."""
+    codecs = {}
+    if zstandard is not None:
+        codecs["zstd"] = _zstd_codec(settings.compression_zstd_level)
+    if brotli is not None:
+        codecs["br"] = _brotli_codec(settings.compression_brotli_quality)
+    codecs["gzip"] = _gzip_codec(settings.compression_gzip_level)
+    return codecs
+
+
+def negotiate_encoding(accept_encoding: str, supported) -> Optional[str]:
+    """
+    Picks the encoding with the highest client q-value from `accept_encoding`,
+    breaking ties by the order of `supported`.
+    """
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in supported:
+        q = weights.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compresses response bodies with zstd, brotli or gzip according to the
+    request's Accept-Encoding header.
+
+    Bodies smaller than `minimum_size` are sent as is. Single-message bodies
+    larger than `offload_size` are compressed in the default executor so the
+    event loop keeps serving other requests; streamed bodies are compressed
+    chunk by chunk.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = settings.compression_minimum_size,
+        offload_size: int = settings.compression_offload_size,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.codecs = available_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept_encoding, self.codecs)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        responder = _CompressingResponder(
+            self.codecs[encoding], send, self.minimum_size, self.offload_size
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, codec: _Codec, send, minimum_size: int, offload_size: int):
+        self.codec = codec
+        self._send = send
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.start_message: Optional[dict] = None
+        self.buffer: list[bytes] = []
+        self.buffered = 0
+        self.stream: Optional[_Stream] = None
+        self.passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = message.get("headers", [])
+            self.passthrough = not _should_compress(message["status"], headers)
+            if self.passthrough:
+                await self._send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            return await self._send(message)
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is not None:
+            return await self._send_stream_chunk(body, more_body)
+
+        self.buffer.append(body)
+        self.buffered += len(body)
+        if more_body and self.buffered < self.minimum_size:
+            # Wait for enough data to decide whether compression is worth it.
+            return
+
+        body = b"".join(self.buffer)
+        self.buffer = []
+        if not more_body:
+            await self._send_whole(body)
+        else:
+            self.stream = self.codec.stream()
+            await self._send_start(content_length=None)
+            await self._send_stream_chunk(body, more_body)
+
+    async def _send_whole(self, body: bytes) -> None:
+        if len(body) < self.minimum_size:
+            await self._send(self.start_message)
+            await self._send({"type": "http.response.body", "body": body})
+            return
+
+        if len(body) >= self.offload_size:
+            loop = asyncio.get_running_loop()
+            compressed = await loop.run_in_executor(None, self.codec.compress, body)
+        else:
+            compressed = self.codec.compress(body)
+
+        await self._send_start(content_length=len(compressed))
+        await self._send({"type": "http.response.body", "body": compressed})
+
+    async def _send_stream_chunk(self, body: bytes, more_body: bool) -> None:
+        if len(body) >= self.offload_size:
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(None, self.stream.compress, body)
+        else:
+            data = self.stream.compress(body)
+        data += self.stream.flush() if more_body else self.stream.finish()
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    async def _send_start(self, content_length: Optional[int]) -> None:
+        headers = []
+        vary = b"Accept-Encoding"
+        for name, value in self.start_message.get("headers", []):
+            if name == b"vary":
+                vary = value + b", " + vary
+            elif name != b"content-length":
+                headers.append((name, value))
+        headers.append((b"content-encoding", self.codec.name.encode()))
+        headers.append((b"vary", vary))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        await self._send({**self.start_message, "headers": headers})
+
+
+def _should_compress(status: int, headers) -> bool:
+    if status < 200 or status in (204, 304):
+        return False
+    content_type = b""
+    for name, value in headers:
+        if name == b"content-encoding":
+            return False
+        if name == b"content-type":
+            content_type = value.lower()
+    if content_type.startswith(EXCLUDED_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
@@ -0,0 +1,210 @@
+import asyncio
+from itertools import groupby
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.models.books import Book
+from src.models.sellers import Seller
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pq = None
+
+__all__ = ["EXPORTS", "EXPORT_FORMATS", "SNAPSHOT_OPTIONS", "export_snapshot", "stream_table"]
+
+# format -> (file extension, media type)
+EXPORT_FORMATS = {
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrow", "application/vnd.apache.arrow.file"),
+}
+
+# Both tables are read from the same snapshot
+SNAPSHOT_OPTIONS = {"isolation_level": "REPEATABLE READ", "postgresql_readonly": True}
+
+
+class _Export:
+    def __init__(self, query: Select, fields: list):
+        self.query = query
+        self.fields = fields
+
+    @property
+    def schema(self) -> "pa.Schema":
+        return pa.schema(self.fields)
+
+
+def _exports() -> dict[str, _Export]:
+    if pa is None:
+        return {}
+    return {
+        "books": _Export(
+            # Ordered by seller so that partitions can be written one at a time
+            select(
+                Book.seller_id, Book.id, Book.title, Book.author,
+                Book.year, Book.pages, Book.isbn, Book.change_seq,
+            ).order_by(Book.seller_id, Book.id),
+            [
+                pa.field("seller_id", pa.int32(), nullable=False),
+                pa.field("id", pa.int32(), nullable=False),
+                pa.field("title", pa.string(), nullable=False),
+                pa.field("author", pa.string(), nullable=False),
+                pa.field("year", pa.int16(), nullable=False),
+                pa.field("pages", pa.int32(), nullable=False),
+                pa.field("isbn", pa.string()),
+                pa.field("change_seq", pa.int64(), nullable=False),
+            ],
+        ),
+        # Never export password hashes
+        "sellers": _Export(
+            select(
+                Seller.id, Seller.first_name, Seller.last_name, Seller.e_mail, Seller.change_seq,
+            ).order_by(Seller.id),
+            [
+                pa.field("id", pa.int32(), nullable=False),
+                pa.field("first_name", pa.string(), nullable=False),
+                pa.field("last_name", pa.string(), nullable=False),
+                pa.field("e_mail", pa.string(), nullable=False),
+                pa.field("change_seq", pa.int64(), nullable=False),
+            ],
+        ),
+    }
+
+
+EXPORTS = _exports()
+
+
+class _Sink:
+    """Write-only file that collects what pyarrow writes until drained."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("Snapshot export requires pyarrow: pip install pyarrow")
+
+
+def _open_writer(sink, schema: "pa.Schema", fmt: str):
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    return pa.ipc.new_file(sink, schema)
+
+
+def _to_batch(rows, schema: "pa.Schema") -> "pa.RecordBatch":
+    columns = list(zip(*rows)) or [()] * len(schema)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+async def stream_table(
+    connection: AsyncConnection, table: str, fmt: str, batch_size: int = 65_536
+) -> AsyncIterator[bytes]:
+    """
+    Streams one table as a Parquet or Arrow IPC file.
+
+    Rows are fetched through a server-side cursor `batch_size` at a time and
+    each batch is written as one row group (record batch), so memory use does
+    not depend on the table size. Batches are encoded in the default
+    executor, off the event loop.
+    """
+    _require_pyarrow()
+    export = EXPORTS[table]
+    sink = _Sink()
+    writer = _open_writer(pa.PythonFile(sink, mode="w"), export.schema, fmt)
+    loop = asyncio.get_running_loop()
+
+    def encode(rows) -> bytes:
+        writer.write_batch(_to_batch(rows, export.schema))
+        return sink.drain()
+
+    def finish() -> bytes:
+        writer.close()
+        return sink.drain()
+
+    result = await connection.stream(export.query.execution_options(yield_per=batch_size))
+    async for rows in result.partitions():
+        yield await loop.run_in_executor(None, encode, rows)
+    yield await loop.run_in_executor(None, finish)
+
+
+async def export_snapshot(
+    connection: AsyncConnection,
+    directory: Path,
+    fmt: str = "parquet",
+    partition_by_seller: bool = False,
+    batch_size: int = 65_536,
+) -> dict[str, int]:
+    """
+    Writes books and sellers into `directory` and returns the rows written
+    per table.
+
+    With `partition_by_seller`, books are written Hive-style as
+    books/seller_id=<id>/part-0.<ext>. Encoding and file writes run in the
+    default executor, off the event loop.
+    """
+    _require_pyarrow()
+    extension = EXPORT_FORMATS[fmt][0]
+    directory.mkdir(parents=True, exist_ok=True)
+    loop = asyncio.get_running_loop()
+    counts = {}
+
+    for table, export in EXPORTS.items():
+        partitioned = partition_by_seller and table == "books"
+        schema = export.schema.remove(0) if partitioned else export.schema
+        writer: Optional[object] = None
+        partition = None
+        counts[table] = 0
+
+        def write(rows) -> None:
+            nonlocal writer, partition
+            if not partitioned:
+                if writer is None:
+                    writer = _open_writer(str(directory / f"{table}{extension}"), schema, fmt)
+                writer.write_batch(_to_batch(rows, schema))
+                return
+            for seller_id, group in groupby(rows, key=lambda row: row.seller_id):
+                if seller_id != partition:
+                    if writer is not None:
+                        writer.close()
+                    path = directory / table / f"seller_id={seller_id}"
+                    path.mkdir(parents=True, exist_ok=True)
+                    writer = _open_writer(str(path / f"part-0{extension}"), schema, fmt)
+                    partition = seller_id
+                writer.write_batch(_to_batch([row[1:] for row in group], schema))
+
+        def finish() -> None:
+            nonlocal writer
+            if writer is None and not partitioned:
+                # Empty table: still write a file with the schema
+                writer = _open_writer(str(directory / f"{table}{extension}"), schema, fmt)
+            if writer is not None:
+                writer.close()
+
+        result = await connection.stream(export.query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            counts[table] += len(rows)
+            await loop.run_in_executor(None, write, rows)
+        await loop.run_in_executor(None, finish)
+
+    return counts
@@ -0,0 +1,41 @@
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+
+__all__ = ["sparse_fields"]
+
+
+def sparse_fields(model: type[BaseModel]) -> Callable[..., Optional[tuple[str, ...]]]:
+    """
+    Builds a dependency that parses the `?fields=` query parameter into a
+    tuple of field names of `model`, in the model's own field order.
+
+    Returns None when the parameter is absent, so routes can keep their
+    full-entity code path for the common case.
+    """
+    allowed = tuple(model.model_fields)
+
+    def dependency(
+        fields: Optional[str] = Query(
+            None,
+            description=f"Comma-separated subset of: {', '.join(allowed)}",
+        ),
+    ) -> Optional[tuple[str, ...]]:
+        if fields is None:
+            return None
+
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        if unknown := requested.difference(allowed):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+            )
+        if not requested:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="At least one field must be requested",
+            )
+        return tuple(name for name in allowed if name in requested)
+
+    return dependency
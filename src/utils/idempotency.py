@@ -0,0 +1,347 @@
+import asyncio
+import hashlib
+import logging
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import Interval, bindparam, delete, event, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from src.configurations.database import get_session_factory
+from src.configurations.settings import settings
+from src.models.idempotency import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["IdempotencyMiddleware", "IdempotencyStore", "idempotency_store"]
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+MAX_KEY_LENGTH = 255
+# Bodies above this size are stored zlib-compressed.
+COMPRESS_THRESHOLD = 1024
+# Only the headers needed to replay the response are kept.
+REPLAYED_HEADERS = (b"content-type", b"location")
+# How often a retry checks on a request still running on another worker
+POLL_INTERVAL = 0.05
+
+keys_table = IdempotencyKey.__table__
+
+LOOKUP = select(
+    keys_table.c.fingerprint,
+    keys_table.c.status,
+    keys_table.c.headers,
+    keys_table.c.body,
+    keys_table.c.compressed,
+).where(keys_table.c.key == bindparam("key"))
+# Blocks on a claim that another transaction has not committed yet
+CLAIM = (
+    insert(keys_table)
+    .values(
+        key=bindparam("key"),
+        fingerprint=bindparam("fingerprint"),
+        lease=bindparam("lease"),
+        expires_at=func.now() + bindparam("ttl", type_=Interval),
+    )
+    .on_conflict_do_nothing(index_elements=[keys_table.c.key])
+    .returning(keys_table.c.key)
+)
+_response = {
+    "status": bindparam("status"),
+    "headers": bindparam("headers"),
+    "body": bindparam("body"),
+    "compressed": bindparam("compressed"),
+}
+# Responses are only stored under the lease that claimed the key
+_leased = (keys_table.c.key == bindparam("row_key"), keys_table.c.lease == bindparam("row_lease"))
+COMPLETE = update(keys_table).where(*_leased, keys_table.c.status.is_(None)).values(**_response)
+ABANDON = delete(keys_table).where(*_leased, keys_table.c.status.is_(None))
+# For requests whose change was not made in a transaction of their own, e.g. batched creates
+STORE = (
+    insert(keys_table)
+    .values(
+        key=bindparam("key"),
+        fingerprint=bindparam("fingerprint"),
+        expires_at=func.now() + bindparam("ttl", type_=Interval),
+        **_response,
+    )
+    .on_conflict_do_nothing(index_elements=[keys_table.c.key])
+)
+PURGE = delete(keys_table).where(keys_table.c.expires_at < func.now())
+
+
+class KeyClaimed(Exception):
+    """Another request committed the key first."""
+
+
+class _Claim:
+    """The key a request claims in the first transaction it begins."""
+
+    __slots__ = ("key", "fingerprint", "ttl", "task", "lease", "claimed")
+
+    def __init__(self, key: bytes, fingerprint: bytes, ttl: timedelta):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.ttl = ttl
+        self.task = asyncio.current_task()
+        self.lease = uuid.uuid4()
+        # None until the request begins a transaction
+        self.claimed: Optional[bool] = None
+
+
+_pending_claim: ContextVar[Optional[_Claim]] = ContextVar("pending_claim", default=None)
+
+
+@event.listens_for(Session, "after_begin")
+def _claim_in_transaction(session: Session, transaction, connection) -> None:
+    """
+    Claims the request's idempotency key in the first transaction it begins,
+    so that the claim commits or rolls back with the change it guards.
+    """
+    claim = _pending_claim.get()
+    if claim is None or claim.claimed is not None or asyncio.current_task() is not claim.task:
+        return
+    if connection.get_execution_options().get("isolation_level") == "AUTOCOMMIT":
+        return
+    params = {"key": claim.key, "fingerprint": claim.fingerprint, "lease": claim.lease, "ttl": claim.ttl}
+    claim.claimed = connection.execute(CLAIM, params).first() is not None
+    if not claim.claimed:
+        raise KeyClaimed()
+    session.info["has_writes"] = True
+
+
+class IdempotencyStore:
+    """
+    Responses keyed by idempotency key, kept in the idempotency_keys table
+    so that a retry reaching any worker or replica finds them.
+
+    A request claims its key with INSERT ... ON CONFLICT DO NOTHING in the
+    transaction that makes its change, and a concurrent claim elsewhere
+    waits on the unique key until that transaction ends. The response is
+    stored on the claimed row once it has been sent. Keys expire after
+    `ttl` seconds and are deleted by `run_purger()`. Retries of a request
+    still running on this worker wait for it here instead of polling.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        wait: float,
+        session_factory_getter: Optional[Callable[[], async_sessionmaker]] = None,
+    ):
+        self.ttl = timedelta(seconds=ttl)
+        self.wait = wait
+        # Resolved lazily: the engine only exists once global_init() has run
+        self._session_factory = session_factory_getter or get_session_factory
+        self._running: dict[bytes, asyncio.Future] = {}
+
+    def running(self, key: bytes) -> Optional[asyncio.Future]:
+        return self._running.get(key)
+
+    def reserve(self, key: bytes, fingerprint: bytes) -> _Claim:
+        self._running[key] = asyncio.get_running_loop().create_future()
+        return _Claim(key, fingerprint, self.ttl)
+
+    def release(self, key: bytes) -> None:
+        """Lets waiting retries of this worker look the key up again."""
+        self._running.pop(key).set_result(None)
+
+    async def get(self, key: bytes):
+        async with self._session_factory()() as session:
+            return (await session.execute(LOOKUP, {"key": key})).first()
+
+    async def complete(self, claim: _Claim, status: int, headers: list, body: bytes) -> None:
+        compressed = len(body) > COMPRESS_THRESHOLD
+        response = {
+            "status": status,
+            "headers": [
+                [name.decode("latin-1"), value.decode("latin-1")]
+                for name, value in headers
+                if name in REPLAYED_HEADERS
+            ],
+            "body": zlib.compress(body, 6) if compressed else body,
+            "compressed": compressed,
+        }
+        async with self._session_factory()() as session:
+            if claim.claimed:
+                await session.execute(COMPLETE, {"row_key": claim.key, "row_lease": claim.lease, **response})
+            else:
+                await session.execute(
+                    STORE, {"key": claim.key, "fingerprint": claim.fingerprint, "ttl": self.ttl, **response}
+                )
+            await session.commit()
+
+    async def abandon(self, claim: _Claim) -> None:
+        """Drops a committed claim so that retries execute the request themselves."""
+        if not claim.claimed:
+            return
+        async with self._session_factory()() as session:
+            await session.execute(ABANDON, {"row_key": claim.key, "row_lease": claim.lease})
+            await session.commit()
+
+    async def purge(self) -> int:
+        async with self._session_factory()() as session:
+            result = await session.execute(PURGE)
+            await session.commit()
+        return result.rowcount
+
+    async def run_purger(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = await self.purge()
+            except Exception as e:
+                logger.error("Purging idempotency keys failed: %s", e)
+                continue
+            if removed:
+                logger.info("Purged %d expired idempotency keys", removed)
+
+
+idempotency_store = IdempotencyStore(
+    ttl=settings.idempotency_ttl_seconds,
+    wait=settings.idempotency_wait_seconds,
+)
+
+
+class IdempotencyMiddleware:
+    """
+    Replays the stored response for POST requests retried with the same
+    `Idempotency-Key` header, on whichever worker the retry lands. A retry
+    that arrives while the first request is still running waits for it
+    instead of executing a second time, and gets 409 if it is still running
+    on another worker after `store.wait` seconds. Reusing a key with a
+    different request body is rejected with 422.
+    """
+
+    def __init__(self, app, paths: Iterable[str], store: IdempotencyStore = idempotency_store):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+        ):
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            return await self.app(scope, receive, send)
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return await _send_error(send, 400, b"Idempotency-Key is too long")
+
+        body = await _read_body(receive)
+        key = _scoped_key(scope["path"], headers.get(b"authorization", b""), idempotency_key)
+        fingerprint = hashlib.sha256(body).digest()
+
+        loop = asyncio.get_running_loop()
+        give_up = loop.time() + self.store.wait
+        while True:
+            if (running := self.store.running(key)) is not None:
+                await asyncio.shield(running)
+                continue
+            stored = await self.store.get(key)
+            if stored is None:
+                if self.store.running(key) is not None:
+                    # Started on this worker while the key was being looked up
+                    continue
+                try:
+                    return await self._execute(scope, body, send, self.store.reserve(key, fingerprint))
+                except KeyClaimed:
+                    # Another worker committed the key first: replay its response
+                    continue
+            if stored.fingerprint != fingerprint:
+                return await _send_error(
+                    send, 422, b"Idempotency-Key was already used with a different request body"
+                )
+            if stored.status is not None:
+                return await _replay(stored, send)
+            # Committed on another worker, which has not stored the response yet
+            if loop.time() >= give_up:
+                return await _send_error(
+                    send, 409, b"A request with this Idempotency-Key is still in progress"
+                )
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def _execute(self, scope, body: bytes, send, claim: _Claim) -> None:
+        status = 0
+        response_headers: list = []
+        chunks: list[bytes] = []
+        body_sent = False
+
+        async def receive():
+            nonlocal body_sent
+            if body_sent:
+                return {"type": "http.disconnect"}
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def capture(message):
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        token = _pending_claim.set(claim)
+        try:
+            try:
+                await self.app(scope, receive, capture)
+            except KeyClaimed:
+                raise
+            except Exception:
+                await self.store.abandon(claim)
+                raise
+            finally:
+                _pending_claim.reset(token)
+
+            if not status or status >= 500:
+                # Server errors are not stored: the client is expected to retry.
+                await self.store.abandon(claim)
+                return
+            await self.store.complete(claim, status, response_headers, b"".join(chunks))
+        finally:
+            self.store.release(claim.key)
+
+
+def _scoped_key(path: str, authorization: bytes, idempotency_key: bytes) -> bytes:
+    # Keys are scoped to the caller so that clients cannot replay each other's responses.
+    return hashlib.sha256(b"\0".join((path.encode(), authorization, idempotency_key))).digest()
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+async def _replay(stored, send) -> None:
+    body = zlib.decompress(stored.body) if stored.compressed else stored.body
+    headers = [
+        *((name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers),
+        (b"content-length", str(len(body)).encode()),
+        REPLAYED_HEADER,
+    ]
+    await send({"type": "http.response.start", "status": stored.status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_error(send, status: int, detail: bytes) -> None:
+    body = b'{"detail":"' + detail + b'"}'
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
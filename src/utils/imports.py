@@ -0,0 +1,311 @@
+import asyncio
+import csv
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+import asyncpg
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import (BigInteger, Column, Insert, Integer, MetaData, String,
+                        Table, exists, func, literal_column, select, tuple_)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.schema import CreateTable
+
+from src.configurations.database import on_commit
+from src.configurations.settings import settings
+from src.models.audit import AuditEntry
+from src.models.books import Book
+from src.models.outbox import OutboxEvent
+from src.models.sellers import Seller
+from src.schemas.books import ImportedBook
+from src.utils.audit import COLUMNS as AUDIT_COLUMNS, audit, audit_event
+from src.utils.catalogue import catalogue
+from src.utils.outbox import book_payload, enqueue, webhook_event
+from src.utils.shared_cache import (BOOKS_TABLE, book_entity, response_cache,
+                                    seller_entity)
+
+__all__ = ["IMPORT_COLUMNS", "ImportReport", "import_file", "upsert", "upsert_books"]
+
+# Columns a feed row provides; (seller_id, isbn) is the natural key
+IMPORT_COLUMNS = ("seller_id", "isbn", "title", "author", "year", "pages")
+UPDATED_COLUMNS = ("title", "author", "year", "pages")
+
+# 6 parameters per row, well under the protocol limit of 32767
+CHUNK_SIZE = 1000
+
+books_table = Book.__table__
+
+
+def upsert(stmt: Insert) -> Insert:
+    """
+    Turns an INSERT into books_table into an upsert on the natural key.
+
+    Rows whose data did not change are left alone: no new row version is
+    written, so no WAL, index entries, change_seq bump or notification.
+    Returns the written rows with an `inserted` flag (xmax is 0 for rows
+    created by this statement).
+    """
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        constraint="uq_books_table_seller_id_isbn",
+        set_={name: excluded[name] for name in UPDATED_COLUMNS},
+        where=tuple_(*(books_table.c[name] for name in UPDATED_COLUMNS)).is_distinct_from(
+            tuple_(*(excluded[name] for name in UPDATED_COLUMNS))
+        ),
+    ).returning(
+        books_table.c.id,
+        books_table.c.title,
+        books_table.c.year,
+        books_table.c.pages,
+        books_table.c.seller_id,
+        books_table.c.author,
+        literal_column("xmax = 0").label("inserted"),
+    )
+
+
+async def upsert_books(session: AsyncSession, rows: Iterable[dict]) -> tuple[int, int]:
+    """
+    Upserts feed rows (dicts with IMPORT_COLUMNS) and returns
+    (inserted, updated). Written books are queued for the webhooks and the
+    audit log; the caller commits.
+    """
+    # A key may only be written once per statement; the last occurrence wins
+    unique = list({(row["seller_id"], row["isbn"]): row for row in rows}.values())
+
+    inserted = updated = 0
+    for start in range(0, len(unique), CHUNK_SIZE):
+        chunk = unique[start:start + CHUNK_SIZE]
+        result = await session.execute(upsert(insert(books_table).values(chunk)))
+        for row in result:
+            if row.inserted:
+                inserted += 1
+            else:
+                updated += 1
+            on_commit(session, catalogue.upsert, row.id, row.year, row.pages, row.seller_id, row.author)
+            on_commit(session, response_cache.invalidate, book_entity(row.id), seller_entity(row.seller_id))
+            action = "book.created" if row.inserted else "book.updated"
+            enqueue(session, action, book_payload(row))
+            audit(session, action, row.id, book_payload(row))
+    if inserted or updated:
+        on_commit(session, response_cache.invalidate, BOOKS_TABLE)
+    return inserted, updated
+
+
+# Rows are COPY'd here, then merged into books_table; emptied on every commit.
+staging_table = Table(
+    "books_import",
+    MetaData(),
+    Column("record", BigInteger, nullable=False),
+    *(Column(name, Integer if name in ("seller_id", "year", "pages") else String) for name in IMPORT_COLUMNS),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DELETE ROWS",
+)
+
+MAX_LENGTHS = {
+    name: books_table.c[name].type.length
+    for name in ("title", "author")
+}
+
+# Validation errors kept per chunk for the report
+MAX_ERRORS = 20
+
+
+class ImportReport:
+    """Counters for a file import."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.read = 0
+        self.invalid = 0
+        self.unknown_seller = 0
+        self.inserted = 0
+        self.updated = 0
+        self.errors: list[str] = []
+
+    @property
+    def unchanged(self) -> int:
+        return self.read - self.invalid - self.unknown_seller - self.inserted - self.updated
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / max(time.perf_counter() - self.started, 1e-9)
+
+    def summary(self) -> str:
+        return (
+            f"{self.read} rows in {time.perf_counter() - self.started:.1f}s "
+            f"({self.rows_per_second:,.0f} rows/s): {self.inserted} inserted, "
+            f"{self.updated} updated, {self.unchanged} unchanged, {self.invalid} invalid, "
+            f"{self.unknown_seller} with unknown seller"
+        )
+
+
+def read_chunks(path: Path, fmt: str, chunk_size: int) -> Iterator[tuple]:
+    """
+    Streams `path` as (format, header, first_record, records) chunks.
+
+    CSV is split into fields here, since quoted fields may span lines;
+    NDJSON lines are passed through and parsed by the workers.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if fmt == "csv":
+            reader = csv.reader(file)
+            header = next(reader, None)
+        else:
+            reader = (line for line in file if line.strip())
+            header = None
+
+        first, records = 1, []
+        for record in reader:
+            records.append(record)
+            if len(records) == chunk_size:
+                yield fmt, header, first, records
+                first, records = first + len(records), []
+        if records:
+            yield fmt, header, first, records
+
+
+def validate_chunk(fmt: str, header: Optional[list[str]], first: int, records: list) -> tuple[list[tuple], int, list[str]]:
+    """
+    Validates records with the API's book rules. Runs in a worker process.
+
+    Returns the rows ready for COPY, the number of invalid records and the
+    first few error messages.
+    """
+    rows, invalid, errors = [], 0, []
+    for number, record in enumerate(records, first):
+        try:
+            data = dict(zip(header, record)) if fmt == "csv" else orjson.loads(record)
+            if "pages" in data and "count_pages" not in data:
+                data["count_pages"] = data.pop("pages")
+            book = ImportedBook.model_validate(data)
+            for name, length in MAX_LENGTHS.items():
+                if len(getattr(book, name)) > length:
+                    raise ValueError(f"{name} is longer than {length} characters")
+        except (ValueError, TypeError, ValidationError) as e:
+            invalid += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append(f"record {number}: {e}")
+            continue
+        rows.append((number, book.seller_id, book.isbn, book.title, book.author, book.year, book.pages))
+    return rows, invalid, errors
+
+
+async def import_file(
+    dsn: str,
+    path: Path,
+    fmt: Optional[str] = None,
+    chunk_size: int = 50_000,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """
+    Imports a CSV or NDJSON file of books, upserting on (seller_id, isbn).
+
+    The file is streamed in chunks that are validated in a process pool,
+    COPY'd into a temporary staging table and merged into books_table with
+    one INSERT ... SELECT ... ON CONFLICT per chunk. The written books'
+    webhook events and audit entries are COPY'd in the same transaction;
+    each chunk commits on its own and then invalidates the cached responses
+    of the API workers on this host. At most `workers + 1` chunks are held
+    in memory at a time.
+    """
+    fmt = fmt or ("csv" if path.suffix.lower() == ".csv" else "ndjson")
+    workers = workers or os.cpu_count() or 1
+    report = ImportReport()
+    loop = asyncio.get_running_loop()
+
+    connection = await asyncpg.connect(dsn)
+    try:
+        await connection.execute(CREATE_STAGING)
+        with ProcessPoolExecutor(workers) as pool:
+            validating = deque()
+            for chunk in read_chunks(path, fmt, chunk_size):
+                report.read += len(chunk[3])
+                validating.append(loop.run_in_executor(pool, validate_chunk, *chunk))
+                if len(validating) > workers:
+                    await _load(connection, await validating.popleft(), report, progress)
+            while validating:
+                await _load(connection, await validating.popleft(), report, progress)
+    finally:
+        await connection.close()
+
+    return report
+
+
+def _compile_merge() -> tuple[str, str]:
+    known_seller = exists().where(Seller.id == staging_table.c.seller_id)
+    # One row per key, the last one in the file wins
+    latest = (
+        select(*(staging_table.c[name] for name in IMPORT_COLUMNS))
+        .distinct(staging_table.c.seller_id, staging_table.c.isbn)
+        .where(known_seller)
+        .order_by(staging_table.c.seller_id, staging_table.c.isbn, staging_table.c.record.desc())
+    )
+    # Returns the written books, for their webhooks and audit entries
+    merge = upsert(insert(books_table).from_select(IMPORT_COLUMNS, latest))
+    unknown = select(func.count()).select_from(staging_table).where(~known_seller)
+    dialect = postgresql.asyncpg.dialect()
+    return str(merge.compile(dialect=dialect)), str(unknown.compile(dialect=dialect))
+
+
+# Run on a plain asyncpg connection, next to COPY
+CREATE_STAGING = str(CreateTable(staging_table).compile(dialect=postgresql.asyncpg.dialect()))
+MERGE, COUNT_UNKNOWN_SELLERS = _compile_merge()
+
+
+async def _load(connection: asyncpg.Connection, validated: tuple, report: ImportReport, progress) -> None:
+    rows, invalid, errors = validated
+    report.invalid += invalid
+    report.errors.extend(errors[: MAX_ERRORS - len(report.errors)])
+    if rows:
+        async with connection.transaction():
+            await connection.copy_records_to_table(
+                staging_table.name, records=rows, columns=[column.name for column in staging_table.c]
+            )
+            report.unknown_seller += await connection.fetchval(COUNT_UNKNOWN_SELLERS)
+            written = await connection.fetch(MERGE)
+            await _record(connection, written)
+        inserted = sum(row["inserted"] for row in written)
+        report.inserted += inserted
+        report.updated += len(written) - inserted
+        if written:
+            # Responses cached by the API workers on this host are stale now
+            entities = {BOOKS_TABLE}
+            for row in written:
+                entities.update((book_entity(row["id"]), seller_entity(row["seller_id"])))
+            response_cache.invalidate(*entities)
+    if progress is not None:
+        progress(report)
+
+
+async def _record(connection: asyncpg.Connection, written: list) -> None:
+    """
+    Queues the webhook events and audit entries of the written books, in the
+    merge's transaction, as the API does for its own writes.
+    """
+    if not written:
+        return
+    changes = [
+        ("book.created" if row["inserted"] else "book.updated", book_payload(dict(row)))
+        for row in written
+    ]
+    if settings.webhook_urls:
+        events = [orjson.dumps(webhook_event(action, data)).decode() for action, data in changes]
+        await connection.copy_records_to_table(
+            OutboxEvent.__tablename__,
+            records=[(url, event) for event in events for url in settings.webhook_urls],
+            columns=("destination", "payload"),
+        )
+    if settings.audit_enabled:
+        await connection.copy_records_to_table(
+            AuditEntry.__tablename__,
+            # No request, so no actor
+            records=[audit_event(action, data["id"], data, actor=(None, None)) for action, data in changes],
+            columns=AUDIT_COLUMNS,
+        )
@@ -0,0 +1,318 @@
+"""
+Background jobs queued in Postgres.
+
+Request handlers queue follow-up work with `enqueue()` in their own
+transaction, so a job exists exactly when the change that asked for it
+committed. Workers (python -m src.worker) claim due jobs with
+FOR UPDATE SKIP LOCKED, highest priority first, and run the handler
+registered for their kind with `@job(kind)`.
+
+A claimed job becomes invisible to other workers for a visibility timeout,
+which its worker keeps extending while the handler runs. If the worker
+dies, the job is claimed again once the timeout lapses. A failed job is
+retried with exponential backoff; after `max_attempts` claims it is kept
+with failed_at set. Delivery is at least once, so handlers must be
+idempotent.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterable, NamedTuple, Optional
+
+from sqlalchemy import Interval, bindparam, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.configurations.database import get_session_factory
+from src.configurations.settings import settings
+from src.models.jobs import Job
+from src.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["JOBS", "JobWorker", "enqueue", "enqueue_many", "job"]
+
+jobs_table = Job.__table__
+
+
+class Handler(NamedTuple):
+    fn: Callable[..., Awaitable[Any]]
+    timeout: float
+
+
+# Job kind -> handler, filled in by @job
+JOBS: dict[str, Handler] = {}
+
+
+def job(kind: str, timeout: float = settings.job_timeout_seconds):
+    """Registers the decorated coroutine function as the handler of `kind` jobs."""
+
+    def register_handler(fn: Callable[..., Awaitable[Any]]):
+        JOBS[kind] = Handler(fn, timeout)
+        return fn
+
+    return register_handler
+
+
+def enqueue(
+    session: AsyncSession,
+    kind: str,
+    payload: Optional[dict] = None,
+    priority: int = 0,
+    delay: float = 0.0,
+    max_attempts: int = settings.job_max_attempts,
+) -> Job:
+    """
+    Queues a job in the session's current transaction. The caller commits;
+    the id is set once the session flushes.
+    """
+    queued = Job(kind=kind, payload=payload or {}, priority=priority, max_attempts=max_attempts)
+    if delay:
+        queued.visible_at = func.now() + timedelta(seconds=delay)
+    session.add(queued)
+    return queued
+
+
+async def enqueue_many(
+    session: AsyncSession,
+    kind: str,
+    payloads: Iterable[dict],
+    priority: int = 0,
+    max_attempts: int = settings.job_max_attempts,
+) -> None:
+    """Queues one job per payload with a single multi-row INSERT. The caller commits."""
+    rows = [
+        {"kind": kind, "payload": payload, "priority": priority, "max_attempts": max_attempts}
+        for payload in payloads
+    ]
+    if rows:
+        await session.execute(insert(jobs_table), rows)
+
+
+_claimable = (
+    select(jobs_table.c.id)
+    .where(jobs_table.c.failed_at.is_(None), jobs_table.c.visible_at <= func.now())
+    .order_by(jobs_table.c.priority.desc(), jobs_table.c.visible_at)
+    .limit(bindparam("limit"))
+    .with_for_update(skip_locked=True)
+    .cte("claimable")
+)
+CLAIM = (
+    update(jobs_table)
+    .where(jobs_table.c.id == _claimable.c.id)
+    .values(
+        visible_at=func.now() + bindparam("visibility", type_=Interval),
+        attempts=jobs_table.c.attempts + 1,
+        lease=bindparam("worker"),
+    )
+    .returning(
+        jobs_table.c.id,
+        jobs_table.c.kind,
+        jobs_table.c.payload,
+        jobs_table.c.priority,
+        jobs_table.c.attempts,
+        jobs_table.c.max_attempts,
+    )
+)
+# Acknowledgements only apply while the worker still holds the job
+_held = (jobs_table.c.id == bindparam("job_id"), jobs_table.c.lease == bindparam("holder"))
+COMPLETE = delete(jobs_table).where(*_held)
+RETRY = (
+    update(jobs_table)
+    .where(*_held)
+    .values(
+        visible_at=func.now() + bindparam("delay", type_=Interval),
+        lease=None,
+        last_error=bindparam("error"),
+    )
+)
+GIVE_UP = update(jobs_table).where(*_held).values(failed_at=func.now(), lease=None, last_error=bindparam("error"))
+EXTEND = (
+    update(jobs_table)
+    .where(
+        jobs_table.c.id.in_(bindparam("job_ids", expanding=True)),
+        jobs_table.c.lease == bindparam("holder"),
+    )
+    .values(visible_at=func.now() + bindparam("visibility", type_=Interval))
+)
+
+
+class JobWorker:
+    """
+    Runs queued jobs, at most `concurrency` at a time.
+
+    Claims as many due jobs as it has free slots, and polls every
+    `poll_interval` seconds once the queue is empty. Each worker holds its
+    jobs under a lease of its own, extended every third of the visibility
+    timeout.
+    """
+
+    def __init__(
+        self,
+        session_factory_getter: Optional[Callable[[], async_sessionmaker]] = None,
+        handlers: Optional[dict[str, Handler]] = None,
+        concurrency: int = settings.job_worker_concurrency,
+        poll_interval: float = settings.job_poll_interval_seconds,
+        visibility_timeout: float = settings.job_visibility_timeout_seconds,
+        retry_base: float = settings.job_retry_base_seconds,
+        retry_max: float = settings.job_retry_max_seconds,
+    ):
+        # Resolved lazily: the engine only exists once global_init() has run
+        self._session_factory = session_factory_getter or get_session_factory
+        self.handlers = JOBS if handlers is None else handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease = uuid.uuid4()
+        self._running: dict[int, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+        self.claimed = 0
+        self.completed = 0
+        self.retried = 0
+        self.dead = 0
+        self.job_seconds = Histogram((0.001, 0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300))
+
+    async def claim(self, limit: int) -> list:
+        """Claims up to `limit` due jobs for this worker, highest priority first."""
+        async with self._session_factory()() as session:
+            result = await session.execute(
+                CLAIM,
+                {"limit": limit, "visibility": timedelta(seconds=self.visibility_timeout), "worker": self.lease},
+            )
+            claimed = result.all()
+            await session.commit()
+        self.claimed += len(claimed)
+        return sorted(claimed, key=lambda row: (-row.priority, row.id))
+
+    async def run(self) -> None:
+        """Runs jobs until `stop()` is called and done with the running ones."""
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            while not self._stopping:
+                self._wakeup.clear()
+                free = self.concurrency - len(self._running)
+                claimed = []
+                if free > 0:
+                    try:
+                        claimed = await self.claim(free)
+                    except Exception as e:
+                        logger.error("Claiming jobs failed: %s", e)
+                    for row in claimed:
+                        task = asyncio.create_task(self._execute(row))
+                        self._running[row.id] = task
+                        task.add_done_callback(lambda _, job_id=row.id: self._finished(job_id))
+                if free <= 0 or len(claimed) < free:
+                    # Full, or the queue is empty: wait for a free slot or the next poll
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+            # Leases are extended for as long as stop() lets the running jobs finish
+            if self._running:
+                await asyncio.wait(list(self._running.values()))
+        finally:
+            heartbeat.cancel()
+
+    async def stop(self, timeout: float = settings.job_shutdown_timeout_seconds) -> None:
+        """
+        Stops claiming and waits up to `timeout` seconds for running jobs.
+        Jobs still running are cancelled and run again after their lease lapses.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._running:
+            _, pending = await asyncio.wait(list(self._running.values()), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def _finished(self, job_id: int) -> None:
+        self._running.pop(job_id, None)
+        self._wakeup.set()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            if not self._running:
+                continue
+            try:
+                async with self._session_factory()() as session:
+                    await session.execute(
+                        EXTEND,
+                        {
+                            "job_ids": list(self._running),
+                            "holder": self.lease,
+                            "visibility": timedelta(seconds=self.visibility_timeout),
+                        },
+                    )
+                    await session.commit()
+            except Exception as e:
+                logger.error("Extending job leases failed: %s", e)
+
+    async def _execute(self, row) -> None:
+        started = time.perf_counter()
+        handler = self.handlers.get(row.kind)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler for {row.kind!r} jobs")
+            if row.attempts > row.max_attempts:
+                # Claimed again after crashing or stalling its workers every time
+                raise RuntimeError("Abandoned by its workers too many times")
+            await asyncio.wait_for(handler.fn(**row.payload), handler.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            final = handler is None or row.attempts >= row.max_attempts
+            logger.warning("Job %s (%s), attempt %d, failed: %r", row.id, row.kind, row.attempts, e)
+            await self._acknowledge(row, e, final)
+        else:
+            await self._acknowledge(row)
+        finally:
+            self.job_seconds.observe(time.perf_counter() - started)
+
+    async def _acknowledge(self, row, error: Optional[Exception] = None, final: bool = False) -> None:
+        params = {"job_id": row.id, "holder": self.lease}
+        if error is None:
+            statement = COMPLETE
+            self.completed += 1
+        elif final:
+            statement, params["error"] = GIVE_UP, repr(error)
+            self.dead += 1
+        else:
+            backoff = min(self.retry_base * 2 ** (row.attempts - 1), self.retry_max)
+            statement, params["error"], params["delay"] = RETRY, repr(error), timedelta(seconds=backoff)
+            self.retried += 1
+        try:
+            async with self._session_factory()() as session:
+                await session.execute(statement, params)
+                await session.commit()
+        except Exception as e:
+            # The lease lapses and the job runs again
+            logger.error("Acknowledging job %s failed: %s", row.id, e)
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._running),
+            "claimed": self.claimed,
+            "completed": self.completed,
+            "retried": self.retried,
+            "dead": self.dead,
+            "job_seconds": self.job_seconds.snapshot(),
+        }
+
+
+@job("export_snapshot", timeout=60 * 60)
+async def export_snapshot_job(directory: str, format: str = "parquet", partition_by_seller: bool = False) -> None:
+    """Writes a Parquet or Arrow snapshot of the catalogue, as `python -m src.cli export` does."""
+    from src.utils.exports import SNAPSHOT_OPTIONS, export_snapshot
+
+    async with get_session_factory()() as session:
+        connection = await session.connection(execution_options=SNAPSHOT_OPTIONS)
+        counts = await export_snapshot(connection, Path(directory), format, partition_by_seller)
+    logger.info("Exported %s to %s", counts, directory)
@@ -0,0 +1,167 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+
+A task on the loop wakes up every `interval` and records how late it was
+(the loop lag). A watchdog thread checks that those wake-ups keep coming:
+when the loop has been stuck for more than `threshold`, it captures the
+stack of the loop thread, i.e. of the code that is blocking it, and the
+route of the request being served at that moment. Stalls are counted per
+route and the last few are kept with their stacks for GET /api/v1/metrics/.
+
+Meant for staging and load tests; enabled with `loop_monitor_enabled`.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Optional
+
+from src.configurations.settings import settings
+from src.utils.metrics import Histogram, register
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["LoopMonitor", "LoopMonitorMiddleware", "loop_monitor"]
+
+# Innermost frames kept per stall
+STACK_DEPTH = 25
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, threshold: float, max_reports: int):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = Histogram(LAG_BUCKETS)
+        self.stall_duration = Histogram(LAG_BUCKETS)
+        self.stalls = 0
+        self.stalls_by_route: Counter[str] = Counter()
+        self.reports: deque[dict] = deque(maxlen=max_reports)
+
+        self._scopes: dict[asyncio.Task, dict] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._ticker: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._beat = 0.0
+        # The stall in progress and the beat it was detected on, completed
+        # once the loop is back
+        self._pending: Optional[tuple[dict, float]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._ticker is not None
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._ticker = asyncio.create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._stopped.set()
+        self._ticker.cancel()
+        try:
+            await self._ticker
+        except asyncio.CancelledError:
+            pass
+        self._ticker = None
+        self._watchdog.join()
+        self._watchdog = None
+
+    async def _tick(self) -> None:
+        while True:
+            now = time.monotonic()
+            if self._pending is not None:
+                self._finish_stall(now)
+            self._beat = now
+            await asyncio.sleep(self.interval)
+            self.lag.observe(max(0.0, time.monotonic() - self._beat - self.interval))
+
+    def _finish_stall(self, now: float) -> None:
+        report, beat = self._pending
+        self._pending = None
+        # Blocked from when the tick after `beat` was due until now
+        duration = max(0.0, now - beat - self.interval)
+        report["duration_ms"] = round(duration * 1000, 1)
+        self.stall_duration.observe(duration)
+        logger.warning(
+            "Event loop blocked for %.0f ms in %s\n%s",
+            duration * 1000, report["route"], "".join(report["stack"]),
+        )
+
+    def _watch(self) -> None:
+        reported = None
+        # Polling at half the threshold catches every stall 1.5x the threshold long
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._beat
+            if beat == reported or time.monotonic() - beat - self.interval < self.threshold:
+                continue
+            reported = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            route = self._route()
+            stack = traceback.format_list(traceback.extract_stack(frame)[-STACK_DEPTH:])
+            self.stalls += 1
+            self.stalls_by_route[route] += 1
+            report = {"route": route, "detected_at": time.time(), "duration_ms": None, "stack": stack}
+            self.reports.append(report)
+            self._pending = (report, beat)
+
+    def _route(self) -> str:
+        # Read from the watchdog thread: only a dict lookup on the loop's state
+        task = asyncio.current_task(self._loop)
+        scope = self._scopes.get(task) if task is not None else None
+        if scope is None:
+            return "unknown"
+        route = scope.get("route")
+        return f"{scope['method']} {route.path if route is not None else scope['path']}"
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "lag_seconds": self.lag.snapshot(),
+            "stalls": self.stalls,
+            "stall_seconds": self.stall_duration.snapshot(),
+            "stalls_by_route": dict(self.stalls_by_route),
+            "recent_stalls": list(self.reports),
+        }
+
+
+class LoopMonitorMiddleware:
+    """Records which request each task serves, so that stalls can be attributed to a route."""
+
+    def __init__(self, app, monitor: LoopMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.monitor.running:
+            return await self.app(scope, receive, send)
+
+        task = asyncio.current_task()
+        self.monitor._scopes[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor._scopes.pop(task, None)
+
+
+loop_monitor = LoopMonitor(
+    interval=settings.loop_monitor_interval_ms / 1000,
+    threshold=settings.loop_monitor_threshold_ms / 1000,
+    max_reports=settings.loop_monitor_max_reports,
+)
+register("event_loop", loop_monitor.stats)
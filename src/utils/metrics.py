@@ -0,0 +1,37 @@
+import bisect
+from typing import Callable, Sequence
+
+__all__ = ["Histogram", "collect", "register"]
+
+_providers: dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, provider: Callable[[], dict]) -> None:
+    """Registers a callable returning a JSON-serialisable dict of current values."""
+    _providers[name] = provider
+
+
+def collect() -> dict:
+    return {name: provider() for name, provider in _providers.items()}
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count, in the Prometheus style."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        cumulative, running = {}, 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {"buckets": cumulative, "count": self.count, "sum": self.sum}
@@ -0,0 +1,298 @@
+"""
+Transactional outbox for catalogue webhooks.
+
+Write routes call `enqueue()` in the transaction that changes a book or a
+seller: one row per configured destination goes into webhook_outbox and
+commits, or rolls back, with the change itself. `OutboxDispatcher` drains
+the table in the background. Each round claims a batch of due rows with
+FOR UPDATE SKIP LOCKED in a short transaction that moves their
+available_at a lease into the future, so any number of workers and
+replicas can drain concurrently without delivering a row twice. The rows
+are then grouped by destination and POSTed as {"events": [...]} on a
+pooled HTTP client, with no transaction or connection held. A second
+transaction deletes the delivered rows and reschedules failed ones with
+exponential backoff until they run out of attempts; rows of a dispatcher
+that dies mid-round are claimed again once their lease lapses.
+
+Delivery is at least once and not ordered: partners deduplicate and order
+on the event id and occurred_at.
+
+Events carry books as the API returns them (`ReturnedBook`) and sellers
+without their password. Price and stock are outside that contract: PUT
+/books/{id}/inventory and purchases queue no event, and partners that
+need them read GET /books/{id}/inventory.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+import httpx
+from sqlalchemy import Interval, bindparam, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.configurations.database import get_session_factory, on_commit
+from src.configurations.settings import settings
+from src.models.outbox import OutboxEvent
+from src.schemas import ReturnedBook
+from src.utils.metrics import Histogram, register
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "OutboxDispatcher",
+    "book_payload",
+    "enqueue",
+    "outbox_dispatcher",
+    "seller_payload",
+    "webhook_event",
+]
+
+outbox_table = OutboxEvent.__table__
+
+_due = (
+    select(outbox_table.c.id)
+    .where(outbox_table.c.failed_at.is_(None), outbox_table.c.available_at <= func.now())
+    .order_by(outbox_table.c.id)
+    .limit(bindparam("limit"))
+    .with_for_update(skip_locked=True)
+    .cte("due")
+)
+CLAIM = (
+    update(outbox_table)
+    .where(outbox_table.c.id == _due.c.id)
+    .values(available_at=func.now() + bindparam("lease", type_=Interval))
+    .returning(
+        outbox_table.c.id,
+        outbox_table.c.destination,
+        outbox_table.c.payload,
+        outbox_table.c.attempts,
+        outbox_table.c.available_at,
+    )
+)
+# Acknowledgements only apply while the claim holds: rows claimed again
+# after the lease lapsed have moved on to a later available_at
+_claimed = outbox_table.c.available_at == bindparam("claimed_until")
+DELIVERED = delete(outbox_table).where(outbox_table.c.id.in_(bindparam("ids", expanding=True)), _claimed)
+RETRY = (
+    update(outbox_table)
+    .where(outbox_table.c.id == bindparam("row_id"), _claimed)
+    .values(
+        attempts=outbox_table.c.attempts + 1,
+        last_error=bindparam("error"),
+        available_at=func.now() + bindparam("delay", type_=Interval),
+    )
+)
+GIVE_UP = (
+    update(outbox_table)
+    .where(outbox_table.c.id == bindparam("row_id"), _claimed)
+    .values(attempts=outbox_table.c.attempts + 1, last_error=bindparam("error"), failed_at=func.now())
+)
+
+
+def book_payload(book) -> dict:
+    return ReturnedBook.model_validate(book, from_attributes=True).model_dump(mode="json")
+
+
+def seller_payload(seller) -> dict:
+    return {
+        "id": seller.id,
+        "first_name": seller.first_name,
+        "last_name": seller.last_name,
+        "e_mail": seller.e_mail,
+    }
+
+
+def webhook_event(event_type: str, data: dict) -> dict:
+    """The payload of a webhook event, as POSTed to every destination."""
+    return {
+        "id": str(uuid.uuid4()),
+        "type": event_type,
+        "occurred_at": datetime.now(timezone.utc).isoformat(),
+        "data": data,
+    }
+
+
+def enqueue(session: AsyncSession, event_type: str, data: dict) -> None:
+    """
+    Queues a "book.created"-style event for every webhook destination, in the
+    session's current transaction. The caller commits.
+    """
+    if not settings.webhook_urls:
+        return
+    event = webhook_event(event_type, data)
+    session.add_all(OutboxEvent(destination=url, payload=event) for url in settings.webhook_urls)
+    # Delivered right away by this worker, instead of on the next poll
+    on_commit(session, outbox_dispatcher.wake)
+
+
+class OutboxDispatcher:
+    """
+    Drains webhook_outbox: `claim_size` rows per round, POSTed to their
+    destination `batch_size` events at a time, at most `concurrency`
+    requests in flight.
+    """
+
+    def __init__(
+        self,
+        session_factory_getter: Optional[Callable[[], async_sessionmaker]] = None,
+        batch_size: int = settings.webhook_batch_size,
+        claim_size: int = settings.webhook_claim_size,
+        concurrency: int = settings.webhook_concurrency,
+        timeout: float = settings.webhook_timeout_seconds,
+        poll_interval: float = settings.webhook_poll_interval_seconds,
+        max_attempts: int = settings.webhook_max_attempts,
+        retry_base: float = settings.webhook_retry_base_seconds,
+        retry_max: float = settings.webhook_retry_max_seconds,
+        lease: float = settings.webhook_lease_seconds,
+    ):
+        # Resolved lazily: the engine only exists once global_init() has run
+        self._session_factory = session_factory_getter or get_session_factory
+        self.batch_size = batch_size
+        self.claim_size = claim_size
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease = lease
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots = asyncio.Semaphore(concurrency)
+        self._wakeup = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+
+        self.delivered = 0
+        self.retried = 0
+        self.dead = 0
+        self.requests = 0
+        self.request_seconds = Histogram((0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency, max_keepalive_connections=self.concurrency
+                ),
+            )
+        return self._client
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stops draining; rows of an interrupted round are delivered again later."""
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.drain()
+            except Exception as e:
+                logger.error("Webhook outbox round failed: %s", e)
+                claimed = 0
+            if claimed < self.claim_size:
+                # Caught up: wait for a commit in this worker, or poll for the others'
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def drain(self) -> int:
+        """Delivers one round of due events and returns how many were claimed."""
+        async with self._session_factory()() as session:
+            result = await session.execute(
+                CLAIM, {"limit": self.claim_size, "lease": timedelta(seconds=self.lease)}
+            )
+            claimed = sorted(result.all(), key=lambda row: row.id)
+            await session.commit()
+        if not claimed:
+            return 0
+
+        by_destination = defaultdict(list)
+        for row in claimed:
+            by_destination[row.destination].append(row)
+        batches = [
+            rows[start:start + self.batch_size]
+            for rows in by_destination.values()
+            for start in range(0, len(rows), self.batch_size)
+        ]
+        errors = await asyncio.gather(*(self._post(batch) for batch in batches))
+
+        delivered, retries, given_up = [], [], []
+        for batch, error in zip(batches, errors):
+            if error is None:
+                delivered.extend(row.id for row in batch)
+                continue
+            for row in batch:
+                params = {"row_id": row.id, "claimed_until": row.available_at, "error": error}
+                if row.attempts + 1 >= self.max_attempts:
+                    given_up.append(params)
+                    logger.error("Giving up on webhook event %s for %s: %s", row.id, row.destination, error)
+                    continue
+                backoff = min(self.retry_base * 2 ** row.attempts, self.retry_max)
+                retries.append({**params, "delay": timedelta(seconds=backoff)})
+
+        async with self._session_factory()() as session:
+            if delivered:
+                await session.execute(DELIVERED, {"ids": delivered, "claimed_until": claimed[0].available_at})
+            if retries:
+                await session.execute(RETRY, retries)
+            if given_up:
+                await session.execute(GIVE_UP, given_up)
+            await session.commit()
+
+        self.delivered += len(delivered)
+        self.retried += len(retries)
+        self.dead += len(given_up)
+        return len(claimed)
+
+    async def _post(self, batch: list) -> Optional[str]:
+        """POSTs one batch; returns why it failed, or None."""
+        async with self._slots:
+            started = time.perf_counter()
+            self.requests += 1
+            try:
+                response = await self.client.post(
+                    batch[0].destination, json={"events": [row.payload for row in batch]}
+                )
+            except httpx.HTTPError as e:
+                return f"{type(e).__name__}: {e}"
+            finally:
+                self.request_seconds.observe(time.perf_counter() - started)
+        if response.is_success:
+            return None
+        return f"HTTP {response.status_code}"
+
+    def stats(self) -> dict:
+        return {
+            "running": self._runner is not None,
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "dead": self.dead,
+            "requests": self.requests,
+            "request_seconds": self.request_seconds.snapshot(),
+        }
+
+
+outbox_dispatcher = OutboxDispatcher()
+register("webhooks", outbox_dispatcher.stats)
@@ -0,0 +1,202 @@
+"""
+Deadlines and load shedding for the database-bound routes.
+
+- `deadline(seconds)` bounds a route: its statements run with a matching
+  Postgres statement_timeout and the request fails with 504 once it is spent.
+- A pool checkout that waits longer than `db_pool_timeout_seconds`, and a
+  statement cancelled by statement_timeout, are answered with 503 / 504
+  by the handlers registered in `src.main`.
+- `limit_db_concurrency` admits requests through an adaptive (AIMD)
+  concurrency limit, so that overload is shed with a fast 503 instead of
+  queueing until every request times out.
+"""
+import asyncio
+import time
+from collections import deque
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.configurations.database import statement_timeout
+from src.configurations.settings import settings
+from src.utils.metrics import Histogram, register
+
+__all__ = [
+    "AdaptiveLimiter",
+    "Overloaded",
+    "db_limiter",
+    "deadline",
+    "handle_overload",
+    "is_overload",
+    "limit_db_concurrency",
+]
+
+# SQLSTATE query_canceled, raised when statement_timeout fires
+QUERY_CANCELED = "57014"
+RETRY_AFTER = {"Retry-After": "1"}
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of being queued."""
+
+
+def _is_cancelled_statement(error: Exception) -> bool:
+    return isinstance(error, DBAPIError) and getattr(error.orig, "sqlstate", None) == QUERY_CANCELED
+
+
+def is_overload(error: Exception) -> bool:
+    """True for the errors that signal an overloaded database."""
+    return isinstance(error, (Overloaded, PoolTimeoutError)) or _is_cancelled_statement(error)
+
+
+async def handle_overload(request: Request, error: Exception) -> ORJSONResponse:
+    if not is_overload(error):
+        # Any other database error stays a 500
+        raise error
+    if _is_cancelled_statement(error):
+        return ORJSONResponse(
+            {"detail": "Deadline exceeded"}, status_code=status.HTTP_504_GATEWAY_TIMEOUT
+        )
+    return ORJSONResponse(
+        {"detail": "Service overloaded, retry later"},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers=RETRY_AFTER,
+    )
+
+
+def deadline(seconds: float):
+    """
+    Dependency factory bounding a route to `seconds`, statements included.
+
+        @router.get("/", dependencies=[Depends(deadline(2))])
+    """
+    timeout_ms = int(seconds * 1000)
+
+    async def bounded():
+        token = statement_timeout.set(timeout_ms)
+        try:
+            async with asyncio.timeout(seconds):
+                yield
+        except TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Deadline exceeded"
+            )
+        finally:
+            statement_timeout.reset(token)
+
+    return bounded
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to observed latency (AIMD).
+
+    The limit grows by about one for every `limit` requests that finish
+    within `target_latency` while the limit is in use, and shrinks by
+    `backoff` when requests are slow or fail with an overload error, at
+    most once per `target_latency`. Requests over the limit wait up to
+    `queue_timeout` for a slot and are then rejected with `Overloaded`.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        target_latency: float,
+        queue_timeout: float,
+        backoff: float = 0.9,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.queue_timeout = queue_timeout
+        self.backoff = backoff
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+
+        self.admitted = 0
+        self.rejected = 0
+        self.latency = Histogram((0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+
+    async def acquire(self) -> None:
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up: pass it on
+                self.in_flight -= 1
+                self._wake()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.rejected += 1
+            raise Overloaded() from None
+        self.admitted += 1
+
+    def release(self, latency: float, overloaded: bool = False) -> None:
+        self.in_flight -= 1
+        self.latency.observe(latency)
+        if overloaded or latency > self.target_latency:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.target_latency:
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif self.in_flight + 1 >= self.limit / 2:
+            # Only grow while the limit is actually what bounds concurrency
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "latency_seconds": self.latency.snapshot(),
+        }
+
+
+db_limiter = AdaptiveLimiter(
+    initial=settings.db_limiter_initial,
+    min_limit=settings.db_limiter_min,
+    max_limit=settings.db_limiter_max,
+    target_latency=settings.db_limiter_target_latency_ms / 1000,
+    queue_timeout=settings.db_limiter_queue_timeout_ms / 1000,
+)
+register("db_limiter", db_limiter.stats)
+
+
+async def limit_db_concurrency():
+    """Router dependency admitting requests through `db_limiter`."""
+    await db_limiter.acquire()
+    started = time.perf_counter()
+    overloaded = False
+    try:
+        yield
+    except Exception as e:
+        overloaded = is_overload(e)
+        raise
+    finally:
+        db_limiter.release(time.perf_counter() - started, overloaded)
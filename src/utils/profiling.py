@@ -0,0 +1,273 @@
+"""
+On-demand request profiling.
+
+A request is profiled when it carries `X-Profile-Token: <profiling_token>`,
+or when the admin toggle (PUT /api/v1/profiling/) samples one request in N.
+While profiled requests are in flight, a thread samples the stack of the
+event loop every `profiling_interval_ms`; samples taken while the request's
+task is running are charged to it. Each sample is classified by the frames
+on its stack into validation, DB, ORM hydration, serialisation or other
+work; time spent inside database statements is measured exactly with
+engine events instead.
+
+Profiles are kept in memory (per worker) and served as collapsed stacks,
+the input format of flamegraph.pl, speedscope and inferno. Requests that
+asked for a profile also get a Server-Timing header with the breakdown and
+an X-Profile-Id header to fetch it with.
+"""
+import asyncio
+import hmac
+import itertools
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.configurations.settings import settings
+
+__all__ = ["PHASES", "ProfilingMiddleware", "RequestProfile", "is_authorised", "profiler"]
+
+TOKEN_HEADER = b"x-profile-token"
+PHASES = ("validation", "db", "orm_hydration", "serialisation", "other")
+
+# The first rule matching any frame of a sample decides its phase, so the
+# more specific phases come first: hydration runs under session.execute()
+# and serialisation validates the response model.
+PHASE_RULES = (
+    ("orm_hydration", "sqlalchemy/orm/loading.py", None),
+    ("serialisation", "fastapi/routing.py", "serialize_response"),
+    ("serialisation", "fastapi/encoders.py", None),
+    ("serialisation", "starlette/responses.py", "render"),
+    # The routes build their bodies with Model.model_validate(row).model_dump_json()
+    ("serialisation", "pydantic/main.py", "model_validate"),
+    ("serialisation", "pydantic/main.py", "model_dump_json"),
+    ("db", "sqlalchemy/", None),
+    ("db", "asyncpg/", None),
+    ("validation", "fastapi/dependencies/utils.py", None),
+)
+
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+def is_authorised(token: Optional[str]) -> bool:
+    return bool(settings.profiling_token) and token is not None and hmac.compare_digest(
+        token.encode(), settings.profiling_token.encode()
+    )
+
+
+def _label(code) -> str:
+    filename = code.co_filename.replace("\\", "/")
+    if "site-packages/" in filename:
+        filename = filename.rsplit("site-packages/", 1)[1]
+    elif "/src/" in filename:
+        filename = "src/" + filename.rsplit("/src/", 1)[1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _task_stack(frame) -> list:
+    """Code objects of the running task, outermost first."""
+    codes = []
+    while frame is not None:
+        code = frame.f_code
+        # Everything above Handle._run belongs to the event loop itself
+        if code.co_name == "_run" and code.co_filename.endswith("asyncio/events.py"):
+            break
+        codes.append(code)
+        frame = frame.f_back
+    codes.reverse()
+    return codes
+
+
+def _phase(codes: list) -> str:
+    for phase, path, name in PHASE_RULES:
+        for code in codes:
+            if path in code.co_filename.replace("\\", "/") and (name is None or code.co_name == name):
+                return phase
+    return "other"
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration = 0.0
+        self.status: Optional[int] = None
+        self.samples = 0
+        self.db_time = 0.0
+        self.statements = 0
+        self.cpu_time: Counter[str] = Counter()
+        self.stacks: Counter[str] = Counter()
+
+    def add_sample(self, codes: list, weight: float) -> None:
+        phase = _phase(codes)
+        self.samples += 1
+        if phase != "db":
+            # DB time is measured, not estimated
+            self.cpu_time[phase] += weight
+        self.stacks[";".join((phase, *map(_label, codes)))] += 1
+
+    def finish(self, status: Optional[int] = None) -> None:
+        self.duration = time.perf_counter() - self._started
+        if status is not None:
+            self.status = status
+
+    def phases(self) -> dict[str, float]:
+        """Seconds per phase; `waiting` is time the request spent suspended outside the database."""
+        duration = self.duration or time.perf_counter() - self._started
+        phases = {phase: self.cpu_time.get(phase, 0.0) for phase in PHASES}
+        phases["db"] = self.db_time
+        phases["waiting"] = max(0.0, duration - sum(phases.values()))
+        phases["total"] = duration
+        return phases
+
+    def server_timing(self) -> bytes:
+        return ", ".join(
+            f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases().items()
+        ).encode()
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, one "frame;frame;... count" line per distinct stack."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "samples": self.samples,
+            "statements": self.statements,
+            "phases_ms": {phase: round(seconds * 1000, 2) for phase, seconds in self.phases().items()},
+        }
+
+
+class Profiler:
+    """Samples the event loop thread while profiled requests are in flight."""
+
+    def __init__(self, interval: float, max_profiles: int):
+        self.interval = interval
+        self.sample_every = 0
+        self.profiles: deque[RequestProfile] = deque(maxlen=max_profiles)
+        self._requests = itertools.count(1)
+        self._active: dict[asyncio.Task, RequestProfile] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        # Set to stop the running sampler thread
+        self._sampler: Optional[threading.Event] = None
+        self._switch_interval: Optional[float] = None
+
+    def should_sample(self) -> bool:
+        return self.sample_every > 0 and next(self._requests) % self.sample_every == 0
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return next((profile for profile in self.profiles if profile.id == profile_id), None)
+
+    def begin(self, profile: RequestProfile) -> None:
+        self._active[asyncio.current_task()] = profile
+        if self._sampler is None:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            # Let the sampler thread take the GIL as often as it samples
+            self._switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(self._switch_interval, self.interval))
+            self._sampler = threading.Event()
+            threading.Thread(
+                target=self._sample, args=(self._sampler,), name="request-profiler", daemon=True
+            ).start()
+
+    def end(self, profile: RequestProfile) -> None:
+        self._active.pop(asyncio.current_task(), None)
+        self.profiles.append(profile)
+        if not self._active and self._sampler is not None:
+            # Not joined, which would block the loop: the thread exits within one interval
+            self._sampler.set()
+            self._sampler = None
+            sys.setswitchinterval(self._switch_interval)
+
+    def _sample(self, stopped: threading.Event) -> None:
+        last = time.perf_counter()
+        while not stopped.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            task = asyncio.current_task(self._loop)
+            profile = self._active.get(task) if task is not None else None
+            frame = sys._current_frames().get(self._loop_thread)
+            if profile is not None and frame is not None:
+                profile.add_sample(_task_stack(frame), weight)
+
+
+profiler = Profiler(settings.profiling_interval_ms / 1000, settings.profiling_max_profiles)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _statement_started(conn, cursor, statement, parameters, context, executemany) -> None:
+    if current_profile.get() is not None and context is not None:
+        context._profile_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _statement_finished(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = current_profile.get()
+    if profile is not None and (started := getattr(context, "_profile_started", None)) is not None:
+        profile.db_time += time.perf_counter() - started
+        profile.statements += 1
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests that carry a valid X-Profile-Token header, and one
+    in `profiler.sample_every` other requests.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.profiling_token:
+            return await self.app(scope, receive, send)
+
+        token = next((value for name, value in scope["headers"] if name == TOKEN_HEADER), None)
+        requested = token is not None and is_authorised(token.decode("latin-1"))
+        if not requested and not profiler.should_sample():
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        status = None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if requested:
+                    # The body is rendered by now: the breakdown is complete but for sending it
+                    profile.finish()
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", []),
+                            (b"server-timing", profile.server_timing()),
+                            (b"x-profile-id", profile.id.encode()),
+                        ],
+                    }
+            await send(message)
+
+        context_token = current_profile.set(profile)
+        profiler.begin(profile)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if (route := scope.get("route")) is not None:
+                profile.path = route.path
+            profile.finish(status)
+            profiler.end(profile)
+            current_profile.reset(context_token)
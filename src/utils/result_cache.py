@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, Optional
+
+from src.configurations.database import get_session_factory
+from src.configurations.settings import settings
+from src.utils.metrics import register
+from src.utils.shared_cache import SharedCache, response_cache
+from src.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["ResultCache", "cache_key", "refresh_with_session", "result_cache"]
+
+Render = Callable[[], Awaitable[bytes]]
+
+
+def cache_key(name: str, **params) -> tuple:
+    """Key for a list query: its name and the parameters that are set, in a fixed order."""
+    return (name, *sorted((param, value) for param, value in params.items() if value is not None))
+
+
+def refresh_with_session(render: Callable[..., Awaitable[bytes]], *args) -> Render:
+    """Wraps `render(session, *args)` to run on a session of its own, for background refreshes."""
+
+    async def refresh() -> bytes:
+        async with get_session_factory()() as session:
+            return await render(session, *args)
+
+    return refresh
+
+
+class _Entry:
+    __slots__ = ("body", "versions", "stored_at", "refreshing")
+
+    def __init__(self, body: bytes, versions: tuple):
+        self.body = body
+        self.versions = versions
+        self.stored_at = time.monotonic()
+        self.refreshing = False
+
+
+class ResultCache:
+    """
+    Per-worker LRU of rendered list responses, bounded by their total size.
+
+    Each entry is tagged with what it was rendered from: tables ("table:books")
+    and sellers ("seller:<id>"). Tag versions are the generation counters of
+    the host-wide `SharedCache`, which the write routes bump after commit, so
+    a write in any worker drops exactly the entries, in every worker, that
+    carry one of its tags: a new book of seller 7 invalidates the book list
+    and seller 7's list, while other sellers' lists stay cached.
+
+    Entries older than `ttl` are still served for `stale_ttl` more seconds
+    while one background refresh renders them again; invalidated entries
+    are never served.
+    """
+
+    def __init__(self, versions: SharedCache, max_bytes: int, ttl: float, stale_ttl: float):
+        self.versions = versions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.bytes = 0
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._flights = SingleFlight()
+        self._refreshes: set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    def _versions(self, tags: tuple[str, ...]) -> Optional[tuple]:
+        stamps = tuple(self.versions.stamp(tag) for tag in tags)
+        return None if None in stamps else stamps
+
+    async def fetch(
+        self, key: Hashable, tags: tuple[str, ...], render: Render, refresh: Optional[Render] = None
+    ) -> bytes:
+        """
+        The cached body for `key`, or the result of `render()`. `refresh`
+        renders without the request's session and enables stale-while-revalidate.
+        """
+        versions = self._versions(tags)
+        if versions is None:
+            # Without the shared counters, writes could not be tracked
+            return await render()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.versions == versions:
+                age = time.monotonic() - entry.stored_at
+                if age <= self.ttl:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return entry.body
+                if refresh is not None and age <= self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    if not entry.refreshing:
+                        self._refresh(key, tags, entry, refresh)
+                    return entry.body
+            else:
+                self.invalidated += 1
+
+        self.misses += 1
+        return await self._flights.do(key, self._rendered(key, tags, render))
+
+    def _refresh(self, key: Hashable, tags: tuple[str, ...], entry: _Entry, refresh: Render) -> None:
+        entry.refreshing = True
+        self.refreshes += 1
+
+        async def run() -> None:
+            try:
+                await self._flights.do(key, self._rendered(key, tags, refresh))
+            except Exception as e:
+                logger.warning("Background refresh of %s failed: %s", key, e)
+                entry.refreshing = False
+
+        task = asyncio.create_task(run())
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    def _rendered(self, key: Hashable, tags: tuple[str, ...], render: Render) -> Render:
+        """
+        Renders and stores the body, run by the flight's leader only: callers
+        joining the flight after a write would otherwise store the body
+        rendered before it under their newer versions.
+        """
+
+        async def leader() -> bytes:
+            # Taken before rendering: a write committed meanwhile leaves the entry stale
+            versions = self._versions(tags)
+            body = await render()
+            self._store(key, versions, body)
+            return body
+
+        return leader
+
+    def _store(self, key: Hashable, versions: Optional[tuple], body: bytes) -> None:
+        if versions is None or len(body) > self.max_bytes:
+            return
+        if (old := self._entries.pop(key, None)) is not None:
+            self.bytes -= len(old.body)
+        self._entries[key] = _Entry(body, versions)
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= len(evicted.body)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    async def close(self) -> None:
+        for task in list(self._refreshes):
+            task.cancel()
+        await asyncio.gather(*self._refreshes, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "invalidated": self.invalidated,
+            "evictions": self.evictions,
+            "refreshes": self.refreshes,
+        }
+
+
+result_cache = ResultCache(
+    versions=response_cache,
+    max_bytes=settings.result_cache_max_bytes,
+    ttl=settings.result_cache_ttl_seconds,
+    stale_ttl=settings.result_cache_stale_seconds,
+)
+register("result_cache", result_cache.stats)
@@ -0,0 +1,259 @@
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Awaitable, Callable, Optional
+
+from src.configurations.settings import settings
+from src.utils.metrics import register
+from src.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["BOOKS_TABLE", "SELLERS_TABLE", "SharedCache", "book_entity", "response_cache", "seller_entity"]
+
+# File layout: header | generation counters | slots
+HEADER_SIZE = 64
+EPOCH = struct.Struct("<Q")
+COUNTER = struct.Struct("<Q")
+# seq, key hash, epoch, generation, stored at, key length, value length
+SLOT_HEADER = struct.Struct("<QQQQdII")
+
+
+def _digest(data: bytes) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+# Bumped by every write to the table, for results that read all of it
+BOOKS_TABLE = "table:books"
+SELLERS_TABLE = "table:sellers"
+
+
+def book_entity(book_id: int) -> str:
+    return f"book:{book_id}"
+
+
+def seller_entity(seller_id: int) -> str:
+    return f"seller:{seller_id}"
+
+
+class SharedCache:
+    """
+    Response cache in a memory-mapped file, shared by the workers of a host.
+
+    The file is split into `slots` fixed-size slots; a key lives in the slot
+    its hash points to and simply replaces whatever was there. Each entry
+    records the generation of the entity it was rendered from (a book, a
+    seller); write routes bump that generation after commit, which turns
+    every entry rendered from the entity stale. Generation counters are
+    hashed into a fixed table as well, so a collision only costs a miss.
+    `invalidate_all()` bumps an epoch that every entry is checked against.
+
+    Readers take no lock: a slot carries a sequence number that is odd
+    while it is being written, and a read that sees it change is a miss.
+    A hit copies the value out of the map rather than returning a view of
+    it: a view would have to stay valid until the response body has been
+    sent, and any worker may overwrite the slot meanwhile. The copy is one
+    memcpy of at most `slot_size` bytes and is taken before the sequence
+    number is checked again.
+    Writers of a slot or a counter serialise on an fcntl byte-range lock;
+    a slot that is being filled by another worker is not waited for.
+    Writes made on other hosts are not seen, so entries also expire after
+    `ttl` seconds.
+    """
+
+    def __init__(
+        self, path: str, slots: int, slot_size: int, generations: int, ttl: float, enabled: bool = True
+    ):
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.generations = generations
+        self.ttl = ttl
+        self.enabled = enabled
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._slots_offset = HEADER_SIZE + generations * COUNTER.size
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.stores = 0
+        self.skipped = 0
+
+    @property
+    def size(self) -> int:
+        return self._slots_offset + self.slots * self.slot_size
+
+    def _mapped(self) -> Optional[mmap.mmap]:
+        if self._map is None and self.enabled:
+            try:
+                # Zero-filled is a valid, empty cache: whoever comes first creates it
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                if os.fstat(self._fd).st_size < self.size:
+                    os.ftruncate(self._fd, self.size)
+                self._map = mmap.mmap(self._fd, self.size)
+            except OSError as e:
+                logger.warning("Shared cache disabled, cannot map %s: %s", self.path, e)
+                self.enabled = False
+        return self._map
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            os.close(self._fd)
+            self._map = self._fd = None
+
+    def _epoch(self, buffer: mmap.mmap) -> int:
+        return EPOCH.unpack_from(buffer, 0)[0]
+
+    def _counter_offset(self, entity: str) -> int:
+        return HEADER_SIZE + _digest(entity.encode()) % self.generations * COUNTER.size
+
+    def stamp(self, entity: str) -> Optional[tuple[int, int]]:
+        """
+        (epoch, generation) of `entity`. Taken before rendering, so that a
+        write committed meanwhile leaves the stored entry stale.
+        """
+        if (buffer := self._mapped()) is None:
+            return None
+        return self._epoch(buffer), COUNTER.unpack_from(buffer, self._counter_offset(entity))[0]
+
+    def get(self, key: str, entity: str) -> Optional[bytes]:
+        if (buffer := self._mapped()) is None:
+            return None
+        encoded = key.encode()
+        digest = _digest(encoded)
+        offset = self._slots_offset + digest % self.slots * self.slot_size
+        seq, key_hash, epoch, generation, stored_at, key_length, value_length = SLOT_HEADER.unpack_from(
+            buffer, offset
+        )
+        if seq == 0 or seq & 1 or key_hash != digest:
+            self.misses += 1
+            return None
+        if (epoch, generation) != self.stamp(entity) or time.time() - stored_at > self.ttl:
+            self.stale += 1
+            return None
+
+        start = offset + SLOT_HEADER.size
+        end = start + key_length + value_length
+        if end > offset + self.slot_size or buffer[start:start + key_length] != encoded:
+            self.misses += 1
+            return None
+        value = buffer[start + key_length:end]
+        if COUNTER.unpack_from(buffer, offset)[0] != seq:
+            # Rewritten while we were copying
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: str, stamp: Optional[tuple[int, int]], value: bytes) -> None:
+        if stamp is None or (buffer := self._mapped()) is None:
+            return
+        encoded = key.encode()
+        if SLOT_HEADER.size + len(encoded) + len(value) > self.slot_size:
+            self.skipped += 1
+            return
+        digest = _digest(encoded)
+        offset = self._slots_offset + digest % self.slots * self.slot_size
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, self.slot_size, offset)
+        except OSError:
+            # Another worker is filling this slot
+            self.skipped += 1
+            return
+        try:
+            seq = COUNTER.unpack_from(buffer, offset)[0]
+            COUNTER.pack_into(buffer, offset, seq + 1)
+            start = offset + SLOT_HEADER.size
+            buffer[start:start + len(encoded)] = encoded
+            buffer[start + len(encoded):start + len(encoded) + len(value)] = value
+            SLOT_HEADER.pack_into(
+                buffer, offset, seq + 1, digest, *stamp, time.time(), len(encoded), len(value)
+            )
+            COUNTER.pack_into(buffer, offset, seq + 2)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.slot_size, offset)
+        self.stores += 1
+
+    async def fetch(
+        self,
+        key: str,
+        entity: str,
+        render: Callable[[], Awaitable[Optional[bytes]]],
+        flights: Optional[SingleFlight] = None,
+    ) -> Optional[bytes]:
+        """
+        The cached body for `key`, or the result of `render()`, which is stored
+        unless None. With `flights`, concurrent misses share one render, and
+        only its leader stamps and stores it: a caller joining after a write
+        would otherwise store the body rendered before it as current.
+        """
+        if (body := self.get(key, entity)) is not None:
+            return body
+
+        async def leader() -> Optional[bytes]:
+            stamp = self.stamp(entity)
+            body = await render()
+            if body is not None:
+                self.put(key, stamp, body)
+            return body
+
+        return await (flights.do(key, leader) if flights is not None else leader())
+
+    def _bump(self, offset: int) -> None:
+        buffer = self._map
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, COUNTER.size, offset)
+        try:
+            COUNTER.pack_into(buffer, offset, COUNTER.unpack_from(buffer, offset)[0] + 1)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, COUNTER.size, offset)
+
+    def invalidate(self, *entities: str) -> None:
+        """Makes every entry rendered from `entities` stale, in all workers."""
+        if self._mapped() is None:
+            return
+        for entity in entities:
+            self._bump(self._counter_offset(entity))
+
+    def invalidate_all(self) -> None:
+        if self._mapped() is None:
+            return
+        self._bump(0)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "stores": self.stores,
+            "skipped": self.skipped,
+        }
+
+
+def _default_path() -> str:
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    # The layout is part of the name, so that resizing never reads an old file
+    return os.path.join(
+        directory,
+        f"{settings.db_name}-responses-{settings.shared_cache_generations}-"
+        f"{settings.shared_cache_slots}x{settings.shared_cache_slot_size}",
+    )
+
+
+response_cache = SharedCache(
+    path=settings.shared_cache_path or _default_path(),
+    slots=settings.shared_cache_slots,
+    slot_size=settings.shared_cache_slot_size,
+    generations=settings.shared_cache_generations,
+    ttl=settings.shared_cache_ttl_seconds,
+    enabled=settings.shared_cache_enabled,
+)
+register("shared_cache", response_cache.stats)
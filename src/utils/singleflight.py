@@ -0,0 +1,69 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from src.utils.metrics import register
+
+__all__ = ["SingleFlight", "book_flights", "seller_flights"]
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one.
+
+    The first caller for a key runs `fn`; callers arriving while it is in
+    flight await the same result (or exception) instead of running `fn`
+    again. Nothing is kept once the call completes, but a caller that joins
+    after a write committed still gets the result of a call started before
+    it: results can be as stale as the longest call. Callers that cache
+    results must stamp and store them in `fn`, not after `do()` returns.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        while (call := self._calls.get(key)) is not None:
+            self.followers += 1
+            try:
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                # The leader was cancelled (e.g. its client went away): unless we
+                # were cancelled ourselves, take over and run the call.
+                if not call.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        self.leaders += 1
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as e:
+            call.set_exception(e)
+            # Followers retrieve the exception; mark it retrieved for the leader too.
+            call.exception()
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "followers": self.followers,
+        }
+
+
+book_flights = SingleFlight()
+seller_flights = SingleFlight()
+register("single_flight_books", book_flights.stats)
+register("single_flight_sellers", seller_flights.stats)
@@ -0,0 +1,97 @@
+"""
+Pre-built statements for the hot request paths.
+
+Building a `select()` on every request costs Python time for construction
+and for generating the cache key that SQLAlchemy uses to look up the
+compiled SQL. These statements are built once at import time with named
+bind parameters; their cache keys are memoized on the statement object, so
+executing them goes straight to the compiled-statement cache and, on a
+warm connection, to asyncpg's prepared-statement cache.
+
+Usage:
+    result = await session.execute(BOOK_BY_ID, {"book_id": book_id})
+"""
+from sqlalchemy import Integer, bindparam, insert, select, update
+from sqlalchemy.orm import selectinload
+
+from src.models.books import Book
+from src.models.orders import Order
+from src.models.sellers import Seller
+
+__all__ = [
+    "ALL_BOOKS",
+    "ALL_SELLERS_WITH_BOOKS",
+    "BOOK_BY_ID",
+    "BOOK_INVENTORY",
+    "BOOKS_BY_SELLER",
+    "HOT_STATEMENTS",
+    "PURCHASE",
+    "SELLER_BY_EMAIL",
+    "SELLER_EXISTS",
+    "SELLER_WITH_BOOKS",
+]
+
+ALL_BOOKS = select(Book)
+
+BOOK_BY_ID = select(Book).where(Book.id == bindparam("book_id"))
+
+BOOKS_BY_SELLER = select(Book).where(Book.seller_id == bindparam("seller_id"))
+
+BOOK_INVENTORY = select(Book.price, Book.stock).where(Book.id == bindparam("book_id"))
+
+SELLER_EXISTS = select(Seller.id).where(Seller.id == bindparam("seller_id"))
+
+SELLER_BY_EMAIL = select(Seller).where(Seller.e_mail == bindparam("e_mail"))
+
+SELLER_WITH_BOOKS = (
+    select(Seller)
+    .where(Seller.id == bindparam("seller_id"))
+    .options(selectinload(Seller.books))
+)
+
+
+ALL_SELLERS_WITH_BOOKS = select(Seller).options(selectinload(Seller.books))
+
+
+# Decrements stock only if enough is left and records the order, in one
+# statement: the row lock taken by the UPDATE serialises concurrent buyers and
+# the WHERE is re-checked after each wait, so stock can never be oversold.
+# No row is returned when the book is missing or out of stock.
+_quantity = bindparam("quantity", type_=Integer)
+_purchased = (
+    update(Book)
+    .where(Book.id == bindparam("book_id"), Book.stock >= _quantity)
+    .values(stock=Book.stock - _quantity)
+    .returning(Book.id, Book.price, Book.stock)
+    .cte("purchased")
+)
+# Core rather than ORM INSERT: with ORM inserts, execute() parameters are rows
+_orders = Order.__table__
+PURCHASE = (
+    insert(_orders)
+    .from_select(
+        ["book_id", "quantity", "unit_price"],
+        select(_purchased.c.id, _quantity, _purchased.c.price),
+    )
+    .returning(
+        _orders.c.id,
+        _orders.c.book_id,
+        _orders.c.quantity,
+        _orders.c.unit_price,
+        _orders.c.created_at,
+        select(_purchased.c.stock).scalar_subquery().label("remaining_stock"),
+    )
+    .add_cte(_purchased)
+)
+
+
+# Run with these sample parameters on every pooled connection at startup, so
+# the first real requests find the SQL compiled and prepared.
+HOT_STATEMENTS = {
+    "book by id": (BOOK_BY_ID, {"book_id": 0}),
+    "book inventory": (BOOK_INVENTORY, {"book_id": 0}),
+    "seller exists": (SELLER_EXISTS, {"seller_id": 0}),
+    "seller by e-mail": (SELLER_BY_EMAIL, {"e_mail": ""}),
+    "seller with books": (SELLER_WITH_BOOKS, {"seller_id": 0}),
+    "purchase": (PURCHASE, {"book_id": 0, "quantity": 1}),
+}
@@ -0,0 +1,78 @@
+"""
+Background job worker, see src/utils/jobs.py.
+
+    python -m src.worker
+    python -m src.worker --concurrency 32
+
+Runs until SIGTERM or SIGINT, then stops claiming jobs and gives running
+ones job_shutdown_timeout_seconds to finish. Any number of workers can run
+against the same database; set job_worker_replicas to their number so that
+the server leaves them their connections (see src/server.py).
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+from typing import Optional
+
+from src.configurations.settings import settings
+
+
+def pool_size(concurrency: int) -> int:
+    """Every running job may hold a pooled connection, next to claims and lease extensions."""
+    return concurrency + 2
+
+
+def connections(concurrency: Optional[int] = None) -> int:
+    """All connections of one worker: its pool and the audit log's COPY connection."""
+    concurrency = settings.job_worker_concurrency if concurrency is None else concurrency
+    return pool_size(concurrency) + (1 if settings.audit_enabled else 0)
+
+
+async def work(concurrency: int) -> None:
+    from src.configurations.database import drain, global_init
+    from src.utils.audit import audit_log
+    from src.utils.jobs import JOBS, JobWorker
+
+    # Exactly what connections() budgets for: no overflow
+    settings.max_connection_count = pool_size(concurrency)
+    settings.db_max_overflow = 0
+    global_init()
+
+    worker = JobWorker(concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, lambda: asyncio.ensure_future(worker.stop()))
+
+    # Jobs writing books or sellers audit them like the routes do
+    if settings.audit_enabled:
+        await audit_log.start()
+
+    print(f"Worker {worker.lease} running {concurrency} jobs at a time: {', '.join(sorted(JOBS))}")
+    # Returns once the signal's stop() is done with the running jobs
+    await worker.run()
+    print(f"Worker stopped: {worker.stats()['completed']} jobs completed")
+    await audit_log.close()
+    await drain(settings.db_drain_timeout_seconds)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.worker")
+    parser.add_argument("--concurrency", type=int, default=settings.job_worker_concurrency)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=settings.server_log_level.upper())
+    # Logging every statement costs more than running some of them
+    if "DB_ECHO" not in os.environ:
+        settings.db_echo = False
+
+    import uvloop
+
+    uvloop.run(work(args.concurrency))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import asyncio
+import uuid
 
 import pytest
 import pytest_asyncio
@@ -9,6 +10,8 @@ from sqlalchemy.pool import NullPool
 from src.configurations.database import run_alembic_upgrade
 from src.configurations.settings import settings
 from src.models.base import BaseModel
+from src.models.sellers import Seller
+from src.utils.shared_cache import response_cache
 
 # Create an async engine for the test DB
 async_test_engine = create_async_engine(
@@ -41,6 +44,8 @@ async def db_session():
             await session.execute(text("TRUNCATE TABLE books_table CASCADE"))
             await session.execute(text("TRUNCATE TABLE sellers CASCADE"))
             await session.commit()
+            # Ids are reused across tests: drop responses cached for them
+            response_cache.invalidate_all()
 
             yield session
         finally:
@@ -91,3 +96,16 @@ async def async_client(test_app):
         transport=ASGITransport(app=test_app), base_url="http://127.0.0.1:8000"
     ) as client:
         yield client
+
+
+@pytest_asyncio.fixture
+async def create_seller(db_session):
+    """Provide a committed seller with a unique e-mail address."""
+    e_mail = f"testuser+{uuid.uuid4()}@example.com"
+    seller = Seller(
+        first_name="John", last_name="Doe", e_mail=e_mail, password="password123"
+    )
+    db_session.add(seller)
+    await db_session.commit()
+    await db_session.refresh(seller)
+    return seller
@@ -0,0 +1,137 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+from fastapi import status
+from sqlalchemy import select, text
+
+from src.configurations.settings import settings
+from src.models.audit import AuditEntry
+from src.utils import audit as audit_module
+from src.utils.audit import AuditLog
+from src.utils.auth import create_access_token
+
+DSN = settings.database_test_url.replace("+asyncpg", "")
+
+
+@pytest_asyncio.fixture
+async def entries(db_session):
+    await db_session.execute(text("TRUNCATE TABLE audit_log"))
+    await db_session.commit()
+
+    async def written() -> list[AuditEntry]:
+        db_session.expire_all()
+        return (await db_session.execute(select(AuditEntry).order_by(AuditEntry.id))).scalars().all()
+
+    return written
+
+
+@pytest_asyncio.fixture
+async def started():
+    logs = []
+
+    async def start(**kwargs) -> AuditLog:
+        logs.append(AuditLog(**{"dsn": DSN, **kwargs}))
+        await logs[-1].start()
+        return logs[-1]
+
+    yield start
+    for log in logs:
+        await log.close()
+
+
+def event(entity_id: int) -> tuple:
+    return datetime.now(timezone.utc), None, None, "book.updated", "book", entity_id, None
+
+
+@pytest.mark.asyncio
+async def test_events_are_written_in_batches_and_on_close(entries, started):
+    log = await started(batch_size=3, flush_interval=60)
+    for entity_id in range(3):
+        log.record(event(entity_id))
+    await asyncio.sleep(0.1)
+    assert [entry.entity_id for entry in await entries()] == [0, 1, 2]
+
+    # Neither a full batch nor due yet
+    log.record(event(3))
+    await asyncio.sleep(0.1)
+    assert len(await entries()) == 3
+    assert log.stats()["buffered"] == 1
+
+    await log.close()
+    assert [entry.entity_id for entry in await entries()] == [0, 1, 2, 3]
+    assert log.stats()["batch_size"]["count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_buffered_events_are_written_after_the_interval(entries, started):
+    log = await started(batch_size=100, flush_interval=0.05)
+    log.record(event(1))
+    assert log.stats()["buffered"] == 1
+    await asyncio.sleep(0.2)
+    assert [entry.entity_id for entry in await entries()] == [1]
+    assert log.stats()["buffered"] == 0
+
+
+@pytest.mark.asyncio
+async def test_events_survive_an_unreachable_database(entries, started):
+    log = await started(dsn="postgresql://nobody@127.0.0.1:1/none", batch_size=2, flush_interval=0, retry_delay=0.05)
+    for entity_id in range(3):
+        log.record(event(entity_id))
+    await asyncio.sleep(0.2)
+    assert log.failures > 0
+    assert log.stats()["buffered"] == 3
+
+    log.dsn = DSN
+    await log.close()
+    assert [entry.entity_id for entry in await entries()] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_buffer_is_bounded(started):
+    log = await started(dsn="postgresql://nobody@127.0.0.1:1/none", max_buffer=2, flush_interval=60)
+    for entity_id in range(5):
+        log.record(event(entity_id))
+    assert [buffered[5] for buffered in log._buffer] == [3, 4]
+    assert log.dropped == 3
+    log.dsn = DSN
+
+
+def test_events_recorded_while_not_running_are_counted_as_dropped():
+    log = AuditLog(dsn=DSN)
+    log.record(event(1))
+    assert log.stats()["buffered"] == 0
+    assert log.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_writes_are_audited_with_their_actor(entries, started, async_client, monkeypatch):
+    log = await started(flush_interval=60)
+    monkeypatch.setattr(audit_module, "audit_log", log)
+    e_mail = f"audit+{uuid.uuid4()}@example.com"
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': e_mail})}"}
+
+    seller = {"first_name": "A", "last_name": "B", "e_mail": e_mail, "password": "password123"}
+    seller_id = (await async_client.post("/api/v1/sellers/", json=seller, headers=headers)).json()["id"]
+    book = {"title": "Old", "author": "Author", "year": 2020, "count_pages": 100, "seller_id": seller_id}
+    response = await async_client.post("/api/v1/books/", json=book)
+    book_id = response.json()["id"]
+    update = {"id": book_id, "title": "New", "author": "Author", "year": 2020, "pages": 100, "seller_id": seller_id}
+    response = await async_client.put(f"/api/v1/books/{book_id}", json=update, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert (await async_client.delete(f"/api/v1/books/{book_id}", headers=headers)).status_code == 204
+
+    # Nothing written until the batch is due
+    assert await entries() == []
+    await log.close()
+
+    rows = [(entry.action, entry.entity_id, entry.actor) for entry in await entries()]
+    assert rows == [
+        ("seller.created", seller_id, e_mail),
+        ("book.created", book_id, None),
+        ("book.updated", book_id, e_mail),
+        ("book.deleted", book_id, e_mail),
+    ]
+    assert (await entries())[2].changes == {"title": ["Old", "New"]}
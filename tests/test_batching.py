@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from src.models.books import Book
+from src.schemas import IncomingBook
+from src.utils.batching import BookWriteCoalescer
+from tests.conftest import async_test_session
+
+
+def incoming_book(seller_id: int, title: str) -> IncomingBook:
+    return IncomingBook(
+        title=title, author="Robert Martin", year=2020, count_pages=300, seller_id=seller_id
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_creates_share_one_batch(db_session, create_seller):
+    writer = BookWriteCoalescer(lambda: async_test_session, window=0.05, max_batch=100)
+
+    books = await asyncio.gather(
+        *(writer.submit(incoming_book(create_seller.id, f"Book {i}")) for i in range(20))
+    )
+
+    assert [book.title for book in books] == [f"Book {i}" for i in range(20)]
+    assert len({book.id for book in books}) == 20
+    assert writer.stats()["batches"] == 1
+
+    stored = (await db_session.execute(select(Book))).scalars().all()
+    assert len(stored) == 20
+
+
+@pytest.mark.asyncio
+async def test_missing_seller_fails_only_its_books(db_session, create_seller):
+    writer = BookWriteCoalescer(lambda: async_test_session, window=0.05, max_batch=100)
+
+    results = await asyncio.gather(
+        writer.submit(incoming_book(create_seller.id, "Good")),
+        writer.submit(incoming_book(create_seller.id + 1000, "Orphan")),
+        return_exceptions=True,
+    )
+
+    assert results[0].title == "Good"
+    assert isinstance(results[1], HTTPException)
+    assert results[1].status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_batch_is_flushed_at_max_size(create_seller):
+    writer = BookWriteCoalescer(lambda: async_test_session, window=10, max_batch=5)
+
+    await asyncio.wait_for(
+        asyncio.gather(*(writer.submit(incoming_book(create_seller.id, f"B{i}")) for i in range(5))),
+        timeout=5,
+    )
+
+    assert writer.stats()["batch_size"]["count"] == 1
@@ -1,24 +1,14 @@
-import uuid
+import asyncio
 
 import pytest
-import pytest_asyncio
 from fastapi import status
-from sqlalchemy import select
+from sqlalchemy import func, select
 
 from src.models.books import Book
+from src.models.orders import Order
 from src.models.sellers import Seller
-
-
-@pytest_asyncio.fixture
-async def create_seller(db_session):
-    e_mail = f"testuser+{uuid.uuid4()}@example.com"
-    seller = Seller(
-        first_name="John", last_name="Doe", e_mail=e_mail, password="password123"
-    )
-    db_session.add(seller)
-    await db_session.commit()
-    await db_session.refresh(seller)
-    return seller
+from src.utils.statements import PURCHASE
+from tests.conftest import async_test_session
 
 
 @pytest.mark.asyncio
@@ -222,3 +212,228 @@ async def test_delete_book_with_invalid_book_id(
     assert response.status_code == status.HTTP_404_NOT_FOUND, (
         f"Expected 404, got {response.status_code}"
     )
+
+
+@pytest.mark.asyncio
+async def test_get_books_with_sparse_fields(db_session, async_client, create_seller):
+    seller = create_seller
+
+    book = Book(
+        author="Pushkin",
+        title="Eugeny Onegin",
+        year=2001,
+        pages=104,
+        seller_id=seller.id,
+    )
+    db_session.add(book)
+    await db_session.commit()
+    await db_session.refresh(book)
+
+    response = await async_client.get("/api/v1/books/?fields=title,id,author")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "books": [{"title": "Eugeny Onegin", "author": "Pushkin", "id": book.id}]
+    }
+
+    response = await async_client.get(f"/api/v1/books/{book.id}?fields=year")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"year": 2001}
+
+
+@pytest.mark.asyncio
+async def test_get_books_with_unknown_field(async_client):
+    response = await async_client.get("/api/v1/books/?fields=id,price")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_get_book_changes(db_session, async_client, create_seller):
+    seller = create_seller
+
+    since, has_more = 0, True
+    while has_more:
+        result = (await async_client.get(f"/api/v1/books/changes?since={since}&limit=5000")).json()
+        since, has_more = result["next_since"], result["has_more"]
+
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=seller.id)
+    book_2 = Book(author="Lermontov", title="Mziri", year=1997, pages=104, seller_id=seller.id)
+    db_session.add_all([book, book_2])
+    await db_session.commit()
+
+    book.pages = 200
+    await db_session.commit()
+    await db_session.delete(book_2)
+    await db_session.commit()
+
+    response = await async_client.get(f"/api/v1/books/changes?since={since}")
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert [(c["op"], c["id"]) for c in result["changes"]] == [
+        ("upsert", book.id),
+        ("delete", book_2.id),
+    ]
+    assert result["changes"][0]["book"]["pages"] == 200
+    assert result["has_more"] is False
+
+    response = await async_client.get(f"/api/v1/books/changes?since={since}&limit=1")
+    result = response.json()
+    assert len(result["changes"]) == 1
+    assert result["has_more"] is True
+
+    response = await async_client.get(
+        f"/api/v1/books/changes?since={result['next_since']}&limit=1"
+    )
+    assert [c["op"] for c in response.json()["changes"]] == ["delete"]
+
+
+@pytest.mark.asyncio
+async def test_book_changes_wait_for_lower_numbers_still_being_written(db_session, async_client, create_seller):
+    seller = create_seller
+    since = (await async_client.get("/api/v1/books/changes?since=0&limit=5000")).json()["next_since"]
+
+    async with async_test_session() as writer:
+        # Takes the lower number, but commits last
+        slow = Book(author="Gogol", title="Dead Souls", year=1842, pages=352, seller_id=seller.id)
+        writer.add(slow)
+        await writer.flush()
+        fast = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=seller.id)
+        db_session.add(fast)
+        await db_session.commit()
+        assert fast.change_seq > slow.change_seq
+
+        result = (await async_client.get(f"/api/v1/books/changes?since={since}")).json()
+        assert result["changes"] == []
+        assert result["next_since"] < slow.change_seq
+        await writer.commit()
+
+    result = (await async_client.get(f"/api/v1/books/changes?since={result['next_since']}")).json()
+    assert [change["id"] for change in result["changes"]] == [slow.id, fast.id]
+
+
+@pytest.mark.asyncio
+async def test_import_books_upserts_by_isbn(db_session, async_client, create_seller):
+    seller = create_seller
+    feed = {
+        "books": [
+            {"title": "Mziri", "author": "Lermontov", "year": 2007, "count_pages": 104,
+             "seller_id": seller.id, "isbn": "978-5-17-090632-1"},
+            {"title": "Eugeny Onegin", "author": "Pushkin", "year": 2001, "count_pages": 250,
+             "seller_id": seller.id, "isbn": "5170906331"},
+        ]
+    }
+    response = await async_client.post("/api/v1/books/import", json=feed)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"received": 2, "inserted": 2, "updated": 0, "unchanged": 0}
+
+    # Re-sending the same feed writes nothing
+    response = await async_client.post("/api/v1/books/import", json=feed)
+    assert response.json() == {"received": 2, "inserted": 0, "updated": 0, "unchanged": 2}
+
+    feed["books"][0]["count_pages"] = 120
+    response = await async_client.post("/api/v1/books/import", json=feed)
+    assert response.json() == {"received": 2, "inserted": 0, "updated": 1, "unchanged": 1}
+
+    books = (await db_session.execute(select(Book).order_by(Book.isbn))).scalars().all()
+    assert [(book.isbn, book.pages) for book in books] == [("9785170906321", 120), ("9785170906338", 250)]
+
+
+@pytest.mark.asyncio
+async def test_import_books_keys_isbn_10_and_13_alike(db_session, async_client, create_seller):
+    seller = create_seller
+    feed = {
+        "books": [
+            {"title": "Mziri", "author": "Lermontov", "year": 2007, "count_pages": 104,
+             "seller_id": seller.id, "isbn": "978-5-17-090632-1"},
+            {"title": "Mziri", "author": "Lermontov", "year": 2007, "count_pages": 110,
+             "seller_id": seller.id, "isbn": "5-17-090632-3"},
+        ]
+    }
+    response = await async_client.post("/api/v1/books/import", json=feed)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["inserted"] == 1
+
+    # One book, as sent last
+    books = (await db_session.execute(select(Book))).scalars().all()
+    assert [(book.isbn, book.pages) for book in books] == [("9785170906321", 110)]
+
+
+@pytest.mark.asyncio
+async def test_import_books_rejects_bad_check_digits(async_client, create_seller):
+    for isbn in ("5170906321", "9785170906322"):
+        feed = {
+            "books": [
+                {"title": "Mziri", "author": "Lermontov", "year": 2007,
+                 "seller_id": create_seller.id, "isbn": isbn},
+            ]
+        }
+        response = await async_client.post("/api/v1/books/import", json=feed)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_import_books_with_unknown_seller(async_client):
+    feed = {
+        "books": [
+            {"title": "Mziri", "author": "Lermontov", "year": 2007,
+             "seller_id": 0, "isbn": "9785170906321"},
+        ]
+    }
+    response = await async_client.post("/api/v1/books/import", json=feed)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_purchase_book(db_session, async_client, create_seller):
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=create_seller.id)
+    db_session.add(book)
+    await db_session.commit()
+
+    response = await async_client.put(
+        f"/api/v1/books/{book.id}/inventory", json={"price": "12.50", "stock": 3}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"price": "12.50", "stock": 3}
+
+    response = await async_client.post(f"/api/v1/books/{book.id}/purchase", json={"quantity": 2})
+    assert response.status_code == status.HTTP_201_CREATED
+    order = response.json()
+    assert (order["book_id"], order["quantity"], order["unit_price"], order["total"], order["remaining_stock"]) == (
+        book.id, 2, "12.50", "25.00", 1
+    )
+
+    response = await async_client.post(f"/api/v1/books/{book.id}/purchase", json={"quantity": 2})
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    response = await async_client.get(f"/api/v1/books/{book.id}/inventory")
+    assert response.json() == {"price": "12.50", "stock": 1}
+
+
+@pytest.mark.asyncio
+async def test_purchase_missing_book(async_client):
+    response = await async_client.post("/api/v1/books/0/purchase", json={"quantity": 1})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_concurrent_purchases_never_oversell(db_session, create_seller):
+    book = Book(
+        author="Pushkin", title="Eugeny Onegin", year=2001, pages=104,
+        seller_id=create_seller.id, price=10, stock=10,
+    )
+    db_session.add(book)
+    await db_session.commit()
+
+    async def buy():
+        async with async_test_session() as session:
+            result = await session.execute(PURCHASE, {"book_id": book.id, "quantity": 1})
+            order = result.one_or_none()
+            await session.commit()
+            return order
+
+    orders = await asyncio.gather(*(buy() for _ in range(25)))
+
+    assert sum(order is not None for order in orders) == 10
+    assert sorted(order.remaining_stock for order in orders if order) == list(range(10))
+    await db_session.refresh(book)
+    assert book.stock == 0
+    assert await db_session.scalar(select(func.count()).select_from(Order)) == 10
@@ -0,0 +1,103 @@
+import pytest
+from fastapi import status
+
+from src.models.books import Book
+from src.utils.catalogue import CatalogueSnapshot, catalogue
+
+
+@pytest.fixture(autouse=True)
+def reset_catalogue():
+    """The snapshot is process-wide; force a reload from the truncated tables."""
+    catalogue.clear()
+    yield
+    catalogue.clear()
+
+
+def test_snapshot_facets():
+    snapshot = CatalogueSnapshot()
+    snapshot.load(
+        [
+            (1, 2001, 104, 1, "Pushkin"),
+            (2, 1997, 250, 1, "Lermontov"),
+            (3, 2001, 1200, 2, "Pushkin"),
+        ]
+    )
+
+    facets = snapshot.facets()
+    assert facets["total"] == 3
+    assert facets["years"] == [{"value": 1997, "count": 1}, {"value": 2001, "count": 2}]
+    assert facets["authors"] == [
+        {"value": "Pushkin", "count": 2},
+        {"value": "Lermontov", "count": 1},
+    ]
+    assert [r["count"] for r in facets["pages"]] == [0, 1, 1, 0, 0, 1]
+
+    assert snapshot.facets(seller_id=2, year_from=2000)["total"] == 1
+    assert snapshot.facets(author="Tolstoy")["total"] == 0
+
+
+def test_snapshot_incremental_updates():
+    snapshot = CatalogueSnapshot()
+    snapshot.load([(1, 2001, 104, 1, "Pushkin"), (2, 1997, 250, 2, "Lermontov")])
+
+    snapshot.upsert(3, 2010, 300, 1, "Tolstoy")
+    snapshot.upsert(1, 2002, 104, 1, "Pushkin")
+    assert snapshot.facets(year_from=2002)["total"] == 2
+
+    snapshot.remove(3)
+    snapshot.remove_seller(2)
+    assert len(snapshot) == 1
+    assert snapshot.facets()["years"] == [{"value": 2002, "count": 1}]
+
+
+@pytest.mark.asyncio
+async def test_get_book_facets(db_session, async_client, create_seller):
+    seller = create_seller
+    db_session.add_all(
+        [
+            Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=seller.id),
+            Book(author="Lermontov", title="Mziri", year=1997, pages=104, seller_id=seller.id),
+        ]
+    )
+    await db_session.commit()
+
+    response = await async_client.get("/api/v1/books/facets?year_from=2000")
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert result["total"] == 1
+    assert result["authors"] == [{"value": "Pushkin", "count": 1}]
+
+    # Later writes are applied to the snapshot on commit
+    data = {
+        "title": "Clean Architecture",
+        "author": "Robert Martin",
+        "count_pages": 300,
+        "year": 2025,
+        "seller_id": seller.id,
+    }
+    response = await async_client.post("/api/v1/books/", json=data)
+    assert response.status_code == status.HTTP_201_CREATED
+    await db_session.commit()
+
+    response = await async_client.get("/api/v1/books/facets?year_from=2000")
+    assert response.json()["total"] == 2
+
+
+@pytest.mark.asyncio
+async def test_facets_catch_up_with_writes_made_elsewhere(db_session, async_client, create_seller, monkeypatch):
+    seller = create_seller
+    monkeypatch.setattr(catalogue, "refresh_interval", 60)
+    assert (await async_client.get("/api/v1/books/facets")).json()["total"] == 0
+
+    # Written without the routes' commit hooks, as by another worker
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=seller.id)
+    db_session.add(book)
+    await db_session.commit()
+    assert (await async_client.get("/api/v1/books/facets")).json()["total"] == 0
+
+    catalogue.refresh_interval = 0
+    assert (await async_client.get("/api/v1/books/facets")).json()["authors"] == [{"value": "Pushkin", "count": 1}]
+
+    await db_session.delete(book)
+    await db_session.commit()
+    assert (await async_client.get("/api/v1/books/facets")).json()["total"] == 0
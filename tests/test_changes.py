@@ -0,0 +1,101 @@
+import asyncio
+import uuid
+
+import orjson
+import pytest
+import pytest_asyncio
+
+from src.configurations.settings import settings
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.routers.v1 import changes as changes_router
+from src.utils.changes import ChangeFeed
+
+
+@pytest_asyncio.fixture
+async def feed():
+    feed = ChangeFeed(dsn=settings.database_test_url.replace("+asyncpg", ""), max_queue=4)
+    yield feed
+    await feed.close()
+
+
+async def next_change(subscription) -> dict:
+    event = await asyncio.wait_for(subscription.get(), timeout=5)
+    return orjson.loads(event.payload)
+
+
+@pytest.mark.asyncio
+async def test_committed_writes_are_published(feed, db_session):
+    subscription = feed.subscribe()
+    await asyncio.wait_for(feed.listening.wait(), timeout=5)
+
+    seller = Seller(
+        first_name="John",
+        last_name="Doe",
+        e_mail=f"testuser+{uuid.uuid4()}@example.com",
+        password="password123",
+    )
+    db_session.add(seller)
+    await db_session.commit()
+
+    change = await next_change(subscription)
+    assert change["entity"] == "seller"
+    assert change["op"] == "insert"
+    assert change["id"] == seller.id
+    assert "password" not in change["data"]
+
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=seller.id)
+    db_session.add(book)
+    await db_session.commit()
+    await db_session.delete(book)
+    await db_session.commit()
+
+    change = await next_change(subscription)
+    assert (change["entity"], change["op"], change["seller_id"]) == ("book", "insert", seller.id)
+    assert change["data"]["title"] == "Eugeny Onegin"
+    change = await next_change(subscription)
+    assert (change["entity"], change["op"], change["id"]) == ("book", "delete", book.id)
+
+
+@pytest.mark.asyncio
+async def test_subscribers_filter_by_seller(feed):
+    everything = feed.subscribe()
+    seller_1 = feed.subscribe(seller_id=1)
+    seller_2 = feed.subscribe(seller_id=2)
+
+    feed.dispatch('{"entity": "book", "op": "insert", "id": 10, "seller_id": 1}')
+
+    assert (await next_change(everything))["id"] == 10
+    assert (await next_change(seller_1))["id"] == 10
+    assert seller_2.queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_dropped(feed):
+    subscription = feed.subscribe(seller_id=1)
+
+    for book_id in range(5):
+        feed.dispatch(f'{{"entity": "book", "op": "insert", "id": {book_id}, "seller_id": 1}}')
+
+    assert subscription.overflowed
+    assert len(feed) == 0
+    # The client's stream ends instead of idling on heartbeats
+    assert await asyncio.wait_for(subscription.get(), timeout=1) is None
+
+
+@pytest.mark.asyncio
+async def test_stream_of_a_slow_subscriber_ends(feed, async_client, monkeypatch):
+    monkeypatch.setattr(changes_router, "change_feed", feed)
+
+    async def overflow():
+        while len(feed) == 0:
+            await asyncio.sleep(0.01)
+        for book_id in range(5):
+            feed.dispatch(f'{{"entity": "book", "op": "insert", "id": {book_id}, "seller_id": 1}}')
+
+    dispatching = asyncio.create_task(overflow())
+    # Only returns once the server has ended the stream
+    response = await asyncio.wait_for(async_client.get("/api/v1/changes/stream?seller_id=1"), timeout=5)
+    await dispatching
+    assert response.status_code == 200
+    assert len(feed) == 0
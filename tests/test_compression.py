@@ -0,0 +1,57 @@
+import uuid
+
+import pytest
+from fastapi import status
+
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.utils.compression import negotiate_encoding
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, br, zstd", "zstd"),
+        ("gzip;q=0.5, br;q=0.9", "br"),
+        ("gzip", "gzip"),
+        ("zstd;q=0, *", "br"),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding, ["zstd", "br", "gzip"]) == expected
+
+
+@pytest.mark.asyncio
+async def test_large_response_is_compressed(async_client, db_session):
+    seller = Seller(
+        first_name="John",
+        last_name="Doe",
+        e_mail=f"testuser+{uuid.uuid4()}@example.com",
+        password="password123",
+    )
+    db_session.add(seller)
+    await db_session.commit()
+    db_session.add_all(
+        Book(title=f"Book {i}", author="Pushkin", year=2001, pages=104, seller_id=seller.id)
+        for i in range(100)
+    )
+    await db_session.commit()
+
+    response = await async_client.get(
+        "/api/v1/books/", headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert len(response.json()["books"]) == 100
+
+
+@pytest.mark.asyncio
+async def test_small_response_is_not_compressed(async_client):
+    response = await async_client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,160 @@
+from collections import Counter
+
+import pytest
+import pytest_asyncio
+from asyncpg.transaction import Transaction
+from fastapi import status
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.configurations import database
+from src.configurations.settings import settings
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.utils.statements import HOT_STATEMENTS
+from tests.conftest import async_test_engine
+
+
+@pytest.fixture
+def round_trips(monkeypatch, test_app):
+    """Serves requests through the real session dependency and counts round trips."""
+    monkeypatch.setattr(
+        database, "__session_factory",
+        async_sessionmaker(async_test_engine, expire_on_commit=False),
+    )
+    monkeypatch.setattr(
+        database, "__read_session_factory",
+        async_sessionmaker(
+            async_test_engine.execution_options(isolation_level="AUTOCOMMIT"),
+            expire_on_commit=False,
+        ),
+    )
+    monkeypatch.delitem(test_app.dependency_overrides, database.get_async_session)
+
+    counts = Counter()
+
+    def count_transaction(name):
+        original = getattr(Transaction, name)
+
+        async def counted(self):
+            counts[name] += 1
+            return await original(self)
+
+        monkeypatch.setattr(Transaction, name, counted)
+
+    for name in ("start", "commit", "rollback"):
+        count_transaction(name)
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        counts["statement"] += 1
+
+    event.listen(async_test_engine.sync_engine, "before_cursor_execute", count_statement)
+    yield counts
+    event.remove(async_test_engine.sync_engine, "before_cursor_execute", count_statement)
+
+
+@pytest_asyncio.fixture
+async def book(db_session):
+    seller = Seller(first_name="John", last_name="Doe", e_mail="john@example.com", password="password123")
+    db_session.add(seller)
+    await db_session.flush()
+    book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, pages=104, seller_id=seller.id)
+    db_session.add(book)
+    await db_session.commit()
+    return book
+
+
+@pytest.mark.asyncio
+async def test_read_runs_without_transaction(async_client, book, round_trips):
+    response = await async_client.get("/api/v1/books/")
+    assert response.status_code == status.HTTP_200_OK
+
+    assert round_trips == {"statement": 1}
+
+
+@pytest.mark.asyncio
+async def test_route_deadline_sets_statement_timeout(async_client, book, round_trips):
+    response = await async_client.get(f"/api/v1/books/{book.id}")
+    assert response.status_code == status.HTTP_200_OK
+
+    # SET statement_timeout on this (fresh) connection, then the SELECT
+    assert round_trips == {"statement": 2}
+
+
+@pytest.mark.asyncio
+async def test_write_commits_once(async_client, book, round_trips):
+    data = {
+        "title": "Clean Architecture",
+        "author": "Robert Martin",
+        "count_pages": 300,
+        "year": 2025,
+        "seller_id": book.seller_id,
+    }
+    response = await async_client.post("/api/v1/books/", json=data)
+    assert response.status_code == status.HTTP_201_CREATED
+
+    # BEGIN, seller lookup, INSERT, COMMIT
+    assert round_trips == {"start": 1, "statement": 2, "commit": 1}
+
+
+@pytest.mark.asyncio
+async def test_write_without_changes_skips_commit(async_client, book, round_trips):
+    data = {
+        "title": "Mziri",
+        "author": "Lermontov",
+        "pages": 100,
+        "year": 2007,
+        "id": 0,
+        "seller_id": book.seller_id,
+    }
+    response = await async_client.put("/api/v1/books/0", json=data)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    # The connection is returned to the pool with a ROLLBACK, no COMMIT
+    assert round_trips == {"start": 1, "statement": 1, "rollback": 1}
+
+
+@pytest.mark.asyncio
+async def test_request_without_queries_uses_no_connection(async_client, round_trips):
+    response = await async_client.get("/api/v1/books/", params={"fields": "nope"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    assert round_trips == {}
+
+
+@pytest.mark.asyncio
+async def test_session_released_before_serialisation(async_client, book, round_trips):
+    # Sellers and their books are serialised after the session has been closed
+    response = await async_client.get("/api/v1/sellers/")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[0]["books"][0]["id"] == book.id
+
+    assert round_trips == {"statement": 2}
+
+
+@pytest.mark.asyncio
+async def test_warm_up_primes_every_pooled_connection():
+    engine = create_async_engine(settings.database_test_url, pool_size=3)
+    try:
+        await database.warm_up(HOT_STATEMENTS, connections=5, engine=engine)
+
+        # Capped at the pool size, all returned to the pool
+        assert (engine.pool.checkedin(), engine.pool.checkedout()) == (3, 0)
+        assert len(engine.sync_engine._compiled_cache) >= len(HOT_STATEMENTS)
+        async with engine.connect() as connection:
+            raw = await connection.get_raw_connection()
+            assert len(raw.dbapi_connection._prepared_statement_cache) >= len(HOT_STATEMENTS)
+    finally:
+        await database.drain(timeout=1, engine=engine)
+    assert engine.pool.checkedin() == 0
+
+
+@pytest.mark.asyncio
+async def test_ready_only_after_warm_up(test_app, async_client):
+    test_app.state.ready = False
+    assert (await async_client.get("/ready")).status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    test_app.state.ready = True
+    response = await async_client.get("/ready")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"status": "ready"}
@@ -0,0 +1,72 @@
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import pytest_asyncio
+from fastapi import status
+
+from src.configurations import get_session_factory
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.utils.exports import SNAPSHOT_OPTIONS, export_snapshot
+from tests.conftest import async_test_engine, async_test_session
+
+
+@pytest_asyncio.fixture
+async def sellers(db_session):
+    sellers = [
+        Seller(first_name="John", last_name="Doe", e_mail="john@example.com", password="password123"),
+        Seller(first_name="Jane", last_name="Doe", e_mail="jane@example.com", password="password123"),
+    ]
+    db_session.add_all(sellers)
+    await db_session.flush()
+    db_session.add_all(
+        Book(title=f"Book {i}", author="Pushkin", year=2001, pages=100 + i, seller_id=sellers[i % 2].id)
+        for i in range(5)
+    )
+    await db_session.commit()
+    return sellers
+
+
+@pytest.fixture
+def export_app(test_app):
+    test_app.dependency_overrides[get_session_factory] = lambda: async_test_session
+    yield test_app
+    del test_app.dependency_overrides[get_session_factory]
+
+
+@pytest.mark.asyncio
+async def test_export_books_as_parquet(export_app, async_client, sellers):
+    response = await async_client.get("/api/v1/export/books")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 5
+    assert table.schema.field("year").type == pa.int16()
+    assert sorted(table.column("pages").to_pylist()) == [100, 101, 102, 103, 104]
+
+
+@pytest.mark.asyncio
+async def test_export_sellers_as_arrow_without_passwords(export_app, async_client, sellers):
+    response = await async_client.get("/api/v1/export/sellers", params={"format": "arrow"})
+    assert response.status_code == status.HTTP_200_OK
+
+    table = pa.ipc.open_file(io.BytesIO(response.content)).read_all()
+    assert table.column("e_mail").to_pylist() == ["john@example.com", "jane@example.com"]
+    assert "password" not in table.schema.names
+
+
+@pytest.mark.asyncio
+async def test_export_snapshot_partitioned_by_seller(sellers, tmp_path):
+    async with async_test_engine.connect() as connection:
+        connection = await connection.execution_options(**SNAPSHOT_OPTIONS)
+        counts = await export_snapshot(connection, tmp_path, partition_by_seller=True, batch_size=2)
+
+    assert counts == {"books": 5, "sellers": 2}
+    first = pq.read_table(tmp_path / "books" / f"seller_id={sellers[0].id}" / "part-0.parquet")
+    second = pq.read_table(tmp_path / "books" / f"seller_id={sellers[1].id}" / "part-0.parquet")
+    assert (first.num_rows, second.num_rows) == (3, 2)
+    assert "seller_id" not in first.schema.names
+    assert pq.read_table(tmp_path / "sellers.parquet").num_rows == 2
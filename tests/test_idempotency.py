@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import json
+import uuid
+
+import pytest
+from fastapi import status
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.configurations import database
+from src.models.books import Book
+from src.models.idempotency import IdempotencyKey
+from src.utils.idempotency import _scoped_key, idempotency_store
+from tests.conftest import async_test_engine, async_test_session
+
+
+@pytest.fixture(autouse=True)
+def real_sessions(monkeypatch, test_app):
+    """Serves requests through the real session dependency, so that each one commits on its own."""
+    monkeypatch.setattr(
+        database, "__session_factory",
+        async_sessionmaker(async_test_engine, expire_on_commit=False),
+    )
+    monkeypatch.setattr(
+        database, "__read_session_factory",
+        async_sessionmaker(
+            async_test_engine.execution_options(isolation_level="AUTOCOMMIT"),
+            expire_on_commit=False,
+        ),
+    )
+    monkeypatch.delitem(test_app.dependency_overrides, database.get_async_session)
+    monkeypatch.setattr(idempotency_store, "_session_factory", lambda: async_test_session)
+
+
+async def claim_elsewhere(key: str, body: bytes) -> bytes:
+    """Commits a claim on `key` the way a request on another worker would."""
+    scoped = _scoped_key("/api/v1/books/", b"", key.encode())
+    async with async_test_session() as session:
+        await session.execute(
+            insert(IdempotencyKey).values(
+                key=scoped,
+                fingerprint=hashlib.sha256(body).digest(),
+                lease=uuid.uuid4(),
+                expires_at=text("now() + interval '1 hour'"),
+            )
+        )
+        await session.commit()
+    return scoped
+
+
+def book_payload(seller_id: int, title: str = "Clean Architecture") -> dict:
+    return {
+        "title": title,
+        "author": "Robert Martin",
+        "count_pages": 300,
+        "year": 2025,
+        "seller_id": seller_id,
+    }
+
+
+@pytest.mark.asyncio
+async def test_retry_replays_first_response(async_client, db_session, create_seller):
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    data = book_payload(create_seller.id)
+
+    first = await async_client.post("/api/v1/books/", json=data, headers=headers)
+    retry = await async_client.post("/api/v1/books/", json=data, headers=headers)
+
+    assert first.status_code == status.HTTP_201_CREATED
+    assert retry.status_code == status.HTTP_201_CREATED
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+
+    books = (await db_session.execute(select(Book))).scalars().all()
+    assert len(books) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_retries_execute_once(async_client, db_session, create_seller):
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    data = book_payload(create_seller.id)
+
+    responses = await asyncio.gather(
+        *(async_client.post("/api/v1/books/", json=data, headers=headers) for _ in range(5))
+    )
+
+    assert {r.status_code for r in responses} == {status.HTTP_201_CREATED}
+    assert len({r.json()["id"] for r in responses}) == 1
+
+
+@pytest.mark.asyncio
+async def test_key_reused_with_different_body(async_client, create_seller):
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+    await async_client.post(
+        "/api/v1/books/", json=book_payload(create_seller.id), headers=headers
+    )
+    response = await async_client.post(
+        "/api/v1/books/", json=book_payload(create_seller.id, "Clean Code"), headers=headers
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_requests_without_key_are_not_deduplicated(
+    async_client, db_session, create_seller
+):
+    data = book_payload(create_seller.id)
+
+    await async_client.post("/api/v1/books/", json=data)
+    await async_client.post("/api/v1/books/", json=data)
+
+    books = (await db_session.execute(select(Book))).scalars().all()
+    assert len(books) == 2
+
+
+@pytest.mark.asyncio
+async def test_retry_waits_for_a_request_running_on_another_worker(async_client, db_session, create_seller):
+    key = str(uuid.uuid4())
+    body = json.dumps(book_payload(create_seller.id)).encode()
+    scoped = await claim_elsewhere(key, body)
+    stored = {"id": 1, **book_payload(create_seller.id)}
+
+    async def finish_elsewhere():
+        await asyncio.sleep(0.2)
+        async with async_test_session() as session:
+            await session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == scoped)
+                .values(
+                    status=201,
+                    headers=[["content-type", "application/json"]],
+                    body=json.dumps(stored).encode(),
+                )
+            )
+            await session.commit()
+
+    finishing = asyncio.create_task(finish_elsewhere())
+    response = await async_client.post(
+        "/api/v1/books/",
+        content=body,
+        headers={"Idempotency-Key": key, "Content-Type": "application/json"},
+    )
+    await finishing
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json() == stored
+    assert response.headers["idempotent-replayed"] == "true"
+    books = (await db_session.execute(select(Book))).scalars().all()
+    assert books == []
+
+
+@pytest.mark.asyncio
+async def test_request_still_running_elsewhere_is_rejected(
+    async_client, db_session, create_seller, monkeypatch
+):
+    monkeypatch.setattr(idempotency_store, "wait", 0.1)
+    key = str(uuid.uuid4())
+    body = json.dumps(book_payload(create_seller.id)).encode()
+    await claim_elsewhere(key, body)
+
+    response = await async_client.post(
+        "/api/v1/books/",
+        content=body,
+        headers={"Idempotency-Key": key, "Content-Type": "application/json"},
+    )
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+    books = (await db_session.execute(select(Book))).scalars().all()
+    assert books == []
+
+
+@pytest.mark.asyncio
+async def test_key_is_claimed_with_the_create(async_client, db_session, create_seller):
+    key = str(uuid.uuid4())
+    created = []
+
+    async def watch():
+        # Neither the book nor the claim is visible before the other
+        claims = select(func.count()).where(
+            IdempotencyKey.key == _scoped_key("/api/v1/books/", b"", key.encode())
+        )
+        while not created:
+            async with async_test_session() as session:
+                # One statement, so that both counts come from the same snapshot
+                books, keys = (
+                    await session.execute(
+                        select(select(func.count(Book.id)).scalar_subquery(), claims.scalar_subquery())
+                    )
+                ).one()
+            assert books == keys
+            await asyncio.sleep(0)
+
+    watching = asyncio.create_task(watch())
+    response = await async_client.post(
+        "/api/v1/books/", json=book_payload(create_seller.id), headers={"Idempotency-Key": key}
+    )
+    created.append(response)
+    await watching
+
+    assert response.status_code == status.HTTP_201_CREATED
+    async with async_test_session() as session:
+        stored = (
+            await session.execute(
+                select(IdempotencyKey).where(
+                    IdempotencyKey.key == _scoped_key("/api/v1/books/", b"", key.encode())
+                )
+            )
+        ).scalar_one()
+    # Claimed by the request's own transaction rather than stored afterwards
+    assert stored.lease is not None
+    assert stored.status == status.HTTP_201_CREATED
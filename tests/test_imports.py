@@ -0,0 +1,100 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, text
+
+from src.configurations.settings import settings
+from src.models.audit import AuditEntry
+from src.models.books import Book
+from src.models.outbox import OutboxEvent
+from src.models.sellers import Seller
+from src.utils.imports import import_file
+from src.utils.shared_cache import BOOKS_TABLE, response_cache
+
+DSN = settings.database_test_url.replace("+asyncpg", "")
+
+
+def isbn13(number: int) -> str:
+    digits = f"978000000{number:03d}"
+    return digits + str(-sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10)
+
+
+@pytest_asyncio.fixture
+async def seller(db_session):
+    seller = Seller(first_name="John", last_name="Doe", e_mail="john@example.com", password="password123")
+    db_session.add(seller)
+    await db_session.commit()
+    return seller
+
+
+@pytest.mark.asyncio
+async def test_import_csv(db_session, seller, tmp_path):
+    path = tmp_path / "books.csv"
+    path.write_text(
+        "title,author,year,pages,seller_id,isbn\n"
+        f'"Mziri, illustrated",Lermontov,2007,104,{seller.id},978-5-17-090632-1\n'
+        f"Eugeny Onegin,Pushkin,2001,250,{seller.id},5170906331\n"
+        f"Eugeny Onegin,Pushkin,1800,250,{seller.id},5170906331\n"
+        f"Ruslan and Ludmila,Pushkin,2001,90,0,517090634X\n"
+        f"Eugeny Onegin,Pushkin,2001,260,{seller.id},978-5-17-090633-8\n"
+    )
+
+    report = await import_file(DSN, path, chunk_size=2, workers=2)
+
+    assert (report.read, report.inserted, report.invalid, report.unknown_seller) == (5, 2, 1, 1)
+    assert report.errors[0].startswith("record 3:")
+    books = (await db_session.execute(select(Book).order_by(Book.isbn))).scalars().all()
+    # The later record for the same ISBN wins, whichever form it is written in
+    assert [(book.title, book.isbn, book.pages) for book in books] == [
+        ("Mziri, illustrated", "9785170906321", 104),
+        ("Eugeny Onegin", "9785170906338", 260),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reimport_ndjson_writes_nothing(db_session, seller, tmp_path):
+    path = tmp_path / "books.ndjson"
+    path.write_text(
+        "".join(
+            f'{{"title": "Book {i}", "author": "Author", "year": 2020, '
+            f'"count_pages": {100 + i}, "seller_id": {seller.id}, "isbn": "{isbn13(i)}"}}\n'
+            for i in range(50)
+        )
+    )
+
+    first = await import_file(DSN, path, chunk_size=20, workers=1)
+    again = await import_file(DSN, path, chunk_size=20, workers=1)
+
+    assert (first.inserted, first.updated, first.unchanged) == (50, 0, 0)
+    assert (again.inserted, again.updated, again.unchanged) == (0, 0, 50)
+
+
+@pytest.mark.asyncio
+async def test_import_queues_webhooks_and_audit_entries(db_session, seller, tmp_path, monkeypatch):
+    await db_session.execute(text("TRUNCATE TABLE webhook_outbox, audit_log"))
+    await db_session.commit()
+    monkeypatch.setattr(settings, "webhook_urls", ["http://partner.example/a", "http://partner.example/b"])
+    path = tmp_path / "books.ndjson"
+
+    def write(pages: int) -> None:
+        path.write_text(
+            "".join(
+                f'{{"title": "Book {i}", "author": "Author", "year": 2020, '
+                f'"count_pages": {pages}, "seller_id": {seller.id}, "isbn": "{isbn13(i)}"}}\n'
+                for i in range(3)
+            )
+        )
+
+    write(100)
+    await import_file(DSN, path, chunk_size=2, workers=1)
+    before = response_cache.stamp(BOOKS_TABLE)
+    write(120)
+    await import_file(DSN, path, chunk_size=2, workers=1)
+
+    events = (await db_session.execute(select(OutboxEvent.payload))).scalars().all()
+    assert len(events) == 2 * 6
+    assert sorted(event["type"] for event in events) == ["book.created"] * 6 + ["book.updated"] * 6
+    assert {event["data"]["pages"] for event in events if event["type"] == "book.updated"} == {120}
+    entries = (await db_session.execute(select(AuditEntry).order_by(AuditEntry.id))).scalars().all()
+    assert [entry.action for entry in entries] == ["book.created"] * 3 + ["book.updated"] * 3
+    assert all(entry.actor is None for entry in entries)
+    assert response_cache.stamp(BOOKS_TABLE) > before
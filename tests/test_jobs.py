@@ -0,0 +1,196 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, text
+
+from src.models.jobs import Job
+from src.utils.jobs import Handler, JobWorker, enqueue, enqueue_many
+from tests.conftest import async_test_session
+
+
+@pytest_asyncio.fixture
+async def queue(db_session):
+    await db_session.execute(text("TRUNCATE TABLE jobs"))
+    await db_session.commit()
+    return db_session
+
+
+@pytest_asyncio.fixture
+async def workers():
+    created = []
+
+    def create(handlers, **kwargs) -> JobWorker:
+        kwargs.setdefault("poll_interval", 0.02)
+        created.append(JobWorker(lambda: async_test_session, handlers, **kwargs))
+        return created[-1]
+
+    yield create
+    for worker in created:
+        await worker.stop(timeout=1)
+
+
+async def queued(session) -> list[Job]:
+    session.expire_all()
+    return (await session.execute(select(Job).order_by(Job.id))).scalars().all()
+
+
+async def run_until_empty(session, *workers: JobWorker, timeout: float = 5) -> None:
+    """Runs the workers until no job is left to run."""
+    running = [asyncio.create_task(worker.run()) for worker in workers]
+    try:
+        async with asyncio.timeout(timeout):
+            while any(job.failed_at is None for job in await queued(session)):
+                await asyncio.sleep(0.02)
+    finally:
+        for worker in workers:
+            await worker.stop()
+        await asyncio.gather(*running)
+
+
+@pytest.mark.asyncio
+async def test_jobs_are_queued_in_the_callers_transaction(queue):
+    enqueue(queue, "reindex", {"book_id": 1})
+    await queue.rollback()
+    assert await queued(queue) == []
+
+    enqueue(queue, "reindex", {"book_id": 1})
+    await queue.commit()
+    assert [(job.kind, job.payload) for job in await queued(queue)] == [("reindex", {"book_id": 1})]
+
+
+@pytest.mark.asyncio
+async def test_claims_go_by_priority_and_skip_claimed_and_future_jobs(queue, workers):
+    await enqueue_many(queue, "low", [{}, {}])
+    enqueue(queue, "high", priority=10)
+    enqueue(queue, "later", priority=100, delay=60)
+    await queue.commit()
+    first, second = workers({}), workers({})
+
+    assert [job.kind for job in await first.claim(2)] == ["high", "low"]
+    # The other worker only sees what is left
+    assert [job.kind for job in await second.claim(10)] == ["low"]
+    assert await first.claim(10) == []
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_jobs_within_its_concurrency(queue, workers):
+    running, peak, done = 0, 0, []
+
+    async def handler(number: int):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        done.append(number)
+
+    await enqueue_many(queue, "work", [{"number": number} for number in range(12)])
+    await queue.commit()
+
+    worker = workers({"work": Handler(handler, 5)}, concurrency=3)
+    await run_until_empty(queue, worker)
+
+    assert sorted(done) == list(range(12))
+    assert peak == 3
+    assert await queued(queue) == []
+    assert worker.stats()["completed"] == 12
+
+
+@pytest.mark.asyncio
+async def test_failing_jobs_are_retried_then_kept_as_failed(queue, workers):
+    attempts = []
+
+    async def flaky():
+        attempts.append(None)
+        raise ValueError("boom")
+
+    enqueue(queue, "flaky", max_attempts=3)
+    enqueue(queue, "unknown")
+    await queue.commit()
+
+    worker = workers({"flaky": Handler(flaky, 5)}, retry_base=0)
+    await run_until_empty(queue, worker)
+
+    assert len(attempts) == 3
+    flaky_job, unknown_job = await queued(queue)
+    assert flaky_job.attempts == 3 and flaky_job.failed_at is not None
+    assert flaky_job.last_error == "ValueError('boom')"
+    # Jobs nobody can run are not retried
+    assert unknown_job.attempts == 1 and unknown_job.failed_at is not None
+    assert worker.stats()["retried"] == 2
+
+
+@pytest.mark.asyncio
+async def test_job_of_a_dead_worker_is_claimed_again(queue, workers):
+    enqueue(queue, "work")
+    await queue.commit()
+    dead, alive = workers({}, visibility_timeout=0.2), workers({})
+
+    (job,) = await dead.claim(1)
+    assert await alive.claim(1) == []
+    await asyncio.sleep(0.3)
+    (again,) = await alive.claim(1)
+    assert again.id == job.id and again.attempts == 2
+
+    # The first worker lost its lease: its acknowledgement changes nothing
+    await dead._acknowledge(job)
+    assert [row.lease for row in await queued(queue)] == [alive.lease]
+
+
+@pytest.mark.asyncio
+async def test_running_jobs_keep_their_lease(queue, workers):
+    async def slow():
+        await asyncio.sleep(0.5)
+
+    enqueue(queue, "slow")
+    await queue.commit()
+    worker = workers({"slow": Handler(slow, 5)}, visibility_timeout=0.15)
+    other = workers({})
+
+    running = asyncio.create_task(worker.run())
+    await asyncio.sleep(0.35)
+    # Well past the visibility timeout, but the lease has been extended
+    assert await other.claim(1) == []
+    await worker.stop()
+    await running
+    assert await queued(queue) == []
+
+
+@pytest.mark.asyncio
+async def test_stopping_worker_keeps_its_lease_until_jobs_finish(queue, workers):
+    async def slow():
+        await asyncio.sleep(0.6)
+
+    enqueue(queue, "slow")
+    await queue.commit()
+    worker = workers({"slow": Handler(slow, 5)}, visibility_timeout=0.15)
+    other = workers({})
+
+    running = asyncio.create_task(worker.run())
+    await asyncio.sleep(0.05)
+    stopping = asyncio.create_task(worker.stop(timeout=5))
+    await asyncio.sleep(0.35)
+    # Past the visibility timeout while shutting down, and still not claimable
+    assert await other.claim(1) == []
+    await stopping
+    await running
+    assert await queued(queue) == []
+    assert worker.stats()["completed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_workers_run_each_job_once(queue, workers):
+    done = []
+
+    async def handler(number: int):
+        await asyncio.sleep(0.005)
+        done.append(number)
+
+    await enqueue_many(queue, "work", [{"number": number} for number in range(40)])
+    await queue.commit()
+
+    handlers = {"work": Handler(handler, 5)}
+    await run_until_empty(queue, *(workers(handlers, concurrency=4) for _ in range(3)))
+
+    assert sorted(done) == list(range(40))
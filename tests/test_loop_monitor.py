@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.utils.loop_monitor import LoopMonitor, LoopMonitorMiddleware
+
+
+def blocking_work():
+    time.sleep(0.3)
+
+
+@pytest.fixture
+def blocking_app():
+    monitor = LoopMonitor(interval=0.01, threshold=0.05, max_reports=5)
+    app = FastAPI()
+    app.add_middleware(LoopMonitorMiddleware, monitor=monitor)
+
+    @app.get("/items/{item_id}")
+    async def blocking_endpoint(item_id: int):
+        blocking_work()
+        return {"id": item_id}
+
+    @app.get("/fine")
+    async def fine():
+        await asyncio.sleep(0.1)
+        return {}
+
+    return app, monitor
+
+
+@pytest.mark.asyncio
+async def test_stall_is_attributed_to_route_with_stack(blocking_app):
+    app, monitor = blocking_app
+    await monitor.start()
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.get("/items/1")).status_code == 200
+            # Let the ticker observe the lag
+            await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    assert monitor.stalls == 1
+    assert monitor.stalls_by_route == {"GET /items/{item_id}": 1}
+    report = monitor.reports[-1]
+    assert report["duration_ms"] >= 200
+    assert "blocking_work" in "".join(report["stack"])
+    assert monitor.stats()["lag_seconds"]["count"] > 0
+
+
+@pytest.mark.asyncio
+async def test_awaiting_is_not_a_stall(blocking_app):
+    app, monitor = blocking_app
+    await monitor.start()
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.get("/fine")).status_code == 200
+    finally:
+        await monitor.stop()
+
+    assert monitor.stalls == 0
+    assert not monitor.running
@@ -0,0 +1,32 @@
+import subprocess
+import sys
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from src.configurations.migrations import (ALEMBIC_INI, current_revisions,
+                                           head_revisions, migrate)
+from src.configurations.settings import settings
+
+
+def test_head_revisions_match_alembic():
+    script = ScriptDirectory.from_config(Config(ALEMBIC_INI))
+    assert head_revisions() == set(script.get_heads())
+
+
+def test_migrate_is_a_no_op_at_head():
+    # The session fixture has already migrated the database
+    assert migrate() is False
+
+    engine = create_engine(settings.database_url.replace("+asyncpg", ""), poolclass=NullPool)
+    with engine.connect() as connection:
+        assert current_revisions(connection) == head_revisions()
+    engine.dispose()
+
+
+def test_app_import_does_not_load_alembic():
+    code = "import sys, src.main; print('alembic' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
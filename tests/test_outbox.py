@@ -0,0 +1,227 @@
+import asyncio
+import uuid
+
+import orjson
+import pytest
+import pytest_asyncio
+from fastapi import status
+from sqlalchemy import select, text
+
+from src.configurations.settings import settings
+from src.models.outbox import OutboxEvent
+from src.models.sellers import Seller
+from src.utils.outbox import OutboxDispatcher, enqueue
+from tests.conftest import async_test_session
+
+
+class StubServer:
+    """A keep-alive HTTP/1.1 server recording the bodies POSTed to it."""
+
+    def __init__(self):
+        self.requests: list[tuple[str, dict]] = []
+        self.statuses: list[int] = []
+        self.delay = 0.0
+        self.connections = 0
+        self.writers: set[asyncio.StreamWriter] = set()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self.writers.add(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                path = head.split(b" ", 2)[1].decode()
+                length = next(
+                    int(line.split(b":", 1)[1])
+                    for line in head.split(b"\r\n")
+                    if line.lower().startswith(b"content-length:")
+                )
+                self.requests.append((path, orjson.loads(await reader.readexactly(length))))
+                await asyncio.sleep(self.delay)
+                code = self.statuses.pop(0) if self.statuses else 200
+                writer.write(f"HTTP/1.1 {code} Stub\r\nContent-Length: 0\r\n\r\n".encode())
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def events(self, path: str) -> list[dict]:
+        return [event for request_path, body in self.requests if request_path == path for event in body["events"]]
+
+
+@pytest_asyncio.fixture
+async def stub():
+    stub = StubServer()
+    server = await asyncio.start_server(stub.handle, "127.0.0.1", 0)
+    stub.url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    yield stub
+    server.close()
+    for writer in stub.writers:
+        writer.close()
+    await server.wait_closed()
+
+
+@pytest_asyncio.fixture
+async def outbox(db_session, stub, monkeypatch):
+    await db_session.execute(text("TRUNCATE TABLE webhook_outbox"))
+    await db_session.commit()
+    monkeypatch.setattr(settings, "webhook_urls", [f"{stub.url}/a", f"{stub.url}/b"])
+    return db_session
+
+
+@pytest_asyncio.fixture
+async def dispatcher():
+    created = []
+
+    def create(**kwargs) -> OutboxDispatcher:
+        created.append(OutboxDispatcher(session_factory_getter=lambda: async_test_session, **kwargs))
+        return created[-1]
+
+    yield create
+    for dispatcher in created:
+        await dispatcher.close()
+
+
+async def queue_events(session, count: int) -> None:
+    for number in range(count):
+        enqueue(session, "book.created", {"id": number})
+    await session.commit()
+
+
+async def pending(session) -> list[OutboxEvent]:
+    session.expire_all()
+    return (await session.execute(select(OutboxEvent).order_by(OutboxEvent.id))).scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_writes_queue_events_in_their_transaction(outbox, async_client):
+    seller = Seller(first_name="A", last_name="B", e_mail=f"{uuid.uuid4()}@example.com", password="password123")
+    outbox.add(seller)
+    await outbox.commit()
+
+    data = {"title": "Clean Code", "author": "Robert Martin", "count_pages": 300, "year": 2020}
+    response = await async_client.post("/api/v1/books/", json={**data, "seller_id": seller.id})
+    assert response.status_code == status.HTTP_201_CREATED
+    book = response.json()
+    await outbox.commit()
+    # A failed write queues nothing
+    response = await async_client.post("/api/v1/books/", json={**data, "seller_id": seller.id + 1})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    rows = await pending(outbox)
+    assert sorted(row.destination for row in rows) == sorted(settings.webhook_urls)
+    # One event, queued once per destination
+    assert rows[0].payload == rows[1].payload
+    assert rows[0].payload["type"] == "book.created"
+    assert rows[0].payload["data"] == book
+
+
+@pytest.mark.asyncio
+async def test_events_are_batched_per_destination(outbox, stub, dispatcher):
+    await queue_events(outbox, 5)
+
+    assert await dispatcher(batch_size=2).drain() == 10
+
+    for path in ("/a", "/b"):
+        assert [len(body["events"]) for request_path, body in stub.requests if request_path == path] == [2, 2, 1]
+        assert [event["data"]["id"] for event in stub.events(path)] == list(range(5))
+    # One pooled connection per request in flight, not one per request
+    assert stub.connections <= 6
+    assert await pending(outbox) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_deliveries_are_retried_then_given_up(outbox, stub, dispatcher):
+    await queue_events(outbox, 1)
+    delivery = dispatcher(max_attempts=2, retry_base=0)
+
+    stub.statuses = [500, 200]
+    await delivery.drain()
+    rows = await pending(outbox)
+    assert [(row.destination, row.attempts) for row in rows] == [(f"{stub.url}/a", 1)]
+    assert rows[0].last_error == "HTTP 500"
+
+    stub.statuses = [503]
+    await delivery.drain()
+    rows = await pending(outbox)
+    assert rows[0].attempts == 2 and rows[0].failed_at is not None
+    # Given up on: not claimed again
+    assert await delivery.drain() == 0
+    assert delivery.stats()["dead"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retries_back_off(outbox, stub, dispatcher):
+    await queue_events(outbox, 1)
+    delivery = dispatcher(retry_base=60)
+
+    stub.statuses = [500, 500]
+    await delivery.drain()
+    # Not due again for a minute
+    assert await delivery.drain() == 0
+    assert len(stub.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_dispatchers_never_deliver_twice(outbox, stub, dispatcher):
+    await queue_events(outbox, 20)
+    stub.delay = 0.01
+
+    await asyncio.gather(*(dispatcher(claim_size=5).drain() for _ in range(4)))
+    await asyncio.gather(*(dispatcher(claim_size=5).drain() for _ in range(4)))
+
+    for path in ("/a", "/b"):
+        assert sorted(event["data"]["id"] for event in stub.events(path)) == list(range(20))
+    assert await pending(outbox) == []
+
+
+@pytest.mark.asyncio
+async def test_rows_are_not_locked_while_being_delivered(outbox, stub, dispatcher):
+    await queue_events(outbox, 1)
+    stub.delay = 0.3
+
+    delivering = asyncio.create_task(dispatcher().drain())
+    while not stub.requests:
+        await asyncio.sleep(0.01)
+    # The claim has committed: its rows can be locked, but are not due
+    locked = await outbox.execute(text("SELECT id FROM webhook_outbox FOR UPDATE NOWAIT"))
+    assert len(locked.all()) == 2
+    await outbox.rollback()
+    assert await dispatcher().drain() == 0
+
+    assert await delivering == 2
+    assert await pending(outbox) == []
+
+
+@pytest.mark.asyncio
+async def test_acknowledgements_after_the_lease_lapsed_are_ignored(outbox, stub, dispatcher):
+    await queue_events(outbox, 1)
+    stub.delay = 0.3
+    stub.statuses = [500, 500]
+
+    slow = asyncio.create_task(dispatcher(lease=0.1).drain())
+    await asyncio.sleep(0.2)
+    # Claimed again by another dispatcher, which delivers after the first one failed
+    assert await dispatcher().drain() == 2
+    await slow
+
+    # The failure was not recorded over the second claim
+    assert await pending(outbox) == []
+
+
+@pytest.mark.asyncio
+async def test_running_dispatcher_delivers_when_woken(outbox, stub, dispatcher):
+    delivery = dispatcher(poll_interval=60)
+    delivery.start()
+    try:
+        await asyncio.sleep(0.1)
+        await queue_events(outbox, 1)
+        delivery.wake()
+        for _ in range(100):
+            if len(stub.requests) == 2:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await delivery.close()
+    assert sorted(path for path, _ in stub.requests) == ["/a", "/b"]
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.configurations.settings import settings
+from src.utils.overload import (AdaptiveLimiter, Overloaded, deadline,
+                                handle_overload, is_overload)
+from tests.conftest import async_test_session
+
+
+def limiter(**kwargs) -> AdaptiveLimiter:
+    options = dict(initial=2, min_limit=1, max_limit=10, target_latency=0.1, queue_timeout=0.05)
+    return AdaptiveLimiter(**{**options, **kwargs})
+
+
+@pytest.mark.asyncio
+async def test_limiter_rejects_when_full():
+    limits = limiter()
+    await limits.acquire()
+    await limits.acquire()
+
+    with pytest.raises(Overloaded):
+        await limits.acquire()
+    assert (limits.in_flight, limits.rejected) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_limiter_hands_slot_to_waiter():
+    limits = limiter(queue_timeout=1)
+    await limits.acquire()
+    await limits.acquire()
+
+    waiting = asyncio.create_task(limits.acquire())
+    await asyncio.sleep(0)
+    limits.release(0.01)
+    await waiting
+    assert limits.in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_limiter_adapts_to_latency():
+    limits = limiter(initial=4)
+    for _ in range(4):
+        await limits.acquire()
+    for _ in range(4):
+        limits.release(0.01)
+    assert limits.limit > 4
+
+    grown = limits.limit
+    await limits.acquire()
+    limits.release(1.0)
+    assert limits.limit == pytest.approx(grown * 0.9)
+
+
+def app_with(session_factory, seconds: float) -> FastAPI:
+    app = FastAPI()
+    app.add_exception_handler(Overloaded, handle_overload)
+    app.add_exception_handler(PoolTimeoutError, handle_overload)
+    app.add_exception_handler(DBAPIError, handle_overload)
+
+    @app.get("/sleep", dependencies=[Depends(deadline(seconds))])
+    async def sleep(duration: float = 0):
+        async with session_factory() as session:
+            return (await session.execute(
+                text("SELECT current_setting('statement_timeout'), pg_sleep(:duration)"),
+                {"duration": duration},
+            )).one()[0]
+
+    return app
+
+
+@pytest_asyncio.fixture
+async def client_for():
+    clients = []
+
+    async def client(app: FastAPI) -> AsyncClient:
+        clients.append(AsyncClient(transport=ASGITransport(app=app), base_url="http://test"))
+        return clients[-1]
+
+    yield client
+    for client in clients:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_deadline_sets_statement_timeout(client_for):
+    client = await client_for(app_with(async_test_session, 0.5))
+    response = await client.get("/sleep")
+    assert response.json() == "500ms"
+
+
+@pytest.mark.asyncio
+async def test_deadline_cancels_slow_statement(client_for):
+    client = await client_for(app_with(async_test_session, 0.2))
+    response = await client.get("/sleep", params={"duration": 2})
+    assert response.status_code == 504
+
+
+@pytest.mark.asyncio
+async def test_pool_exhaustion_returns_503(client_for):
+    engine = create_async_engine(
+        settings.database_test_url, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    client = await client_for(app_with(async_sessionmaker(engine), 5))
+    try:
+        async with engine.connect():
+            response = await client.get("/sleep")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_statement_timeout_is_an_overload():
+    async with async_test_session() as session:
+        await session.execute(text("SET LOCAL statement_timeout = 50"))
+        with pytest.raises(DBAPIError) as error:
+            await session.execute(text("SELECT pg_sleep(1)"))
+
+    assert is_overload(error.value)
+    assert (await handle_overload(None, error.value)).status_code == 504
@@ -0,0 +1,98 @@
+import time
+
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, status
+from httpx import ASGITransport, AsyncClient
+
+from src.configurations.settings import settings
+from src.models.books import Book
+from src.utils.profiling import Profiler, ProfilingMiddleware, RequestProfile, profiler
+
+TOKEN = {"X-Profile-Token": "secret"}
+
+
+@pytest_asyncio.fixture
+async def profiling_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "profiling_token", "secret")
+    yield
+    profiler.sample_every = 0
+    profiler.profiles.clear()
+
+
+def busy_work():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_profiling_endpoints_need_the_token(async_client, monkeypatch):
+    monkeypatch.setattr(settings, "profiling_token", "")
+    assert (await async_client.get("/api/v1/profiling/", headers=TOKEN)).status_code == status.HTTP_404_NOT_FOUND
+
+    monkeypatch.setattr(settings, "profiling_token", "secret")
+    response = await async_client.get("/api/v1/profiling/", headers={"X-Profile-Token": "wrong"})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test_requested_profile_reports_db_time(db_session, async_client, create_seller, profiling_enabled):
+    book = Book(title="Profiled", author="Author", year=2024, pages=100, seller_id=create_seller.id)
+    db_session.add(book)
+    await db_session.commit()
+
+    response = await async_client.get(f"/api/v1/books/{book.id}", headers=TOKEN)
+    assert response.status_code == status.HTTP_200_OK
+    timing = dict(item.split(";dur=") for item in response.headers["server-timing"].split(", "))
+    assert set(timing) == {"validation", "db", "orm_hydration", "serialisation", "other", "waiting", "total"}
+    assert float(timing["db"]) > 0
+
+    profiles = (await async_client.get("/api/v1/profiling/", headers=TOKEN)).json()["profiles"]
+    profile = next(p for p in profiles if p["id"] == response.headers["x-profile-id"])
+    assert profile["path"] == "/api/v1/books/{book_id}"
+    assert profile["status"] == 200
+    assert profile["statements"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_sampled_requests_are_profiled_silently(async_client, profiling_enabled):
+    response = await async_client.put("/api/v1/profiling/", json={"sample_every": 1}, headers=TOKEN)
+    assert response.json() == {"sample_every": 1}
+
+    response = await async_client.get("/api/v1/books/")
+    assert "server-timing" not in response.headers
+    assert any(profile.path == "/api/v1/books/" for profile in profiler.profiles)
+
+
+@pytest.mark.asyncio
+async def test_collapsed_stacks_attribute_samples(profiling_enabled):
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/busy")
+    async def busy():
+        busy_work()
+        return {}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/busy", headers=TOKEN)
+
+    profile = profiler.get(response.headers["x-profile-id"])
+    assert profile.samples > 0
+    stacks = profile.collapsed().splitlines()
+    busy_stacks = [line for line in stacks if "busy_work (" in line]
+    assert busy_stacks and all(line.startswith("other;") for line in busy_stacks)
+    assert int(busy_stacks[0].rsplit(" ", 1)[1]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_ending_the_last_profile_does_not_wait_for_the_sampler():
+    slow = Profiler(interval=1.0, max_profiles=1)
+    profile = RequestProfile("GET", "/")
+    slow.begin(profile)
+
+    started = time.perf_counter()
+    slow.end(profile)
+
+    assert time.perf_counter() - started < 0.1
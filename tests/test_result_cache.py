@@ -0,0 +1,127 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import status
+
+from src.models.books import Book
+from src.models.sellers import Seller
+from src.utils.result_cache import ResultCache, cache_key, result_cache
+from src.utils.shared_cache import BOOKS_TABLE, SharedCache, seller_entity
+
+
+@pytest.fixture
+def versions(tmp_path):
+    return SharedCache(str(tmp_path / "responses"), slots=16, slot_size=256, generations=64, ttl=60)
+
+
+def renderer(*bodies):
+    calls = []
+
+    async def render():
+        calls.append(None)
+        return bodies[min(len(calls), len(bodies)) - 1]
+
+    return render, calls
+
+
+def test_cache_key_ignores_unset_parameters_and_order():
+    assert cache_key("books", seller_id=1, fields=None) == cache_key("books", seller_id=1)
+    assert cache_key("books", a=1, b=2) == cache_key("books", b=2, a=1)
+
+
+@pytest.mark.asyncio
+async def test_write_invalidates_only_entries_with_its_tags(versions):
+    cache = ResultCache(versions, max_bytes=1024, ttl=60, stale_ttl=0)
+    render_1, calls_1 = renderer(b"seller 1 v1", b"seller 1 v2")
+    render_2, calls_2 = renderer(b"seller 2")
+
+    for _ in range(2):
+        await cache.fetch(("books", 1), (seller_entity(1),), render_1)
+        await cache.fetch(("books", 2), (seller_entity(2),), render_2)
+    assert (len(calls_1), len(calls_2)) == (1, 1)
+
+    versions.invalidate(seller_entity(1), BOOKS_TABLE)
+
+    assert await cache.fetch(("books", 1), (seller_entity(1),), render_1) == b"seller 1 v2"
+    assert await cache.fetch(("books", 2), (seller_entity(2),), render_2) == b"seller 2"
+    assert (len(calls_1), len(calls_2)) == (2, 1)
+    assert cache.invalidated == 1
+
+
+@pytest.mark.asyncio
+async def test_body_rendered_before_a_write_is_not_stored_after_it(versions):
+    cache = ResultCache(versions, max_bytes=1024, ttl=60, stale_ttl=0)
+    rendering = asyncio.Event()
+
+    async def render_old():
+        await rendering.wait()
+        return b"old"
+
+    render_new, _ = renderer(b"new")
+
+    leader = asyncio.create_task(cache.fetch("books", (BOOKS_TABLE,), render_old))
+    await asyncio.sleep(0)
+    versions.invalidate(BOOKS_TABLE)
+    # Joins the flight started before the write
+    follower = asyncio.create_task(cache.fetch("books", (BOOKS_TABLE,), render_new))
+    await asyncio.sleep(0)
+    rendering.set()
+    assert await asyncio.gather(leader, follower) == [b"old", b"old"]
+
+    assert await cache.fetch("books", (BOOKS_TABLE,), render_new) == b"new"
+
+
+@pytest.mark.asyncio
+async def test_memory_is_bounded(versions):
+    cache = ResultCache(versions, max_bytes=100, ttl=60, stale_ttl=0)
+    for key in range(5):
+        render, _ = renderer(b"x" * 40)
+        await cache.fetch(key, (BOOKS_TABLE,), render)
+
+    assert cache.bytes <= 100
+    assert cache.evictions == 3
+    assert cache.stats()["entries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_entry_is_served_while_it_is_refreshed(versions):
+    cache = ResultCache(versions, max_bytes=1024, ttl=0, stale_ttl=60)
+    render, _ = renderer(b"v1")
+    refresh, refreshes = renderer(b"v2")
+
+    assert await cache.fetch("books", (BOOKS_TABLE,), render, refresh) == b"v1"
+    assert await cache.fetch("books", (BOOKS_TABLE,), render, refresh) == b"v1"
+    await asyncio.gather(*cache._refreshes)
+    cache.ttl = 60
+
+    assert await cache.fetch("books", (BOOKS_TABLE,), render, refresh) == b"v2"
+    assert len(refreshes) == 1
+    assert cache.stale_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_new_book_leaves_other_sellers_lists_cached(db_session, async_client):
+    sellers = [
+        Seller(first_name="A", last_name="B", e_mail=f"list+{uuid.uuid4()}@example.com", password="password123")
+        for _ in range(2)
+    ]
+    db_session.add_all(sellers)
+    await db_session.commit()
+    first, second = (seller.id for seller in sellers)
+    db_session.add(Book(title="Old", author="Author", year=2024, pages=100, seller_id=first))
+    await db_session.commit()
+
+    for seller_id in (first, second):
+        await async_client.get("/api/v1/books/", params={"seller_id": seller_id})
+
+    data = {"title": "New", "author": "Author", "count_pages": 10, "year": 2024, "seller_id": first}
+    assert (await async_client.post("/api/v1/books/", json=data)).status_code == status.HTTP_201_CREATED
+    await db_session.commit()
+
+    hits = result_cache.hits
+    response = await async_client.get("/api/v1/books/", params={"seller_id": first})
+    assert sorted(book["title"] for book in response.json()["books"]) == ["New", "Old"]
+    response = await async_client.get("/api/v1/books/", params={"seller_id": second})
+    assert response.json() == {"books": []}
+    assert result_cache.hits == hits + 1
@@ -187,3 +187,28 @@ async def test_delete_seller(async_client, db_session):
 async def test_delete_nonexistent_seller(async_client):
     response = await async_client.delete("/api/v1/sellers/9999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_get_seller_with_sparse_fields(async_client, db_session):
+    e_mail = f"testuser+{uuid.uuid4()}@example.com"
+    seller = Seller(
+        first_name="John", last_name="Doe", e_mail=e_mail, password="password123"
+    )
+    db_session.add(seller)
+    await db_session.commit()
+    await db_session.refresh(seller)
+
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}?fields=id,e_mail")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"id": seller.id, "e_mail": e_mail}
+
+    response = await async_client.get("/api/v1/sellers/?fields=first_name,books")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{"first_name": "John", "books": []}]
+
+
+@pytest.mark.asyncio
+async def test_get_seller_with_password_field(async_client):
+    response = await async_client.get("/api/v1/sellers/?fields=password")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,38 @@
+import pytest
+
+from src.configurations.settings import settings
+from src.server import CONNECTIONS_OUTSIDE_POOL, pool_per_worker
+
+
+@pytest.fixture
+def pool_settings(monkeypatch):
+    monkeypatch.setattr(settings, "max_connection_count", 10)
+    monkeypatch.setattr(settings, "db_max_overflow", 5)
+    monkeypatch.setattr(settings, "db_reserved_connections", 10)
+    monkeypatch.setattr(settings, "job_worker_replicas", 0)
+
+
+def test_pool_uses_configured_size_when_it_fits(pool_settings):
+    assert pool_per_worker(max_connections=100, workers=4) == (10, 5)
+
+
+@pytest.mark.parametrize("workers, replicas", [(8, 1), (16, 1), (4, 3), (10, 3)])
+def test_pools_fit_under_max_connections(pool_settings, workers, replicas):
+    pool_size, max_overflow = pool_per_worker(100, workers, replicas)
+
+    assert pool_size >= 1
+    per_worker = pool_size + max_overflow + CONNECTIONS_OUTSIDE_POOL
+    assert replicas * workers * per_worker <= 100 - settings.db_reserved_connections
+
+
+def test_job_workers_are_left_their_connections(pool_settings, monkeypatch):
+    monkeypatch.setattr(settings, "job_worker_replicas", 2)
+    monkeypatch.setattr(settings, "job_worker_concurrency", 8)
+    monkeypatch.setattr(settings, "audit_enabled", True)
+    # 100 - 10 reserved - 2 * (8 jobs + 2 + 1 audit) = 68 for 5 workers, 13 each
+    assert pool_per_worker(100, workers=5) == (10, 1)
+
+
+def test_too_many_workers_for_the_database(pool_settings):
+    with pytest.raises(ValueError, match="do not fit"):
+        pool_per_worker(max_connections=100, workers=64)
@@ -0,0 +1,129 @@
+import asyncio
+import multiprocessing
+
+import pytest
+from fastapi import status
+
+from src.models.books import Book
+from src.utils.shared_cache import SharedCache, book_entity, response_cache, seller_entity
+from src.utils.singleflight import SingleFlight
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "responses")
+
+
+def open_cache(path, ttl=60.0):
+    return SharedCache(path, slots=64, slot_size=256, generations=128, ttl=ttl)
+
+
+def test_workers_share_entries_and_invalidations(cache_path):
+    writer, reader = open_cache(cache_path), open_cache(cache_path)
+
+    writer.put("book:1:", writer.stamp(book_entity(1)), b'{"id":1}')
+    assert reader.get("book:1:", book_entity(1)) == b'{"id":1}'
+
+    reader.invalidate(book_entity(1))
+    assert writer.get("book:1:", book_entity(1)) is None
+
+    writer.put("book:1:", writer.stamp(book_entity(1)), b'{"id":1}')
+    writer.invalidate_all()
+    assert reader.get("book:1:", book_entity(1)) is None
+
+
+def test_entry_rendered_before_a_write_is_stale(cache_path):
+    cache = open_cache(cache_path)
+
+    stamp = cache.stamp(seller_entity(1))
+    # A write commits while the response is being rendered
+    cache.invalidate(seller_entity(1))
+    cache.put("seller:1:", stamp, b"old")
+
+    assert cache.get("seller:1:", seller_entity(1)) is None
+
+
+@pytest.mark.asyncio
+async def test_shared_render_is_stored_with_the_leaders_stamp(cache_path):
+    cache, flights = open_cache(cache_path), SingleFlight()
+    rendering = asyncio.Event()
+
+    async def render_old():
+        await rendering.wait()
+        return b"old"
+
+    async def render_new():
+        return b"new"
+
+    leader = asyncio.create_task(cache.fetch("book:1:", book_entity(1), render_old, flights))
+    await asyncio.sleep(0)
+    cache.invalidate(book_entity(1))
+    # Joins the render started before the write
+    follower = asyncio.create_task(cache.fetch("book:1:", book_entity(1), render_new, flights))
+    await asyncio.sleep(0)
+    rendering.set()
+    assert await asyncio.gather(leader, follower) == [b"old", b"old"]
+
+    assert await cache.fetch("book:1:", book_entity(1), render_new, flights) == b"new"
+
+
+def test_entries_expire_and_oversized_bodies_are_skipped(cache_path):
+    cache = open_cache(cache_path, ttl=-1)
+    cache.put("book:1:", cache.stamp(book_entity(1)), b"{}")
+    assert cache.get("book:1:", book_entity(1)) is None
+
+    cache.ttl = 60
+    cache.put("book:2:", cache.stamp(book_entity(2)), b"x" * 256)
+    assert cache.get("book:2:", book_entity(2)) is None
+    assert cache.skipped == 1
+
+
+def _fill_and_invalidate(path, stored, invalidate):
+    cache = open_cache(path)
+    cache.put("book:7:", cache.stamp(book_entity(7)), b'{"id":7}')
+    stored.set()
+    invalidate.wait(10)
+    cache.invalidate(book_entity(7))
+
+
+def test_entries_are_shared_across_processes(cache_path):
+    context = multiprocessing.get_context("spawn")
+    stored, invalidate = context.Event(), context.Event()
+    worker = context.Process(target=_fill_and_invalidate, args=(cache_path, stored, invalidate))
+    worker.start()
+    try:
+        assert stored.wait(10)
+        cache = open_cache(cache_path)
+        assert cache.get("book:7:", book_entity(7)) == b'{"id":7}'
+        invalidate.set()
+        worker.join(10)
+        assert cache.get("book:7:", book_entity(7)) is None
+    finally:
+        worker.join(10)
+
+
+@pytest.mark.asyncio
+async def test_book_responses_are_cached_until_a_write_commits(db_session, async_client, create_seller):
+    book = Book(title="Cached", author="Author", year=2024, pages=100, seller_id=create_seller.id)
+    db_session.add(book)
+    await db_session.commit()
+
+    first = await async_client.get(f"/api/v1/books/{book.id}")
+    hits = response_cache.hits
+    second = await async_client.get(f"/api/v1/books/{book.id}")
+    assert second.json() == first.json()
+    assert response_cache.hits == hits + 1
+
+    response = await async_client.put(
+        f"/api/v1/books/{book.id}",
+        json={"id": book.id, "title": "Renamed", "author": "Author", "year": 2024, "pages": 100, "seller_id": create_seller.id},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    await db_session.commit()
+
+    response = await async_client.get(f"/api/v1/books/{book.id}")
+    assert response.json()["title"] == "Renamed"
+
+    # The seller's response embeds its books
+    seller = await async_client.get(f"/api/v1/sellers/{create_seller.id}")
+    assert [b["title"] for b in seller.json()["books"]] == ["Renamed"]
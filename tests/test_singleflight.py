@@ -0,0 +1,84 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import status
+
+from src.models.sellers import Seller
+from src.utils.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return b"payload"
+
+    results = await asyncio.gather(*(flights.do("key", load) for _ in range(10)))
+
+    assert results == [b"payload"] * 10
+    assert calls == 1
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "followers": 9}
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_not_cached():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise LookupError("not found")
+
+    results = await asyncio.gather(*(flights.do("key", fail) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, LookupError) for result in results)
+
+    async def succeed():
+        return 1
+
+    assert await flights.do("key", succeed) == 1
+
+
+@pytest.mark.asyncio
+async def test_follower_takes_over_when_leader_is_cancelled():
+    flights = SingleFlight()
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def fast():
+        return "done"
+
+    leader = asyncio.create_task(flights.do("key", slow))
+    await started.wait()
+    follower = asyncio.create_task(flights.do("key", fast))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await asyncio.wait_for(follower, timeout=1) == "done"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_seller_requests(async_client, db_session):
+    seller = Seller(
+        first_name="John",
+        last_name="Doe",
+        e_mail=f"testuser+{uuid.uuid4()}@example.com",
+        password="password123",
+    )
+    db_session.add(seller)
+    await db_session.commit()
+
+    responses = await asyncio.gather(
+        *(async_client.get(f"/api/v1/sellers/{seller.id}") for _ in range(10))
+    )
+
+    assert {response.status_code for response in responses} == {status.HTTP_200_OK}
+    assert len({response.content for response in responses}) == 1
+    assert responses[0].json()["id"] == seller.id